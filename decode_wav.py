@@ -1,126 +1,108 @@
 import argparse
-import wave
-import struct
+import glob
 
-import src.Rx
+import src.wavdecode as wavdecode
 
 
 def get_parser():
     parser = argparse.ArgumentParser(description='Extracts data encoded in WAVFILE')
-    parser.add_argument('wavfile', action="store", metavar='WAVFILE', help='WAV file to read')
+    parser.add_argument('wavfile', action="store", metavar='WAVFILE', nargs='+', help='WAV file(s) to read. Several files, or a glob, give a summary of each file.')
     parser.add_argument('--calibrate', action="store_true", help='Compute sensitivity')
     parser.add_argument('--sensitivity', action="store", metavar='FLOAT', help='Rx sensitivity [0.0 - 1.0]', type=float)
-    parser.add_argument('--showinit', action="store_true", help='Show PyAudio initialization')
     parser.add_argument('--filter', action="store_true", help='Write filtered wav')
     parser.add_argument('--echo', action="store_true", help='Echo decoded data')
     parser.add_argument('--info', action="store_true", help='Display wav info')
+    parser.add_argument('--channel', action="store", choices=['auto', 'left', 'right', 'mix'], default='auto', help='Channel of a stereo WAVFILE to decode (default: auto)')
+    parser.add_argument('--jobs', action="store", metavar='N', help='Files to decode at once (default: number of CPUs)', type=int)
     return parser
 
 
-def compute_sens(bufr, framerate):
-    # Pick a point that is about halfway between tho noise floor and
-    # the max value.
+def expand_globs(patterns):
+    filenames = []
+    for pat in patterns:
+        filenames.extend(sorted(glob.glob(pat)) or [pat])
+    return filenames
 
-    # The first half-second may have transients, so ignore it.
-    scalar_ignore = int(framerate / 2)
 
-    working = bufr[scalar_ignore:]
-    max_val = max(working)
-    num_buckets = 32 # 32 is arbitrary.
-    bucket_size = max_val / num_buckets
-
-    buckets = []
-    for i in range(num_buckets):
-        buckets.append(0)
-
-    for w in working:
-        if w < 0:
-            w = 0
-        ind = w / bucket_size
-        if ind == num_buckets:
-            ind -= 1
-        buckets[ind] += 1
-
-    floor_ind = 0
-    for i in range(0, num_buckets-1):
-        p = (buckets[i+1] + 1) / float(buckets[i] + 1) # Add 1 to avoid zeros.
-        if p < 0.0001: # 0.0001 is arbitrary
-            floor_ind = i
-
-    bot_ind = floor_ind + 1
-    top_ind = num_buckets - 1
-    aa = (bucket_size * (top_ind - bot_ind)) / 2
-    MAX_SHORT = ((2**16) / 2) - 1
-    bb = float(aa) / MAX_SHORT
-    return bb
-
-
-def to_samp(binf, num):
-    return struct.unpack('<'+str(num)+'h', binf)
-
-
-parsed_args = get_parser().parse_args()
-
-wf = wave.open(parsed_args.wavfile, 'rb')
-num_frames = wf.getnframes()
-frames = wf.readframes(num_frames)
-framerate = wf.getframerate()
-samp_width = wf.getsampwidth()
-num_channels = wf.getnchannels()
-wf.close()
-
-if parsed_args.info:
-    print 'Num frames: {}'.format(num_frames)
-    print 'Framerate: {}'.format(framerate)
-    print 'Duration (sec): {}'.format(num_frames / float(framerate))
-
-if framerate != 44100:
-    print 'WARN: Framerate is not 44100. Actual: {}'.format(framerate)
-
-if samp_width != 2:
-    print 'WARN: Sample width is not 2. Actual: {}'.format(samp_width)
-
-if num_channels != 1:
-    print 'ERROR: Number of channels is not 1. Actual: {}'.format(num_channels)
-    exit(0)
-
-if parsed_args.sensitivity and parsed_args.calibrate:
-    print "ERROR: 'sensitivity' cannot be used with 'calibrate'"
-    exit(0)
-
-sens = None
-
-if parsed_args.sensitivity:
-    if (parsed_args.sensitivity < 0) or (parsed_args.sensitivity > 1):
+def batch(filenames, parsed_args):
+    # Without --sensitivity, each file is calibrated
+    if parsed_args.sensitivity and parsed_args.calibrate:
+        print "ERROR: 'sensitivity' cannot be used with 'calibrate'"
+        return
+    if parsed_args.sensitivity and ((parsed_args.sensitivity < 0) or (parsed_args.sensitivity > 1)):
         print "ERROR: 'sensitivity' must be >= 0 and <= 1."
-        exit(0)
-    sens = parsed_args.sensitivity
-
-if parsed_args.calibrate or (sens is None):
-    sens = compute_sens(to_samp(frames, num_frames), framerate)
-    print ('sensitivity = %.2f'% sens)
-
-rx = src.Rx.Rx(samp_width, num_channels, framerate, parsed_args.showinit, parsed_args.wavfile, sens)
-
-bufr = rx._to_samples(frames, num_frames)
-
-filt_bufr = rx._filtered(bufr, sens)
-
-# Must call protected method _decode_buffer() to
-# decode wav data. The return value is not used.
-samples_read = rx._decode_buffer(filt_bufr)
-bytes = rx.peek_bytes(len(rx.char_buf))
-if parsed_args.echo:
-    print [chr(b) for b in bytes]
-
-if parsed_args.filter:
-    filtfile = 'filt_'+parsed_args.wavfile
-    bin = struct.pack('<'+str(len(filt_bufr))+'h', *filt_bufr)
-    rx.write_wav(filtfile, bin)
-    print 'Wrote {}'.format(filtfile)
-
-outfile = parsed_args.wavfile + '.bin'
-f = open(outfile, 'wb')
-f.write(bytearray(bytes))
-f.close()
-print 'Wrote {}'.format(outfile)
+        return
+    print '{:>8} {:>6} {:>6} {:>8} {:>8}  {}'.format('bytes', 'sens', 'conf', 'errors', 'secs', 'file')
+    for sm in wavdecode.summarize_files(filenames, parsed_args.sensitivity, parsed_args.jobs, parsed_args.channel):
+        if sm.error:
+            print '{:>8} {:>6} {:>6} {:>8} {:>8}  {}: {}'.format('-', '-', '-', '-', '-', sm.filename, sm.error)
+            continue
+        conf = '-'
+        if sm.confidence is not None:
+            conf = '{:.2f}'.format(sm.confidence)
+        print '{:>8} {:>6.2f} {:>6} {:>8} {:>8.1f}  {}'.format(sm.bytes, sm.sensitivity, conf, sm.errors, sm.secs, sm.filename)
+
+
+def decode(wavfile, parsed_args):
+    info = wavdecode.wav_info(wavfile)
+
+    if parsed_args.info:
+        print 'Num frames: {}'.format(info.frames)
+        print 'Framerate: {}'.format(info.framerate)
+        print 'Duration (sec): {}'.format(info.secs)
+
+    if info.framerate != 44100:
+        print 'WARN: Framerate is not 44100. Actual: {}'.format(info.framerate)
+
+    if info.sample_width != 2:
+        print 'ERROR: Sample width is not 2. Actual: {}'.format(info.sample_width)
+        return
+
+    if info.channels not in (1, 2):
+        print 'ERROR: Number of channels is not 1 or 2. Actual: {}'.format(info.channels)
+        return
+
+    if parsed_args.sensitivity and parsed_args.calibrate:
+        print "ERROR: 'sensitivity' cannot be used with 'calibrate'"
+        return
+
+    sens = None
+
+    if parsed_args.sensitivity:
+        if (parsed_args.sensitivity < 0) or (parsed_args.sensitivity > 1):
+            print "ERROR: 'sensitivity' must be >= 0 and <= 1."
+            return
+        sens = parsed_args.sensitivity
+
+    if parsed_args.calibrate or (sens is None):
+        sens, confidence = wavdecode.calibrate_file(wavfile, parsed_args.channel)
+        print ('sensitivity = %.2f'% sens)
+        print ('confidence = %.2f'% confidence)
+
+    decoder = wavdecode.WavDecoder(info.framerate, sens)
+    bytes = bytearray(ch for offset, ch in decoder.decode_file(wavfile, channel=parsed_args.channel))
+    if parsed_args.echo:
+        print [chr(b) for b in bytes]
+
+    if parsed_args.filter:
+        filtfile = 'filt_'+wavfile
+        wavdecode.write_triggers(wavfile, filtfile, sens, channel=parsed_args.channel)
+        print 'Wrote {}'.format(filtfile)
+
+    outfile = wavfile + '.bin'
+    f = open(outfile, 'wb')
+    f.write(bytes)
+    f.close()
+    print 'Wrote {}'.format(outfile)
+
+
+def main(parsed_args):
+    filenames = expand_globs(parsed_args.wavfile)
+    if len(filenames) > 1:
+        batch(filenames, parsed_args)
+    else:
+        decode(filenames[0], parsed_args)
+
+
+if __name__ == '__main__':
+    main(get_parser().parse_args())
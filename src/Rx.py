@@ -1,23 +1,49 @@
 # XXX
-import time
+import struct
 import threading
 import wave
-import struct
+import agc
+import demod
+import log
 import pa
+import recorder
+import ring
+import util
+
+from demod import MAX_SHORT
+
+# Seconds of raw audio that can be queued for the decoder thread.
+RING_SECS = 2.0
 
-MAX_SHORT = ((2**16) / 2) - 1
+# Frames per buffer, if neither a size nor a latency is given. PyAudio's default.
+BUFFER_FRAMES = 1024
 
-TRIGGER_VAL = int(MAX_SHORT * 0.75) # Arbitrary
+# Decoded bytes that can wait to be read. About 4.5 minutes at 2400 bit/s.
+CHAR_BUF_SIZE = 65536
+
+# Thresholds of the alternate decoders, relative to the sensitivity. Each
+# alternate decodes the same audio into a buffer of its own.
+ALT_SCALES = (0.6, 1.6)
+
+# An alternate threshold is never set above this.
+ALT_MAX_SENS = 0.95
+
+# Extra time that capture() waits for audio, in case the decoder is behind.
+CAPTURE_SLACK_SECS = 2.0
 
 # We can't toggle disable and enable listening quickly enough to hear the
 # calc's reply, so we have to listen all the time.
 
+# The PortAudio callback only copies raw audio into a ring buffer. The
+# samples are decoded on the Rx thread so that slow decoding cannot cause
+# audio to be dropped.
+
 class Rx:
 
     # Spec says min-2340 and max=2460 bit/s.
     bits_per_sec = 2400
 
-    def __init__(self, samp_width, chan, framerate, show_init, wav_file, sensitivity):
+    def __init__(self, samp_width, chan, framerate, show_init, wav_file, sensitivity, ring_secs=RING_SECS, wav_max=None, frames_per_buffer=None, latency=None):
         self.pa = pa.get_instance(show_init)
         self.thread = None
 
@@ -26,156 +52,309 @@ class Rx:
         self.framerate = framerate
 
         self.sensitivity = sensitivity
+        self.agc = agc.Agc(sensitivity, framerate) # Measures the signal
+        self.agc_on = False # Whether sensitivity follows the signal
 
-        self.samples_per_bit = int(self.framerate / self.bits_per_sec)
+        self.channel_sel = agc.ChannelSelector(framerate) # Used when chan is 2
+
+        # Usually not a whole number (e.g. 18.375 at 44100). Bit positions
+        # are computed from the fraction so errors do not add up across a frame.
+        self.samples_per_bit = float(self.framerate) / self.bits_per_sec
         # 10 == 1 start-bit, 8 data-bits, 1 stop-bits
         # Calc sends two stop bits, but we assume only one
         self.samples_per_frame = 10 * self.samples_per_bit
 
-        self.wav_file = wav_file
+        self.demod = demod.new_demod(self.samples_per_bit)
+
+        self.frame_bytes = self.sample_width * self.channels
+        self.raw_ring = ring.ByteRing(int(ring_secs * self.framerate) * self.frame_bytes)
+        self.reported_overruns = {}
 
-        self.record_session = wav_file is not None
-        self.session_buffer = []
+        self.wav_max = wav_max
+        self.wav_file = None
+        self.recorder = None
+        self.set_wav_filename(wav_file)
 
-        self.bufr = []
-        self.char_buf = []
+        self.char_buf = ring.ByteRing(CHAR_BUF_SIZE)
+        self.alts = [] # (scale, demod, buffer) for each alternate decoder
+        self.samples_seen = 0 # Since the stats were reset
+        self.capture_req = None # Set while capture() is waiting for audio
 
         self.is_started = False
         self.is_done = False
-
-
-    def _to_samples(self, binf, num):
-        return struct.unpack('<'+str(self.channels * num)+'h', binf)
-
-
-    def _filtered(self, buf, thold):
-        filt = []
-        i = 1
-        last = len(buf)
-        while i < last:
-            val = 0
-            diff = buf[i-1] - buf[i]
-            if diff > 0 and float(diff) / MAX_SHORT > thold:
-                val = TRIGGER_VAL
-            filt.append(val)
-            i += 1
-        return filt
+        self.reopen = False # Set when the stream must be reopened with new buffering
+        self.set_buffering(frames_per_buffer, latency)
 
 
     def _callback(self, in_data, frame_count, time_info, status):
-        if self.record_session:
-            self.session_buffer.extend(list(in_data))
-        self.bufr.extend(self._to_samples(in_data, frame_count))
-        fb = self._filtered(self.bufr, self.sensitivity)
-        p2 = self._decode_buffer(fb)
-        self.bufr = self.bufr[p2:]
+        rec = self.recorder
+        if rec:
+            rec.write(in_data)
+        self.raw_ring.write(in_data)
 
         return (in_data, pa.paContinue)
 
 
-    def _start_rx(self):
-        if self.is_started:
-            return
+    def _decode_pending(self):
+        """Decode the raw audio that has been queued by the callback"""
+        n = len(self.raw_ring)
+        n -= n % self.frame_bytes
+        if n > 0:
+            dat = self.raw_ring.read(n)
+            cap = self.capture_req
+            if cap and not cap.done.is_set():
+                cap.data += dat
+                if len(cap.data) >= cap.size:
+                    cap.done.set()
+            samps = self._select_channel(self.demod.to_samples(dat, n / self.sample_width))
+            self.samples_seen += len(samps)
+            thold = self.agc.update(samps)
+            if self.agc_on:
+                self.sensitivity = thold
+            # Alternates first, so that they hold a packet by the time that
+            # the main buffer does.
+            for scale, d, buf in self.alts:
+                chars = d.feed(samps, min(self.sensitivity * scale, ALT_MAX_SENS))
+                if chars:
+                    buf.write(bytearray(chars))
+            self._put_bytes(self.demod.feed(samps, self.sensitivity))
+        self._report_overruns()
+
+
+    def _select_channel(self, samps):
+        """The samples to decode from interleaved stereo samples"""
+        if self.channels != 2:
+            return samps
+        # Only switch between frames
+        if self.channel_sel.update(samps, self.demod.pos < 0):
+            for d in self._demods():
+                d.clear_history()
+        return self.channel_sel.mono(samps)
+
+
+    def set_channel_mode(self, mode):
+        """Set how a stereo input is decoded; one of agc.CHANNEL_MODES"""
+        self.channel_sel.set_mode(mode)
+        for d in self._demods():
+            d.clear_history()
+
+
+    def channel_in_use(self):
+        """Name of the channel that is decoded"""
+        if self.channels != 2:
+            return 'mono'
+        return self.channel_sel.channel_in_use()
+
+
+    def _put_bytes(self, chars):
+        if chars:
+            self.char_buf.write(bytearray(chars))
+
+
+    def _report_overruns(self):
+        for rng, what in ((self.raw_ring, 'audio'), (self.char_buf, 'data')):
+            overruns = rng.overruns
+            if overruns != self.reported_overruns.get(what, 0):
+                self.reported_overruns[what] = overruns
+                log.w('Rx ring overrun: {} bytes of {} dropped'.format(rng.dropped, what))
+
+
+    def set_buffering(self, frames_per_buffer, latency):
+        """Set the frames per buffer; None for the default. An open stream is reopened."""
+        self.buffer_frames = util.buffer_frames(self.framerate, frames_per_buffer, latency, BUFFER_FRAMES)
+        self.reopen = self.is_started
+
+
+    def ring_stats(self):
+        return self.raw_ring.stats()
+
+
+    def set_sensitivity(self, sensitivity):
+        self.sensitivity = sensitivity
+        if self.agc_on:
+            self.agc.reset(sensitivity)
+
+
+    def _demods(self):
+        return [self.demod] + [d for scale, d, buf in self.alts]
+
+
+    def set_reject_errors(self, on):
+        """Whether bytes with framing errors are dropped"""
+        for d in self._demods():
+            d.reject_errors = on
+
+
+    def set_detector(self, detector, confidence=None):
+        """Use the 'threshold' or 'matched' pulse detector"""
+        for d in self._demods():
+            d.detector = detector
+            if confidence is not None:
+                d.match_confidence = confidence
+
+
+    def set_alternates(self, on):
+        """Turn the alternate decoders on or off"""
+        self.alts = []
+        if on:
+            for scale in ALT_SCALES:
+                d = demod.new_demod(self.samples_per_bit)
+                d.reject_errors = self.demod.reject_errors
+                d.detector = self.demod.detector
+                d.match_confidence = self.demod.match_confidence
+                self.alts.append((scale, d, ring.ByteRing(CHAR_BUF_SIZE)))
+
+
+    def alternates(self):
+        """The bytes in the buffer of each alternate decoder"""
+        return [bytearray(buf.peek(CHAR_BUF_SIZE)) for scale, d, buf in self.alts]
+
+
+    def clear_alternates(self):
+        for scale, d, buf in self.alts:
+            buf.clear()
+
+
+    def set_agc(self, on):
+        """Turn the adaptive threshold on or off"""
+        self.agc_on = on
+
+
+    def capture(self, secs):
+        """
+            Return secs of the raw audio that is being received. Less is
+            returned if the audio does not arrive in time.
+        """
+        size = int(secs * self.framerate) * self.frame_bytes
+        cap = util.AttrBag(data=bytearray(), size=size, done=threading.Event())
+        self.capture_req = cap
+        cap.done.wait(secs + CAPTURE_SLACK_SECS)
+        self.capture_req = None
+        dat = str(cap.data[:size])
+        if self.channels == 2:
+            # Decoders of recordings expect mono
+            samps = self.channel_sel.mono(self.demod.to_samples(dat, len(dat) / self.sample_width))
+            dat = struct.pack('<'+str(len(samps))+'h', *[min(max(s, -MAX_SHORT-1), MAX_SHORT) for s in samps])
+        return dat
+
+
+    def bit_rate(self):
+        """The sender's bit rate, as estimated from the received frames"""
+        return self.framerate / self.demod.period
+
+
+    def stats(self):
+        """Link-quality counters since the last reset_stats()"""
+        d = self.demod
+        secs = self.samples_seen / float(self.framerate)
+        bytes_per_sec = 0.0
+        if secs:
+            bytes_per_sec = (d.frames - d.rejected) / secs # Bytes passed on
+        return util.AttrBag(
+            frames        = d.frames,
+            stop_errors   = d.stop_errors,
+            rejected      = d.rejected,
+            spurious      = d.spurious,
+            dropped       = self.char_buf.stats().dropped,
+            snr           = self.agc.snr(),
+            bytes_per_sec = bytes_per_sec,
+            bit_rate      = self.bit_rate(),
+            sensitivity   = self.sensitivity,
+            channel       = self.channel_in_use(),
+            audio         = self.raw_ring.stats(),
+        )
+
+
+    def reset_stats(self):
+        self.demod.clear_stats()
+        self.samples_seen = 0
+        self.raw_ring.reset_stats()
+        self.char_buf.reset_stats()
+        self.reported_overruns = {}
+
+
+    def _open_stream(self):
         self.stream = self.pa.open(format=self.pa.get_format_from_width(self.sample_width),
                         channels=self.channels,
                         rate=self.framerate,
                         input=True,
+                        frames_per_buffer=self.buffer_frames,
                         stream_callback=self._callback)
         self.stream.start_stream()
 
-        while not self.is_done:
-            time.sleep(0.1)
 
+    def _close_stream(self):
         self.stream.stop_stream()
         self.stream.close()
+
+
+    def _start_rx(self):
+        if self.is_started:
+            return
+        self._open_stream()
+
+        while not self.is_done:
+            if self.reopen:
+                self.reopen = False
+                self._close_stream()
+                self._open_stream()
+            if self.raw_ring.wait(self.frame_bytes, 0.1):
+                self._decode_pending()
+
+        self._close_stream()
         self.pa.terminate()
 
 
     def all_done(self):
         if self.is_done or not self.is_started:
             return
-        if self.wav_file:
-            self.write_wav(self.wav_file, bytearray(self.session_buffer))
         self.is_done = True
         self.thread.join()
+        self.set_wav_filename(None)
 
 
     def set_wav_filename(self, filename):
-        if self.wav_file:
-            self.write_wav(self.wav_file, bytearray(self.session_buffer))
+        """Finish the current recording, if any, and record to filename"""
+        old = self.recorder
         self.wav_file = filename
-        self.record_session = self.wav_file is not None
-        self.session_buffer = []
-
-
-    def _decode_buffer(self, buf):
-        buflen = len(buf)
-        i = 0
-        while i + self.samples_per_frame < buflen:
-            if buf[i] == TRIGGER_VAL:
-                self._decode_frame(buf[i: i + self.samples_per_frame])
-                i += self.samples_per_frame
-            else:
-                i += 1
-        return i
-
-
-    def _edge_triggers(self, frame):
-        edges = []
-        frame_len = len(frame)
-        i = 0
-        while i < frame_len:
-            if frame[i] == TRIGGER_VAL:
-                edges.append(i)
-                i += int(self.samples_per_bit / 2)
-            else:
-                i += 1
-        return edges
-
-
-    def _decode_frame(self, frame):
-        edges = self._edge_triggers(frame)
-        in_ch = 0xff
-        for e in edges[1:]: # Skip start-bit
-            epos = float(e) / self.samples_per_bit
-            if epos < 1.5:
-                in_ch = in_ch & ~0x01
-                continue
-            if epos < 2.5:
-                in_ch = in_ch & ~0x02
-                continue
-            if epos < 3.5:
-                in_ch = in_ch & ~0x04
-                continue
-            if epos < 4.5:
-                in_ch = in_ch & ~0x08
-                continue
-            if epos < 5.5:
-                in_ch = in_ch & ~0x10
-                continue
-            if epos < 6.5:
-                in_ch = in_ch & ~0x20
-                continue
-            if epos < 7.5:
-                in_ch = in_ch & ~0x40
-                continue
-            if epos < 8.5:
-                in_ch = in_ch & ~0x80
-                continue
-            # ignore anything larger
-        self.char_buf.append(in_ch)
+        self.recorder = None
+        if filename:
+            self.recorder = recorder.WavRecorder(filename, self.channels, self.sample_width, self.framerate, self.wav_max)
+        if old:
+            old.close()
 
 
     def peek_bytes(self, n):
         """Peek at a max of n bytes in buffer"""
-        return self.char_buf[0:n]
+        return bytearray(self.char_buf.peek(n))
 
 
     def read_bytes(self, n):
         """Read a max of n bytes from buffer"""
-        buf = self.char_buf[0:n]
-        self.char_buf = self.char_buf[n:]
-        return buf
+        return self.char_buf.read(n)
+
+
+    def num_bytes(self):
+        """Number of bytes in buffer"""
+        return len(self.char_buf)
+
+
+    def wait_for_bytes(self, n, timeout):
+        """Wait until n bytes are in buffer. Returns False on timeout."""
+        return self.char_buf.wait(n, timeout)
+
+
+    def read_until(self, delim, timeout):
+        """
+            Wait for delim to be received, then read bytes up to and including
+            it. delim may be a byte value or a string. Returns None on timeout.
+        """
+        if isinstance(delim, int):
+            delim = chr(delim)
+        n = self.char_buf.wait_for(delim, timeout)
+        if n < 0:
+            return None
+        return self.char_buf.read(n)
 
 
     def run(self):
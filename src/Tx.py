@@ -1,164 +1,430 @@
 #XXX
+import math
+import Queue
 import time
 import threading
 import wave
 import struct
+import demod
 import pa
+import recorder
+import util
 
 
 MAX_SHORT = ((2**16) / 2) - 1
 
-CHK = 512
+CHK = 512 # Frames per buffer, if neither a size nor a latency is given
+
+# Silence after the data of each write, so that the data has drained from
+# the sound card before the stream is stopped. Used if no latency is given.
+TAIL_FRAMES = 2048 # 2048 is arbitrary.
+
+# Writes are waited for in steps of this, so that they can be interrupted
+WAIT_SECS = 0.5
+
+STOP_SECS = 2.0 # Longest that all_done() waits for a write in progress to stop
+
+# Lead, start-bit, 8 data-bits, 2 stop-bits
+BITS_PER_BYTE = 12
 
 
 def now():
     return time.time()
 
 
-def pad_silence(start_time, channels, framerate, sample_width):
-    time_span = now() - start_time
-    samps = int(channels * framerate * sample_width * time_span)
-    aligned_samples = samps + (samps % sample_width)
-    return aligned_samples * [0]
+def pack_samples(samps):
+    return struct.pack('<'+str(len(samps))+'h', *samps)
+
+
+def silence_frames(start_time, framerate):
+    """Number of frames of silence since start_time"""
+    return int(framerate * (now() - start_time))
+
+
+def wait_event(event, timeout=None):
+    """Wait for event to be set. False if timeout (in seconds) passes first."""
+    # An Event.wait() without a timeout cannot be interrupted with Ctrl-C.
+    left = timeout
+    while True:
+        step = WAIT_SECS
+        if left is not None:
+            step = min(step, left)
+        if event.wait(step):
+            return True
+        if left is not None:
+            left -= step
+            if left <= 0:
+                return False
+
+
+
+class TxWrite:
+    """
+        A write that has been queued by Tx.write_async(). done is set once
+        the bytes have been played, or given up on; ok tells which. If the
+        write raised an exception, it is in error.
+    """
+
+    def __init__(self, bytes):
+        self.bytes = bytes
+        self.ok = False
+        self.error = None
+        self.done = threading.Event()
+
+
+    def finish(self, ok):
+        self.ok = ok
+        self.done.set()
+
+
+    def fail(self, error):
+        self.error = error
+        self.finish(False)
+
+
+    def wait(self, timeout=None):
+        """
+            Wait for the write to finish. Returns ok, or False if timeout
+            passes first. Raises the write's exception, if it had one.
+        """
+        if not wait_event(self.done, timeout):
+            return False
+        if self.error:
+            raise self.error
+        return self.ok
 
 
 class Tx:
 
     bits_per_sec = 2400
 
-    def __init__(self, samp_width, chan, framerate, show_init, wav_file):
+    def __init__(self, samp_width, chan, framerate, show_init, wav_file, wav_max=None, frames_per_buffer=None, latency=None):
         self.pa = pa.get_instance(show_init)
 
         self.sample_width = samp_width
         self.channels = chan
         self.framerate = framerate
 
-        self.stop_bits = []
-        num_stopbits = 2
-
-        self.wavdat = ''
-        self.n = 0
+        self.pending = None # Iterator over the packed audio of the current write
+        self.spare = ''
+        self.busy = False
+        self.lock = threading.Lock()
         self.stream = None
+        self.continuous = False
 
-        self.wav_file = wav_file
+        self.started_at = 0
 
-        self.record_session = False
-        self.session_buffer = []
-        if self.wav_file:
-            self.record_session = True
+        self.drained = threading.Event() # Set when the callback has passed on all of a write
+        self.completed_at = 0
+        self.write_timeout = None
+        self.reset_stats()
 
-        self.started_at = 0
+        self.queue = Queue.Queue() # TxWrites waiting to be played
+        self.sender = None
+        self.unplayed = 0 # TxWrites queued and not yet finished
+        self.play_lock = threading.Lock() # Held while a write plays
+
+        self.wav_max = wav_max
+        self.wav_file = None
+        self.recorder = None
+        self.set_wav_filename(wav_file)
 
         self.is_started = False
         self.is_done = False
 
-        samp_pulse = 1
-        samp_rem = int(round(float(self.framerate) / self.bits_per_sec)) - samp_pulse
-
-        self.zero_bit = (samp_pulse * [MAX_SHORT]) + (samp_rem * [0]) # Output a pulse for '0'
-        self.one_bit = (samp_pulse + samp_rem) * [0] # Output nothing for a '1'
+        self._set_framing()
+        self.set_buffering(frames_per_buffer, latency)
 
-        self.lead = self.one_bit
-        self.start_bit = self.zero_bit # Output a zero (pulse) to start
-        for _ in range(num_stopbits):
-            self.stop_bits += self.one_bit # A stop_bit == a one_bit
 
+    def _set_framing(self):
+        """Compute the bit timing, and the table of packed bytes, for the framerate"""
+        # Bit k of a byte starts at sample bit_starts[k]. Each start is
+        # rounded separately, so a framerate that is not a multiple of
+        # bits_per_sec does not make errors add up across the byte.
+        self.samples_per_bit = float(self.framerate) / self.bits_per_sec
+        self.bit_starts = [int(round(k * self.samples_per_bit)) for k in range(BITS_PER_BYTE + 1)]
+        self.byte_table = [pack_samples(self._encode_byte(byte)) for byte in range(256)]
 
-    def _callback(self, in_data, frame_count, time_info, status):
-        dd = self.sample_width * frame_count
-        beg = self.n * dd
-        end = beg + dd
-        data = self.wavdat[beg:end]
 
-        if self.record_session:
+    def _record(self, data):
+        rec = self.recorder
+        if rec:
             if self.started_at:
-                self.session_buffer.extend(pad_silence(self.started_at, self.channels, self.framerate, self.sample_width))
+                rec.write_silence(silence_frames(self.started_at, self.framerate))
                 self.started_at = 0
-            self.session_buffer.extend(data)
+            rec.write(data)
+
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        size = self.sample_width * frame_count
+        if self.continuous:
+            return self._fill(size)
+
+        with self.lock:
+            data = self._read(size)
+            done = len(data) == 0 and self.busy
+            if done:
+                self.busy = False
+        self._record(data)
 
-        self.n += 1
         if len(data) == 0:
             self.started_at = now()
+            if done: # Not if the write has timed out
+                self.completed_at = self.started_at
+                self.drained.set()
             return (data, pa.paComplete)
         return (data, pa.paContinue)
 
 
-    def _start_tx(self):
-        if self.is_started:
-            return
+    def _fill(self, size):
+        """Callback for a continuous stream: the current write, else silence"""
+        with self.lock:
+            data = self._read(size)
+            done = self.busy and self.pending is None and not self.spare
+            if done:
+                self.busy = False
+        data += (size - len(data)) * '\x00'
+        self._record(data)
+        if done:
+            self.completed_at = now()
+            self.drained.set()
+        return (data, pa.paContinue)
+
 
+    def set_continuous(self, on):
+        """
+            Whether the stream is kept running between writes, playing
+            silence. Writes then start without waiting for the sound card,
+            and need no silence after them. An open stream is reopened.
+        """
+        if on == self.continuous:
+            return
+        self.continuous = on
+        if self.is_started and not self.is_done:
+            self.stream.close()
+            self._open_stream()
+
+
+    def set_buffering(self, frames_per_buffer, latency):
+        """
+            Set the frames per buffer, and the latency (in seconds) that the
+            silence after each write allows for. None for the defaults. An
+            open stream is reopened.
+        """
+        chk = util.buffer_frames(self.framerate, frames_per_buffer, latency, CHK)
+        tail = TAIL_FRAMES
+        if latency:
+            tail = int(math.ceil(latency * self.framerate))
+        self.buffer_frames = chk
+        self.tail_frames = chk * int(math.ceil(float(tail) / chk))
+        if self.is_started and not self.is_done:
+            self.stream.close()
+            self._open_stream()
+
+
+    def _open_stream(self):
         self.stream = self.pa.open(format=self.pa.get_format_from_width(self.sample_width),
                         channels=self.channels,
                         rate=self.framerate,
                         stream_callback=self._callback,
-                        frames_per_buffer=CHK,
+                        frames_per_buffer=self.buffer_frames,
                         output=True,
                         )
 
-        # We need to start and stop the stream for the first transfer to succeed.
+        # We need to start and stop the stream for the first transfer to
+        # succeed. A continuous stream is left running.
         self.stream.start_stream()
-        self.stream.stop_stream()
+        if not self.continuous:
+            self.stream.stop_stream()
+
+
+    def _start_tx(self):
+        if self.is_started:
+            return
+
+        self._open_stream()
 
         if self.wav_file:
             self.started_at = now()
         self.is_started = True
 
 
-    def write_bytes(self, bytes):
+    def write_async(self, bytes):
+        """
+            Queue bytes to be played, and return at once. Returns a TxWrite
+            for them. Writes are played in the order they were queued.
+        """
+        w = TxWrite(bytes)
         if self.is_done:
-            return
-        bb = self._encode_bytes(bytes)
-        diff = (CHK - (len(bb) % CHK))
-        bb.extend(diff * [0])
-        bb.extend(2048 * [0]) # 2048 is arbitrary.
-        self.wavdat = struct.pack('<'+str(len(bb))+'h', *bb)
-        self.n = 0
+            w.finish(False)
+            return w
+        if self.sender is None:
+            self.sender = threading.Thread(target=self._send_queued)
+            self.sender.daemon = True
+            self.sender.start()
+        with self.lock:
+            self.unplayed += 1
+        self.queue.put(w)
+        return w
 
-        self.stream.start_stream()
-        while self.stream.is_active():
-           time.sleep(0.1)
-        self.stream.stop_stream()
 
-
-    def _encode_bit(self, bit):
-        if bit == 1:
-            return self.one_bit
-        return self.zero_bit
+    def write_bytes(self, bytes):
+        """Play bytes and wait for them. Returns False if they were not played."""
+        if self.unplayed:
+            # Play after the queued writes
+            return self.write_async(bytes).wait()
+        # Played on this thread, so that only one wait stands between the
+        # end of the audio and the caller.
+        with self.play_lock:
+            return self._play(bytes)
+
+
+    def _send_queued(self):
+        while True:
+            w = self.queue.get()
+            if w is None:
+                break
+            ok = False
+            error = None
+            try:
+                with self.play_lock:
+                    ok = self._play(w.bytes)
+            except Exception as ex:
+                error = ex
+            with self.lock:
+                self.unplayed -= 1
+            if error:
+                w.fail(error)
+            else:
+                w.finish(ok)
+
+
+    def _play(self, bytes):
+        if self.is_done:
+            return False
+        self.drained.clear()
+        with self.lock:
+            self.spare = ''
+            self.pending = self._frames(bytes, not self.continuous)
+            self.busy = True
+
+        if not self.continuous:
+            self.stream.start_stream()
+        ok = wait_event(self.drained, self.write_timeout)
+        if not ok:
+            with self.lock:
+                self.pending = None
+                self.busy = False
+            self.timeouts += 1
+        if not self.continuous:
+            # stop_stream() returns once the sound card has played what it was given
+            self.stream.stop_stream()
+        if self.completed_at:
+            self.writes += 1
+            drain = now() - self.completed_at
+            self.drain_secs += drain
+            self.max_drain_secs = max(self.max_drain_secs, drain)
+            self.completed_at = 0
+        return ok and not self.is_done
+
+
+    def set_write_timeout(self, secs):
+        """Most seconds that a write may take to play, or None for no limit"""
+        self.write_timeout = secs
+
+
+    def stats(self):
+        avg = 0.0
+        if self.writes:
+            avg = self.drain_secs / self.writes
+        return util.AttrBag(
+            writes    = self.writes,
+            drain     = avg,
+            max_drain = self.max_drain_secs,
+            timeouts  = self.timeouts,
+        )
+
+
+    def reset_stats(self):
+        self.writes = 0
+        self.drain_secs = 0.0
+        self.max_drain_secs = 0.0
+        self.timeouts = 0
 
 
     def _encode_byte(self, byte):
-        buf = []
-        buf.extend(self.lead)
-        buf.extend(self.start_bit)
-        for _ in range(8):
-            buf.extend(self._encode_bit(byte & 0x01))
+        # Output a pulse for '0'; output nothing for a '1'. The pulse shape
+        # is demod.TX_PULSE, which the matched detector also uses.
+        buf = self.bit_starts[-1] * [0]
+        zeros = [1] # Start-bit is a zero
+        for k in range(2, 10):
+            if not byte & 0x01:
+                zeros.append(k)
             byte >>= 1
-        buf.extend(self.stop_bits)
+        for k in zeros:
+            start = self.bit_starts[k]
+            for i, v in enumerate(demod.TX_PULSE):
+                buf[start + i] = int(MAX_SHORT * v)
         return buf
 
 
-    def _encode_bytes(self, bytes):
-        buf = []
+    def _frames(self, bytes, pad=True):
+        """
+            Yields the packed samples of each of bytes, then, if pad, the
+            silence that pads them to a whole buffer and the tail after them.
+            The audio is made as the callback asks for it, so only about one
+            buffer of it is held at a time.
+        """
+        table = self.byte_table
+        frames = 0
         for byte in bytes:
-            buf.extend(self._encode_byte(byte))
-        return buf
+            data = table[byte]
+            frames += len(data) / 2
+            yield data
+        if not pad:
+            return
+        chk = self.buffer_frames
+        yield ((chk - (frames % chk)) + self.tail_frames) * '\x00\x00'
+
+
+    def _read(self, size):
+        """The next size bytes of audio of the current write; fewer at its end"""
+        data = self.spare
+        while len(data) < size and self.pending is not None:
+            try:
+                data += next(self.pending)
+            except StopIteration:
+                self.pending = None
+        self.spare = data[size:]
+        return data[:size]
 
 
     def all_done(self):
         if self.is_done or not self.is_started:
             return
         self.is_done = True
+        if self.sender:
+            # Stop a write in progress, and let the sender finish before
+            # the stream is closed under it.
+            with self.lock:
+                self.pending = None
+                self.busy = False
+            self.drained.set()
+            self.queue.put(None)
+            self.sender.join(STOP_SECS)
         self.stream.close()
-        if self.wav_file:
-            self.write_wav(self.wav_file, bytearray(self.session_buffer))
+        self.set_wav_filename(None)
 
 
     def set_wav_filename(self, filename):
-        if self.wav_file:
-            self.write_wav(self.wav_file, bytearray(self.session_buffer))
+        """Finish the current recording, if any, and record to filename"""
+        old = self.recorder
         self.wav_file = filename
-        self.record_session = self.wav_file is not None
-        self.session_buffer = []
+        self.recorder = None
+        if filename:
+            self.recorder = recorder.WavRecorder(filename, self.channels, self.sample_width, self.framerate, self.wav_max)
+        if old:
+            old.close()
 
 
     # A thread is not needed for Tx, but we mimic the Rx interface.
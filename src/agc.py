@@ -0,0 +1,158 @@
+import math
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from demod import MAX_SHORT
+
+# Adaptive Rx threshold. This module does not use PyAudio.
+
+MIN_SENS = 0.02 # The threshold never goes below this
+
+NOISE_MARGIN = 2.0 # A block is signal if its level is this many times the noise floor
+
+PEAK_SECS = 1.0 # Time for the peak to follow a weaker signal
+
+FLOOR_SECS = 5.0 # Time for the noise floor to follow rising noise
+
+# How a stereo input is decoded: from the stronger channel, from one
+# channel, or from the sum of both.
+CHANNEL_MODES = ('auto', 'left', 'right', 'mix')
+
+CHANNEL_NAMES = ('left', 'right')
+
+# In 'auto' mode, the other channel must be this much stronger to switch to it.
+CHANNEL_HYSTERESIS = 1.25
+
+
+def block_level(samps):
+    """Largest falling edge in samps, as a fraction of MAX_SHORT"""
+    if len(samps) < 2:
+        return 0.0
+    if numpy is not None and isinstance(samps, numpy.ndarray):
+        diff = int((samps[:-1] - samps[1:]).max())
+    else:
+        diff = max(map(operator.sub, samps[:-1], samps[1:]))
+    return max(diff, 0) / float(MAX_SHORT)
+
+
+
+def mix(left, right):
+    if numpy is not None and isinstance(left, numpy.ndarray):
+        return left + right
+    return map(operator.add, left, right)
+
+
+
+class Agc:
+    """
+        Keeps the Rx threshold halfway between the noise floor and the peak
+        of the received pulses, much as wavdecode.compute_sens does for a
+        whole recording.
+
+        Each block of samples is reduced to its largest falling edge. The
+        floor follows the quietest blocks; the peak follows blocks that are
+        well above the floor. Until a signal has been seen, the initial
+        threshold is used.
+    """
+
+    def __init__(self, sensitivity, framerate):
+        self.framerate = framerate
+        self.reset(sensitivity)
+
+
+    def reset(self, sensitivity):
+        self.threshold = sensitivity
+        self.floor = None
+        self.peak = None
+
+
+    def snr(self):
+        """Ratio of the pulse peak to the noise floor in dB, or None if unknown"""
+        if self.peak is None or not self.floor:
+            return None
+        return 20 * math.log10(self.peak / self.floor)
+
+
+    def _weight(self, n, secs):
+        """How far an estimate moves towards a block of n samples"""
+        return 1 - math.exp(-float(n) / (secs * self.framerate))
+
+
+    def update(self, samps):
+        """Adjust the estimates for a block of samples. Returns the threshold."""
+        n = len(samps)
+        if n < 2:
+            return self.threshold
+        level = block_level(samps)
+
+        if self.floor is None or level < self.floor:
+            self.floor = level
+        quiet = max(self.floor * NOISE_MARGIN, MIN_SENS)
+        if level <= quiet:
+            self.floor += (level - self.floor) * self._weight(n, FLOOR_SECS)
+            quiet = max(self.floor * NOISE_MARGIN, MIN_SENS)
+        elif self.peak is None or level > self.peak:
+            self.peak = level
+        else:
+            self.peak += (level - self.peak) * self._weight(n, PEAK_SECS)
+
+        if self.peak is not None:
+            self.threshold = max((self.floor + self.peak) / 2, quiet)
+        return self.threshold
+
+
+
+class ChannelSelector:
+    """
+        Picks the samples to decode from interleaved stereo samples, for
+        one of CHANNEL_MODES. In 'auto' mode, each channel is measured by
+        an Agc, and the channel with the stronger pulses is used.
+    """
+
+    def __init__(self, framerate, mode='auto'):
+        self.agcs = [Agc(MIN_SENS, framerate) for _ in CHANNEL_NAMES]
+        self.channel = 0 # Channel that 'auto' decodes from
+        self.set_mode(mode)
+
+
+    def set_mode(self, mode):
+        if mode not in CHANNEL_MODES:
+            raise Exception('Unknown channel mode: {}'.format(mode))
+        self.mode = mode
+
+
+    def update(self, samps, can_switch=True):
+        """
+            Measure both channels of samps. In 'auto' mode, switch to the
+            other channel if it is stronger and can_switch. Returns True if
+            the channel was switched.
+        """
+        if self.mode != 'auto':
+            return False
+        for a, c in zip(self.agcs, (samps[0::2], samps[1::2])):
+            a.update(c)
+        # Until a channel has seen pulses, its level is all that is known
+        peaks = [a.peak or a.floor or 0 for a in self.agcs]
+        other = 1 - self.channel
+        if can_switch and peaks[other] > CHANNEL_HYSTERESIS * peaks[self.channel]:
+            self.channel = other
+            return True
+        return False
+
+
+    def mono(self, samps):
+        """The samples of the channel in use, or of the mix"""
+        chans = (samps[0::2], samps[1::2])
+        if self.mode == 'mix':
+            return mix(*chans)
+        return chans[CHANNEL_NAMES.index(self.channel_in_use())]
+
+
+    def channel_in_use(self):
+        if self.mode == 'auto':
+            return CHANNEL_NAMES[self.channel]
+        return self.mode
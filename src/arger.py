@@ -90,8 +90,13 @@ def _add_kermit_group(parser):
 def _add_config_group(parser):
     group = parser.add_argument_group('config')
     group.add_argument('--wavprefix', action="store", metavar='PREFIX', help='Write WAV files. Filenames will start with prefix')
+    group.add_argument('--wavmax', action="store", metavar='MB', help='Start a new WAV file when one reaches MB megabytes', type=float)
     group.add_argument('--framerate', action="store", metavar='RATE', help='Set framerate of WAV files.', type=int)
     group.add_argument('--sensitivity', action="store", metavar='FLOAT', help='Rx sensitivity [0.0 - 1.0]', type=float)
+    group.add_argument('--rxring', action="store", metavar='SECS', help='Seconds of audio the Rx ring buffer can hold', type=float)
+    group.add_argument('--buffer', action="store", metavar='FRAMES', help='Frames per sound card buffer', type=int)
+    group.add_argument('--latency', action="store", metavar='SECS', help='Sound card latency. Sets the buffer size, if --buffer is not given', type=float)
+    group.add_argument('--stereo', action="store_true", help='Receive in stereo and decode from the stronger channel')
     group.add_argument('--showinit', action="store_true", help='Show PyAudio initialization')
     group.add_argument('-l', '--log', action='count', help='Logging verbosity. See details below.', default=5)
     group.add_argument('--init', metavar='SCRIPT', action="store",  help = "Run script on start. Use '--init=' to disable. (default: hpir.ini)", default='hpir.ini')
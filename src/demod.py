@@ -0,0 +1,459 @@
+import bisect
+import math
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Demodulation of the received signal. This module does not use PyAudio.
+
+MAX_SHORT = ((2**16) / 2) - 1
+
+TRIGGER_VAL = int(MAX_SHORT * 0.75) # Arbitrary
+
+# 10 == 1 start-bit, 8 data-bits, 1 stop-bits
+# Calc sends two stop bits, but we assume only one
+BITS_PER_FRAME = 10
+
+# Spec says min-2340 and max=2460 bit/s, i.e. 2400 +/- 2.5%.
+MAX_DRIFT = 0.025
+
+TRACK_GAIN = 0.25 # Fraction of a frame's timing error that is corrected
+
+TRACK_MIN_SPAN = 3 # A frame needs an edge at bit 3 or later to adjust timing
+
+PERIOD_STEPS = 256 # Tracked bit periods are rounded to 1/PERIOD_STEPS of a bit
+
+EDGE_TOLERANCE = 0.375 # Max distance, in bits, of an edge from the start of its bit
+
+FRAMING_ERROR = 0x100 # Flags an edge position that a valid frame cannot have
+
+TX_PULSE = [1] # Shape of the pulse Tx sends for a zero bit, as fractions of full scale
+
+MATCH_CONFIDENCE = 0.8 # Min similarity of an edge to the template for the matched detector
+
+
+def frame_to_byte(edges, samples_per_bit):
+    """Convert edge positions (relative to the start-bit) to a byte"""
+    in_ch = 0xff
+    for e in edges[1:]: # Skip start-bit
+        epos = float(e) / samples_per_bit
+        if epos < 1.5:
+            in_ch = in_ch & ~0x01
+            continue
+        if epos < 2.5:
+            in_ch = in_ch & ~0x02
+            continue
+        if epos < 3.5:
+            in_ch = in_ch & ~0x04
+            continue
+        if epos < 4.5:
+            in_ch = in_ch & ~0x08
+            continue
+        if epos < 5.5:
+            in_ch = in_ch & ~0x10
+            continue
+        if epos < 6.5:
+            in_ch = in_ch & ~0x20
+            continue
+        if epos < 7.5:
+            in_ch = in_ch & ~0x40
+            continue
+        if epos < 8.5:
+            in_ch = in_ch & ~0x80
+            continue
+        # ignore anything larger
+    return in_ch
+
+
+def edge_template(pulse):
+    """
+        The falling differences that pulse makes on a silent line, scaled so
+        that the largest is 1. The matched detector looks for this shape.
+    """
+    padded = [0] + list(pulse) + [0]
+    diffs = [padded[i-1] - padded[i] for i in range(1, len(padded))]
+    top = float(max(abs(d) for d in diffs))
+    return [d / top for d in diffs]
+
+
+_mask_tables = {}
+
+def mask_table(samples_per_bit):
+    """
+        For each edge position in a frame (relative to the start-bit), the
+        data bits that an edge there clears. FRAMING_ERROR is added if an
+        edge there is in the stop-bit, or is not within EDGE_TOLERANCE of
+        the start of a bit (or 1.5 samples, at low sample rates). Tables
+        are shared between demodulators that use the same samples_per_bit.
+    """
+    table = _mask_tables.get(samples_per_bit)
+    if table is None:
+        spf = int(math.ceil(BITS_PER_FRAME * samples_per_bit))
+        # The start-bit and the edge are each off by up to half a sample
+        tol = max(EDGE_TOLERANCE, 1.5 / samples_per_bit)
+        table = []
+        for e in range(spf):
+            epos = float(e) / samples_per_bit
+            mask = 0xff ^ frame_to_byte([0, e], samples_per_bit)
+            if epos >= 8.5 or abs(epos - round(epos)) > tol:
+                mask |= FRAMING_ERROR
+            table.append(mask)
+        _mask_tables[samples_per_bit] = table
+    return table
+
+
+
+class ListDemod:
+    """
+        Decodes samples held in Python lists. Used when NumPy is unavailable.
+
+        feed() decodes a stream of samples incrementally. Only the previous
+        sample and the frame that is in progress are carried between calls,
+        so each sample is examined exactly once.
+    """
+
+    name = 'list'
+
+    track_drift = True
+
+    reject_errors = True # Drop frames that have a framing error
+
+    # 'threshold' takes any falling edge above the threshold as a pulse.
+    # 'matched' correlates the falling edges with template, and takes each
+    # correlation peak above the threshold whose shape is close enough to
+    # the template. Noise spikes and steps have the wrong shape.
+    detector = 'threshold'
+
+    template = edge_template(TX_PULSE)
+
+    match_confidence = MATCH_CONFIDENCE # Min cosine similarity of an edge to template
+
+    def __init__(self, samples_per_bit):
+        self.set_samples_per_bit(samples_per_bit)
+        self.clear_stats()
+
+
+    def clear_stats(self):
+        self.frames = 0      # Frames decoded by feed()
+        self.stop_errors = 0 # Frames with an edge in the stop-bit
+        self.rejected = 0    # Frames dropped because of a framing error
+        self.spurious = 0    # Triggers too close to an edge to be a bit
+
+
+    def set_samples_per_bit(self, samples_per_bit):
+        """
+            Change the nominal bit timing. samples_per_bit need not be a whole
+            number. Any frame in progress is discarded.
+        """
+        self.nominal_period = samples_per_bit
+        self.period_step = float(samples_per_bit) / PERIOD_STEPS
+        self.reset()
+
+
+    def _set_timing(self, samples_per_bit):
+        self.samples_per_bit = samples_per_bit
+        self.samples_per_frame = BITS_PER_FRAME * self.samples_per_bit
+        self.stop_start = int(math.ceil(8.5 * samples_per_bit)) # First edge past bit 8
+        self.masks = mask_table(samples_per_bit)
+
+
+    def _track(self, edges):
+        """
+            The sender's clock may differ from ours by up to MAX_DRIFT. Move
+            the bit period part way towards the period that best fits the
+            edges of a frame. Tables are only switched when the period moves
+            by a whole step, so they stay cached.
+        """
+        # Fit a line to (bit slot, edge position). The start-bit is a point
+        # like any other, so an error in its position does not bias the fit.
+        n = 1
+        sum_k = 0
+        sum_e = 0
+        sum_kk = 0
+        sum_ke = 0
+        last_k = 0
+        for e in edges[1:]:
+            k = int(round(e / self.samples_per_bit)) # Bit slot of the edge
+            if 1 <= k <= 8:
+                n += 1
+                sum_k += k
+                sum_e += e
+                sum_kk += k * k
+                sum_ke += k * e
+                last_k = k
+        if last_k < TRACK_MIN_SPAN:
+            return
+        fit = float(n * sum_ke - sum_k * sum_e) / (n * sum_kk - sum_k * sum_k)
+        period = self.period + TRACK_GAIN * (fit - self.period)
+        lo = self.nominal_period / (1 + MAX_DRIFT)
+        hi = self.nominal_period / (1 - MAX_DRIFT)
+        self.period = min(max(period, lo), hi)
+        stepped = round(self.period / self.period_step) * self.period_step
+        if stepped != self.samples_per_bit:
+            self._set_timing(stepped)
+
+
+    def _end_frame(self):
+        """Decode the frame that has been collected. Returns None if it is rejected."""
+        edges = self.edges
+        bits = self.frame_bits(edges)
+        self.frames += 1
+        if edges[-1] >= self.stop_start:
+            self.stop_errors += 1
+        if bits & FRAMING_ERROR:
+            if self.reject_errors:
+                self.rejected += 1
+                return None
+        elif self.track_drift:
+            self._track(edges)
+        return 0xff ^ (bits & 0xff)
+
+
+    def reset(self):
+        self.period = self.nominal_period # Tracked bit period
+        self._set_timing(self.nominal_period)
+        self.pos = -1      # Samples seen of the frame in progress; -1 if none
+        self.edges = []    # Edges of the frame in progress
+        self.next_edge = 0 # Earliest position of the next edge in the frame
+        self.clear_history()
+
+
+    def clear_history(self):
+        """Forget the samples of earlier calls, as when the input is switched"""
+        self.prev = None   # Last sample of the previous call to feed()
+        self.window = len(self.template) * [0] # Last falling edges, for the matched detector
+        self.last_corr = (0, 0, False) # Correlation before the last, last, and if the last matched
+
+
+    def triggers(self, samps, thold):
+        """Indexes of samples whose difference from the previous sample exceed thold"""
+        if self.detector == 'matched':
+            return self.matched_triggers(samps, thold)
+        trig = []
+        prev = self.prev
+        if prev is None and len(samps) > 0:
+            prev = samps[0]
+        i = 0
+        for samp in samps:
+            diff = prev - samp
+            if diff > 0 and float(diff) / MAX_SHORT > thold:
+                trig.append(i)
+            prev = samp
+            i += 1
+        self.prev = prev
+        return trig
+
+
+    def matched_triggers(self, samps, thold):
+        """
+            Indexes of samples that follow a correlation peak. A peak counts
+            if the correlation exceeds thold and the falling edges around it
+            match template with at least match_confidence. Every trigger is
+            one sample later than the peak, so no sample is held back for
+            the next call.
+        """
+        t = self.template
+        m = len(t)
+        norm = float(sum(x * x for x in t))
+        tlen = math.sqrt(norm)
+        lim = thold * MAX_SHORT
+        conf = self.match_confidence
+        window = self.window
+        c2, c1, good1 = self.last_corr
+        trig = []
+        prev = self.prev
+        if prev is None and len(samps) > 0:
+            prev = samps[0]
+        i = 0
+        for samp in samps:
+            window = window[1:] + [prev - samp]
+            prev = samp
+            dot = sum(t[j] * window[j] for j in range(m))
+            c = dot / norm
+            if good1 and c1 >= c2 and c1 > c:
+                trig.append(i)
+            good = c > lim and dot >= conf * tlen * math.sqrt(sum(w * w for w in window))
+            c2, c1, good1 = c1, c, good
+            i += 1
+        self.prev = prev
+        self.window = window
+        self.last_corr = (c2, c1, good1)
+        return trig
+
+
+    def frame_bits(self, edges):
+        """Data bits cleared by edges (relative to the start-bit), and FRAMING_ERROR"""
+        masks = self.masks
+        bits = 0
+        for e in edges[1:]: # Skip start-bit
+            bits |= masks[e]
+        return bits
+
+
+    def frame_byte(self, edges):
+        """Convert edge positions (relative to the start-bit) to a byte"""
+        return 0xff ^ (self.frame_bits(edges) & 0xff)
+
+
+    def feed(self, samps, thold):
+        """Decode samples; return the bytes whose frames were completed."""
+        return self._feed_triggers(self.triggers(samps, thold), len(samps))
+
+
+    def feed_frames(self, samps, thold):
+        """
+            Like feed(), but returns (start, byte) pairs. start is the index in
+            samps of the start-bit; it is negative if the frame began in an
+            earlier call.
+        """
+        starts = []
+        chars = self._feed_triggers(self.triggers(samps, thold), len(samps), starts)
+        return zip(starts, chars)
+
+
+    def _frame_edges(self, trig, k, base, end):
+        """
+            Add edges of the frame that starts at base and ends before end.
+            Returns index of the first trigger that was not considered.
+        """
+        half = int(self.samples_per_bit / 2)
+        ntrig = len(trig)
+        nedges = len(self.edges)
+        j = bisect.bisect_left(trig, base + self.next_edge, k)
+        while j < ntrig and trig[j] < end:
+            e = trig[j] - base
+            self.edges.append(e)
+            self.next_edge = e + half
+            j = bisect.bisect_left(trig, base + self.next_edge, j + 1)
+        # Triggers that were skipped were within half a bit of an edge
+        self.spurious += (j - k) - (len(self.edges) - nedges)
+        return j
+
+
+    def _feed_triggers(self, trig, n, starts=None):
+        chars = []
+        k = 0
+        i = 0 # Scan position
+        if self.pos >= 0:
+            base = -self.pos
+            end = base + self.samples_per_frame
+            k = self._frame_edges(trig, 0, base, end)
+            if end > n:
+                self.pos = n - base
+                return chars
+            self._put_frame(chars, starts, base)
+            self.pos = -1
+            i = end
+        ntrig = len(trig)
+        while True:
+            k = bisect.bisect_left(trig, i, k)
+            if k >= ntrig:
+                break
+            start = trig[k]
+            end = start + self.samples_per_frame
+            self.edges = [0]
+            self.next_edge = int(self.samples_per_bit / 2)
+            k = self._frame_edges(trig, k + 1, start, end)
+            if end > n:
+                self.pos = n - start
+                break
+            self._put_frame(chars, starts, start)
+            i = end
+        return chars
+
+
+    def _put_frame(self, chars, starts, start):
+        ch = self._end_frame()
+        if ch is not None:
+            chars.append(ch)
+            if starts is not None:
+                starts.append(start)
+
+
+    def to_samples(self, binf, num):
+        return struct.unpack('<'+str(num)+'h', binf)
+
+
+
+class NumpyDemod(ListDemod):
+    """
+        Decodes samples held in NumPy arrays. Differences and thresholds are
+        computed on whole arrays; only trigger positions are visited in Python.
+    """
+
+    name = 'numpy'
+
+    def to_samples(self, binf, num):
+        return numpy.frombuffer(binf, dtype='<i2', count=num).astype(numpy.int32)
+
+
+    def triggers(self, samps, thold):
+        """Indexes of samples whose difference from the previous sample exceed thold"""
+        if self.detector == 'matched':
+            return self.matched_triggers(samps, thold)
+        if len(samps) == 0:
+            return []
+        arr = numpy.asarray(samps, dtype=numpy.int32)
+        prev = self.prev
+        if prev is None:
+            prev = arr[0]
+        diff = numpy.empty(len(arr), dtype=numpy.int32)
+        diff[0] = prev - arr[0]
+        diff[1:] = arr[:-1] - arr[1:]
+        self.prev = arr[-1]
+        trig = (diff > 0) & ((diff / float(MAX_SHORT)) > thold)
+        return numpy.flatnonzero(trig).tolist()
+
+
+    def matched_triggers(self, samps, thold):
+        """Same as ListDemod.matched_triggers, with the correlation computed on whole arrays"""
+        n = len(samps)
+        if n == 0:
+            return []
+        arr = numpy.asarray(samps, dtype=numpy.float64)
+        prev = self.prev
+        if prev is None:
+            prev = arr[0]
+        t = numpy.array(self.template, dtype=numpy.float64)
+        m = len(t)
+        norm = numpy.dot(t, t)
+        # Falling edges, after the last m-1 of the previous call
+        edges = numpy.empty(m - 1 + n)
+        edges[:m-1] = self.window[1:]
+        edges[m-1] = prev - arr[0]
+        edges[m:] = arr[:-1] - arr[1:]
+        dots = numpy.correlate(edges, t, 'valid')
+        energy = numpy.correlate(edges * edges, numpy.ones(m), 'valid')
+        c2, c1, good1 = self.last_corr
+        corr = numpy.concatenate(([c2, c1], dots / norm))
+        good = numpy.empty(n + 1, dtype=bool)
+        good[0] = good1
+        good[1:] = (corr[2:] > thold * MAX_SHORT) & (dots >= self.match_confidence * numpy.sqrt(norm * energy))
+        trig = good[:n] & (corr[1:n+1] >= corr[:n]) & (corr[1:n+1] > corr[2:])
+        self.prev = samps[-1]
+        self.window = edges[-m:].tolist()
+        self.last_corr = (corr[-2], corr[-1], bool(good[-1]))
+        return numpy.flatnonzero(trig).tolist()
+
+
+ENGINES = {
+    'list': ListDemod,
+    'numpy': NumpyDemod,
+}
+
+
+def default_engine():
+    if numpy is None:
+        return 'list'
+    return 'numpy'
+
+
+def new_demod(samples_per_bit, engine=None):
+    """Return a demodulator. The NumPy engine is used when available."""
+    name = engine or default_engine()
+    if name == 'numpy' and numpy is None:
+        name = 'list'
+    return ENGINES[name](samples_per_bit)
@@ -4,11 +4,13 @@ import shlex
 import time
 
 
+import demod
 import kermit
 import log
 import serial
 import transport
 import util
+import wavdecode
 import xmodem
 
 from util import CmdVal as Cmd
@@ -19,8 +21,13 @@ default_args = util.AttrBag(
     init        = None,
     showinit    = None,
     wavprefix   = None,
+    wavmax      = None,
     framerate   = None,
     sensitivity = None,
+    rxring      = None,
+    stereo      = None,
+    buffer      = None,
+    latency     = None,
 
     xmodem      = None,
     kermit      = None,
@@ -41,10 +48,17 @@ C = {
     'trace-on-error': {'true': True, 'false': False},
     'local-echo': {'true': True, 'false': False},
     'log-level': {'1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6},
+    'rx-agc': {'true': True, 'false': False},
+    'rx-alternates': {'true': True, 'false': False},
+    'rx-channel': {'auto': 'auto', 'left': 'left', 'right': 'right', 'mix': 'mix'},
+    'rx-detector': {'threshold': 'threshold', 'matched': 'matched'},
+    'rx-reject': {'true': True, 'false': False},
+    'tx-continuous': {'true': True, 'false': False},
 }
 
 
 hpcomm_cmds = {
+    'calibrate': Cmd('Set Rx sensitivity from data sent by calculator (5)', '[SECS]'),
     'kermit':    Cmd('Use Kermit protocol',      '[K-CMD]'),
     'serial':    Cmd('Use Serial protocol',      '[S-CMD]'),
     'xmodem':    Cmd('Use Xmodem protocol',      '[X-CMD]'),
@@ -56,6 +70,7 @@ hpcomm_cmds = {
     'script':    Cmd('Read and execute HpirComm commands from file', 'FILE'),
     'set':       Cmd('Set config value',         'NAME VAL'),
     'show':      Cmd('Show config values',       '[NAME]'),
+    'stats':     Cmd('Show Rx and Tx statistics, or reset them', '[reset]'),
     'wait':      Cmd('Wait for SECS secs (10)',            '[SECS]'),
 }
 
@@ -250,12 +265,23 @@ class Dispatcher:
         self.config = {
             'exit-on-error':  CV(C['exit-on-error']['false'], bool, 'Exit on error'),
             'trace-on-error': CV(C['trace-on-error']['true'], bool, 'Print stack trace on error'),
+            'tx-continuous':  CV(C['tx-continuous']['false'], bool, 'Keep the sound card playing between packets'),
+            'tx-timeout':     CV(0.0, float, 'Max seconds for a packet to play (0 for no limit)'),
             'local-echo':     CV(C['local-echo']['true'], bool, 'Echo command line locally'),
             'log-level':      CV(5, int, 'Set log level'),
             'wav-prefix':     CV('', str, 'Set wav prefix'),
+            'rx-agc':         CV(C['rx-agc']['false'], bool, 'Adapt Rx sensitivity to the signal'),
+            'rx-alternates':  CV(C['rx-alternates']['false'], bool, 'Also decode at other Rx sensitivities'),
+            'rx-channel':     CV(C['rx-channel']['auto'], str, 'Rx channel to decode, with --stereo'),
+            'rx-detector':    CV(C['rx-detector']['threshold'], str, 'Rx pulse detector'),
+            'rx-match':       CV(demod.MATCH_CONFIDENCE, float, 'Min match of a pulse for the matched detector [0.0 - 1.0]'),
+            'rx-reject':      CV(C['rx-reject']['true'], bool, 'Drop received bytes that have framing errors'),
         }
 
-        self.transport = transport.Transport(args.showinit, args.wavprefix, args.framerate, args.sensitivity)
+        self.transport = transport.Transport(args.showinit, args.wavprefix, args.framerate, args.sensitivity, args.rxring, args.wavmax, args.stereo, args.buffer, args.latency)
+        self.config['audio-buffer'] = CV(args.buffer or 0, int, 'Frames per sound card buffer (0 for default)')
+        self.config['audio-latency'] = CV(args.latency or 0.0, float, 'Sound card latency in seconds (0 for default)')
+        self.config['rx-sensitivity'] = CV(self.transport.rx_sensitivity(), float, 'Rx sensitivity [0.0 - 1.0]')
 
         self.kermit_cmd_proc = KermitCmds(self.transport)
         self.serial_cmd_proc = SerialCmds(self.transport)
@@ -346,7 +372,7 @@ class Dispatcher:
 
 
     def peek(self):
-        log.i(self.transport.peek())
+        log.i([chr(b) for b in self.transport.peek()])
 
 
     def wait(self, tail=''):
@@ -355,19 +381,111 @@ class Dispatcher:
         time.sleep(secs)
 
 
+    def calibrate(self, tail=''):
+        secs = util.parse_float(tail, 5.0)
+        log.i('Send data from the calculator. Listening for {} seconds'.format(secs))
+        data = self.transport.rx_capture(secs)
+        sens, results = wavdecode.sweep_sensitivity(data, self.transport.framerate)
+        self.transport.clear_buffer()
+        if sens is None:
+            log.w('No data received. Sensitivity not changed')
+            return
+        self.transport.set_rx_sensitivity(sens)
+        self.config['rx-sensitivity'].value = sens
+        log.i('Sensitivity set to {}'.format(sens))
+
+
     def set_config(self, line):
+        # Values that are checked here are put back if they are bad
+        prev = dict((name, self.config[name].value) for name in ('audio-buffer', 'audio-latency', 'tx-timeout'))
         util.set_config(line, self.config, C, log)
         cmd, tail = util.parse_cmdline2(line, self.config, log)
         if cmd == 'log-level':
             log.set_log_level(self.config['log-level'].value)
         if cmd == 'wav-prefix':
             self.transport.set_wav_prefix(tail)
+        if cmd in ('audio-buffer', 'audio-latency'):
+            frames = self.config['audio-buffer'].value
+            latency = self.config['audio-latency'].value
+            if frames >= 0 and latency >= 0:
+                self.transport.set_buffering(frames or None, latency or None)
+            else:
+                log.e('Value must be >= 0')
+                self.config[cmd].value = prev[cmd]
+        if cmd == 'tx-continuous':
+            self.transport.set_tx_continuous(self.config['tx-continuous'].value)
+        if cmd == 'tx-timeout':
+            secs = self.config['tx-timeout'].value
+            if secs >= 0:
+                self.transport.set_tx_timeout(secs or None)
+            else:
+                log.e('Value must be >= 0')
+                self.config['tx-timeout'].value = prev['tx-timeout']
+        if cmd == 'rx-agc':
+            self.transport.set_rx_agc(self.config['rx-agc'].value)
+        if cmd == 'rx-alternates':
+            self.transport.set_rx_alternates(self.config['rx-alternates'].value)
+        if cmd == 'rx-channel':
+            self.transport.set_rx_channel(self.config['rx-channel'].value)
+        if cmd == 'rx-detector':
+            self.transport.set_rx_detector(self.config['rx-detector'].value)
+        if cmd == 'rx-match':
+            conf = self.config['rx-match'].value
+            if 0 <= conf <= 1:
+                self.transport.set_rx_detector(self.config['rx-detector'].value, conf)
+            else:
+                log.e('Match must be >= 0 and <= 1')
+                self.config['rx-match'].value = self.transport.rx_match_confidence()
+        if cmd == 'rx-reject':
+            self.transport.set_rx_reject(self.config['rx-reject'].value)
+        if cmd == 'rx-sensitivity':
+            sens = self.config['rx-sensitivity'].value
+            if 0 <= sens <= 1:
+                self.transport.set_rx_sensitivity(sens)
+            else:
+                log.e('Sensitivity must be >= 0 and <= 1')
+                self.config['rx-sensitivity'].value = self.transport.rx_sensitivity()
 
 
     def show_config(self, line):
+        # With rx-agc on, the sensitivity changes as data is received.
+        self.config['rx-sensitivity'].value = round(self.transport.rx_sensitivity(), 3)
         util.show_config(self.config, C, log, line)
 
 
+    def stats(self, tail=''):
+        if tail.strip() == 'reset':
+            self.transport.reset_rx_stats()
+            self.transport.reset_tx_stats()
+            log.i('Stats reset')
+            return
+        st = self.transport.rx_stats()
+        tx = self.transport.tx_stats()
+        snr = '-'
+        if st.snr is not None:
+            snr = '{:.1f} dB'.format(st.snr)
+        rows = [
+            ('frames',          st.frames),
+            ('stop-errors',     st.stop_errors),
+            ('rejected',        st.rejected),
+            ('spurious-edges',  st.spurious),
+            ('dropped-bytes',   st.dropped),
+            ('snr',             snr),
+            ('bytes-per-sec',   '{:.1f}'.format(st.bytes_per_sec)),
+            ('bit-rate',        '{:.0f}'.format(st.bit_rate)),
+            ('sensitivity',     '{:.3f}'.format(st.sensitivity)),
+            ('channel',         st.channel),
+            ('audio-high-water', '{}%'.format(100 * st.audio.high_water / st.audio.capacity)),
+            ('audio-overruns',  st.audio.overruns),
+            ('tx-drain',        '{:.0f} ms'.format(1000 * tx.drain)),
+            ('tx-drain-max',    '{:.0f} ms'.format(1000 * tx.max_drain)),
+            ('tx-timeouts',     tx.timeouts),
+        ]
+        maxw = util.calc_max_width([key for key, _ in rows])
+        for key, val in rows:
+            log.i(util.fmtstr('', key, val, maxw))
+
+
     def echo(self, line):
         log.i(line)
 
@@ -458,6 +576,8 @@ class Dispatcher:
 
         if cmd == 'echo':
             d.echo(tail)
+        elif cmd == 'calibrate':
+            d.calibrate(tail)
         elif cmd == 'serial':
             d.proc_serial(tail)
         elif cmd == 'kermit':
@@ -478,6 +598,8 @@ class Dispatcher:
             d.show_config(tail)
         elif cmd == 'set':
             d.set_config(tail)
+        elif cmd == 'stats':
+            d.stats(tail)
         else:
             log.i('Unrecognized command: {}'.format(line))
 
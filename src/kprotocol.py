@@ -381,6 +381,15 @@ class KermitProtocol:
         return 0
 
 
+    def _needed_bytes(self):
+        '''Number of bytes the buffer must hold for the next packet to be complete'''
+        min_length = 6
+        extralen = 3
+        buf = self.transport.peek_bytes(2)
+        if len(buf) < 2:
+            return min_length
+        return max(min_length, unChar(chr(buf[1])) + extralen)
+
 
     def _dislodge_stale_data(self, stale_bytes):
         # We sometimes receive an incomplete/truncated packet or
@@ -400,8 +409,8 @@ class KermitProtocol:
     def _poll_for_packetful_of_bytes(self, max_retries=60, poll_delay=0.1):
         '''
             Wait (max_tries * poll_delay) for a complete packet to appear
-            in the buffer. Return the number of bytes required to read the
-            packet; return None on timeout.
+            in the buffer. Waiting ends early when enough bytes arrive. Return
+            the packet bytes; return None on timeout.
         '''
         stale_bytes = None
         retries = 0
@@ -416,7 +425,7 @@ class KermitProtocol:
             if retries > 1:
                 stale_bytes = self._dislodge_stale_data(stale_bytes)
             retries += 1
-            time.sleep(poll_delay)
+            self.transport.wait_for_bytes(self._needed_bytes(), poll_delay)
         return None
 
 
@@ -461,15 +470,43 @@ class KermitProtocol:
             return p2
 
 
+    def _decode_packet(self, pkt_bytes):
+        p1 = self.to_packet(pkt_bytes, 1, False)
+        p2 = self.to_packet(pkt_bytes, 2, False)
+        p3 = self.to_packet(pkt_bytes, 3, False)
+        if p1 or p2 or p3:
+            return self._choose(p1, p2, p3)
+        return None
+
+
+    def _read_alternate_packet(self):
+        '''
+            Look for a good packet in the bytes that Rx decoded at other
+            sensitivities. If one is found, the buffer is cleared.
+        '''
+        hdr = chr(self.config['receive']['start-of-packet'].value)
+        extralen = 3 #  hdr, length, trailer
+        for buf in self.transport.rx_alternates():
+            i = buf.find(hdr)
+            while 0 <= i < len(buf) - 1:
+                pkt = self._decode_packet(buf[i:i + unChar(chr(buf[i+1])) + extralen])
+                if pkt:
+                    log.d('Packet read from alternate decoder')
+                    self.transport.clear_buffer()
+                    return pkt
+                i = buf.find(hdr, i + 1)
+        return None
+
+
     def read_any_packet(self, max_retries=60, poll_delay=0.1):
         pkt_bytes = self._poll_for_packetful_of_bytes()
+        pkt = None
         if pkt_bytes:
-            p1 = self.to_packet(pkt_bytes, 1, False)
-            p2 = self.to_packet(pkt_bytes, 2, False)
-            p3 = self.to_packet(pkt_bytes, 3, False)
-            if p1 or p2 or p3:
-                return self._choose(p1, p2, p3)
-        return None
+            pkt = self._decode_packet(pkt_bytes)
+        if not pkt:
+            pkt = self._read_alternate_packet()
+        self.transport.clear_rx_alternates()
+        return pkt
 
 
     def to_packet(self, buf, blockcheck, log_checksum=True):
@@ -0,0 +1,141 @@
+import os
+import Queue
+import threading
+import time
+import wave
+
+import log
+
+
+QUEUE_LEN = 256  # Max chunks of audio waiting to be written
+
+FLUSH_SECS = 2.0 # Max time between updates of the WAV header
+
+ZERO_FRAMES = 4096 # Silence is written in blocks of this many frames
+
+
+def rotated_name(filename, n):
+    """Name of the n-th file of a recording. The first file is filename."""
+    if n == 0:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return '{}_{}{}'.format(root, n, ext)
+
+
+
+class WavRecorder:
+    """
+        Streams audio to a WAV file. write() only queues audio, so it is safe
+        to call from an audio callback; a background thread does the writing.
+
+        The WAV header is updated every FLUSH_SECS, so the file is valid even
+        if the program dies. If max_bytes is given, a new file is started
+        whenever the current file would grow larger than max_bytes.
+    """
+
+    def __init__(self, filename, channels, sample_width, framerate, max_bytes=None):
+        self.filename = filename
+        self.channels = channels
+        self.sample_width = sample_width
+        self.framerate = framerate
+        self.max_bytes = max_bytes
+
+        self.frame_bytes = channels * sample_width
+        self.zeros = '\0' * (ZERO_FRAMES * self.frame_bytes)
+
+        self.queue = Queue.Queue(QUEUE_LEN)
+        self.dropped = 0
+        self.is_closed = False
+
+        self.num_files = 0
+        self.file = None
+        self.wf = None
+        self.written = 0 # Bytes of audio in the current file
+        self._open_file()
+
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def write(self, data):
+        """Queue audio. Audio is dropped, rather than blocking, if the writer falls behind."""
+        if self.is_closed or len(data) == 0:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except Queue.Full:
+            self.dropped += 1
+
+
+    def write_silence(self, nframes):
+        """Queue nframes of silence"""
+        if self.is_closed or nframes <= 0:
+            return
+        try:
+            self.queue.put_nowait(int(nframes))
+        except Queue.Full:
+            self.dropped += 1
+
+
+    def close(self):
+        """Write any queued audio and close the file"""
+        if self.is_closed:
+            return
+        self.is_closed = True
+        self.queue.put(None)
+        self.thread.join()
+        if self.dropped:
+            log.w('{} chunks of audio were not recorded to {}'.format(self.dropped, self.filename))
+
+
+    def _open_file(self):
+        self.file = open(rotated_name(self.filename, self.num_files), 'wb')
+        self.wf = wave.open(self.file, 'wb')
+        self.wf.setparams((self.channels, self.sample_width, self.framerate, 0, 'NONE', 'not compressed'))
+        self.written = 0
+
+
+    def _close_file(self):
+        self.wf.close() # Does not close self.file
+        self.file.close()
+
+
+    def _flush(self):
+        self.wf.writeframes('') # Patches the header if frames were added
+        self.file.flush()
+
+
+    def _write(self, data):
+        if self.max_bytes and self.written > 0 and self.written + len(data) > self.max_bytes:
+            self._close_file()
+            self.num_files += 1
+            self._open_file()
+        self.wf.writeframesraw(data)
+        self.written += len(data)
+
+
+    def _write_silence(self, nframes):
+        while nframes > 0:
+            n = min(nframes, ZERO_FRAMES)
+            self._write(self.zeros[:n * self.frame_bytes])
+            nframes -= n
+
+
+    def _run(self):
+        flushed_at = time.time()
+        while True:
+            try:
+                item = self.queue.get(True, FLUSH_SECS)
+            except Queue.Empty:
+                item = ''
+            if item is None:
+                break
+            if isinstance(item, int):
+                self._write_silence(item)
+            elif item:
+                self._write(item)
+            if time.time() - flushed_at >= FLUSH_SECS:
+                self._flush()
+                flushed_at = time.time()
+        self._close_file()
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import util
+
+
+class ByteRing:
+    """
+        A fixed-size, thread-safe FIFO of bytes. Storage is allocated once.
+
+        A write that does not fit is dropped, and counted as an overrun,
+        rather than blocking the writer (which may be an audio callback).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Data is stored twice so that any run of bytes in the ring is
+        # contiguous in buf.
+        self.buf = bytearray(2 * capacity)
+        self.head = 0 # Total bytes read
+        self.tail = 0 # Total bytes written
+        self.high_water = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+
+    def __len__(self):
+        with self.cond:
+            return self.tail - self.head
+
+
+    def write(self, data):
+        """Append data. Returns the number of bytes written."""
+        n = len(data)
+        with self.cond:
+            used = self.tail - self.head
+            if n > self.capacity - used:
+                self.overruns += 1
+                self.dropped += n
+                return 0
+            cap = self.capacity
+            p = self.tail % cap
+            first = min(n, cap - p)
+            mv = memoryview(data)
+            self.buf[p:p+n] = mv
+            self.buf[p+cap:p+cap+first] = mv[:first]
+            if n > first:
+                self.buf[0:n-first] = mv[first:]
+            self.tail += n
+            self.high_water = max(self.high_water, used + n)
+            self.cond.notify_all()
+        return n
+
+
+    def read(self, n):
+        """Remove and return a max of n bytes"""
+        with self.cond:
+            n = min(n, self.tail - self.head)
+            p = self.head % self.capacity
+            dat = self.buf[p:p+n]
+            self.head += n
+            return dat
+
+
+    def peek(self, n):
+        """
+            Return a view of a max of n bytes without removing them. No data
+            is copied; the view is valid until the bytes are removed.
+        """
+        with self.cond:
+            n = min(n, self.tail - self.head)
+            p = self.head % self.capacity
+            return memoryview(self.buf)[p:p+n]
+
+
+    def clear(self):
+        with self.cond:
+            self.head = self.tail
+
+
+    def wait(self, n, timeout):
+        """Wait until n bytes are available. Returns False on timeout."""
+        deadline = time.time() + timeout
+        with self.cond:
+            while self.tail - self.head < n:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            return True
+
+
+    def _find(self, sub, start):
+        p = self.head % self.capacity
+        i = self.buf.find(sub, p + start, p + self.tail - self.head)
+        if i < 0:
+            return -1
+        return i - p
+
+
+    def find(self, sub):
+        """Index of the first occurrence of sub, or -1"""
+        with self.cond:
+            return self._find(sub, 0)
+
+
+    def wait_for(self, sub, timeout):
+        """
+            Wait until sub is in the ring. Returns the number of bytes up to
+            and including sub, or -1 on timeout. Bytes that have already been
+            searched are not searched again.
+        """
+        deadline = time.time() + timeout
+        with self.cond:
+            searched = self.head # Absolute position where the search resumes
+            while True:
+                i = self._find(sub, max(0, searched - self.head))
+                if i >= 0:
+                    return i + len(sub)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return -1
+                searched = max(self.head, self.tail - len(sub) + 1)
+                self.cond.wait(remaining)
+
+
+    def reset_stats(self):
+        with self.cond:
+            self.high_water = self.tail - self.head
+            self.overruns = 0
+            self.dropped = 0
+
+
+    def stats(self):
+        with self.cond:
+            return util.AttrBag(
+                capacity   = self.capacity,
+                occupancy  = self.tail - self.head,
+                high_water = self.high_water,
+                overruns   = self.overruns,
+                dropped    = self.dropped,
+            )
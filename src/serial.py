@@ -57,13 +57,10 @@ class Serial:
         lenw = len(watchars)
         log.i('Watching for ' + watchars)
         while True:
-            pos = self._to_chars(self.transport.peek()).find(watchars)
-            if pos >= 0:
-                chars = self.transport.read_bytes(pos + lenw)[:-lenw]
+            chars = self.transport.read_until(watchars, 0.5)
+            if chars is not None:
                 break
-            else:
-                time.sleep(0.5)
-        self._write_file(filename, chars)
+        self._write_file(filename, chars[:-lenw])
 
 
     def receive_file_timeout(self, filename, timeout=None):
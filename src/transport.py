@@ -34,17 +34,25 @@ def _tx_file(pfx):
 # I do not know why this is.
 # Interestingly, recording in stereo and then 'Mix Stero Down To Mono'
 # in Audacity results in a mono track that is half as loud.
+# With rx_stereo, Rx records in stereo and decodes one channel, or the sum
+# of both (see agc.CHANNEL_MODES).
 
 class Transport(object):
 
-    def __init__(self, show_init, wav_prefix, framerate, rx_sensitivity):
+    def __init__(self, show_init, wav_prefix, framerate, rx_sensitivity, rx_ring=None, wav_max=None, rx_stereo=None, frames_per_buffer=None, latency=None):
         sh_init = show_init or False
         frate = framerate or 44100
         rx_sens = rx_sensitivity or 0.11
+        ring_secs = rx_ring or Rx.RING_SECS
+        wav_bytes = None
+        if wav_max:
+            wav_bytes = int(wav_max * 1024 * 1024)
         sample_width = 2
         channels = 1
-        self.rx = Rx.Rx(sample_width, channels, frate, sh_init, _rx_file(wav_prefix), rx_sens)
-        self.tx = Tx.Tx(sample_width, channels, frate, sh_init, _tx_file(wav_prefix))
+        self.framerate = frate
+        rx_channels = 2 if rx_stereo else channels
+        self.rx = Rx.Rx(sample_width, rx_channels, frate, sh_init, _rx_file(wav_prefix), rx_sens, ring_secs=ring_secs, wav_max=wav_bytes, frames_per_buffer=frames_per_buffer, latency=latency)
+        self.tx = Tx.Tx(sample_width, channels, frate, sh_init, _tx_file(wav_prefix), wav_max=wav_bytes, frames_per_buffer=frames_per_buffer, latency=latency)
 
 
     def start_it(self):
@@ -57,6 +65,11 @@ class Transport(object):
         self.rx.all_done()
 
 
+    def set_buffering(self, frames_per_buffer, latency):
+        self.rx.set_buffering(frames_per_buffer, latency)
+        self.tx.set_buffering(frames_per_buffer, latency)
+
+
     def set_wav_prefix(self, wav_prefix):
         prefix = _check_prefix(wav_prefix)
         self.rx.set_wav_filename(_rx_file(prefix))
@@ -75,6 +88,14 @@ class Transport(object):
         return self.peek_bytes(sys.maxsize)
 
 
+    def num_bytes(self):
+        return self.rx.num_bytes()
+
+
+    def wait_for_bytes(self, n, timeout):
+        return self.rx.wait_for_bytes(n, timeout)
+
+
     def read_bytes(self, n):
         return self.rx.read_bytes(n)
 
@@ -87,13 +108,95 @@ class Transport(object):
         return self.read_bytes(sys.maxsize)
 
 
+    def read_until(self, byte, timeout):
+        return self.rx.read_until(byte, timeout)
+
+
+    def rx_sensitivity(self):
+        return self.rx.sensitivity
+
+
+    def set_rx_sensitivity(self, sensitivity):
+        self.rx.set_sensitivity(sensitivity)
+
+
+    def set_rx_agc(self, on):
+        self.rx.set_agc(on)
+
+
+    def set_rx_reject(self, on):
+        self.rx.set_reject_errors(on)
+
+
+    def set_rx_detector(self, detector, confidence=None):
+        self.rx.set_detector(detector, confidence)
+
+
+    def rx_match_confidence(self):
+        return self.rx.demod.match_confidence
+
+
+    def set_rx_channel(self, mode):
+        self.rx.set_channel_mode(mode)
+
+
+    def set_rx_alternates(self, on):
+        self.rx.set_alternates(on)
+
+
+    def rx_alternates(self):
+        return self.rx.alternates()
+
+
+    def clear_rx_alternates(self):
+        self.rx.clear_alternates()
+
+
+    def rx_capture(self, secs):
+        return self.rx.capture(secs)
+
+
+    def rx_bit_rate(self):
+        return self.rx.bit_rate()
+
+
+    def rx_stats(self):
+        return self.rx.stats()
+
+
+    def reset_rx_stats(self):
+        self.rx.reset_stats()
+
+
+    def tx_stats(self):
+        return self.tx.stats()
+
+
+    def reset_tx_stats(self):
+        self.tx.reset_stats()
+
+
+    def set_tx_timeout(self, secs):
+        self.tx.set_write_timeout(secs)
+
+
+    def set_tx_continuous(self, on):
+        self.tx.set_continuous(on)
+
+
     def clear_buffer(self):
         _ = self.read()
+        self.clear_rx_alternates()
 
 
     def write_bytes(self, bytes):
         self.tx.write_bytes(bytes)
 
 
+    def write_async(self, bytes):
+        """Queue bytes to be sent, without waiting. Returns a Tx.TxWrite."""
+        return self.tx.write_async(bytes)
+
+
     def write_byte(self, byte):
         self.write_bytes([byte])
@@ -172,6 +172,19 @@ def parse_float(val, default_val):
         return default_val
 
 
+def buffer_frames(framerate, frames, latency, default):
+    """
+        Frames per PortAudio buffer. PyAudio cannot pass a suggested latency
+        to PortAudio, so a latency (in seconds) sets the buffer size instead,
+        unless frames is given.
+    """
+    if frames:
+        return frames
+    if latency:
+        return max(1, int(round(latency * framerate)))
+    return default
+
+
 def format_si(n):
     if n >= 1000:
         suffix = ['K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y']
@@ -0,0 +1,363 @@
+import multiprocessing
+import struct
+import wave
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import agc
+import demod
+import util
+
+from demod import MAX_SHORT
+from demod import TRIGGER_VAL
+
+# Decoding of recorded WAV files. This module does not use PyAudio, so
+# recordings can be decoded on machines without a sound card.
+
+BITS_PER_SEC = 2400
+
+CHUNK_FRAMES = 65536 # Frames read from a file at a time
+
+SAMPLE_WIDTH = 2 # Only 16-bit recordings are supported
+
+NUM_BUCKETS = 32 # 32 is arbitrary.
+
+MIN_PULSE_SAMPLES = 10 # Fewer samples above the noise floor give no confidence
+
+SWEEP_SENS = [i / 50.0 for i in range(1, 46)] # Sensitivities tried by sweep_sensitivity
+
+SWEEP_KEEP = 0.95 # Sensitivities that score this close to the best are all good
+
+
+def wav_info(filename):
+    wf = wave.open(filename, 'rb')
+    try:
+        frames = wf.getnframes()
+        framerate = wf.getframerate()
+        return util.AttrBag(
+            channels     = wf.getnchannels(),
+            sample_width = wf.getsampwidth(),
+            framerate    = framerate,
+            frames       = frames,
+            secs         = frames / float(framerate),
+        )
+    finally:
+        wf.close()
+
+
+def read_chunks(filename, engine=None, chunk_frames=CHUNK_FRAMES, channel='auto'):
+    """
+        Yields (offset, samples) for each chunk of a mono or stereo 16-bit
+        WAV file. offset is the index of the first frame of the chunk in
+        the file. Only one chunk is held in memory at a time.
+
+        Of a stereo file, such as one recorded with --stereo, the samples
+        are those picked by channel, one of agc.CHANNEL_MODES, as Rx picks
+        them. In 'auto' mode, the channel is only switched between chunks.
+    """
+    wf = wave.open(filename, 'rb')
+    try:
+        if wf.getsampwidth() != SAMPLE_WIDTH:
+            raise Exception('Sample width is not {}: {}'.format(SAMPLE_WIDTH, wf.getsampwidth()))
+        nchan = wf.getnchannels()
+        if nchan not in (1, 2):
+            raise Exception('Number of channels is not 1 or 2: {}'.format(nchan))
+        sel = agc.ChannelSelector(wf.getframerate(), channel)
+        conv = demod.new_demod(float(wf.getframerate()) / BITS_PER_SEC, engine)
+        offset = 0
+        while True:
+            data = wf.readframes(chunk_frames)
+            if not data:
+                break
+            n = len(data) / (SAMPLE_WIDTH * nchan)
+            samps = conv.to_samples(data, n * nchan)
+            if nchan == 2:
+                sel.update(samps)
+                samps = sel.mono(samps)
+            yield offset, samps
+            offset += n
+    finally:
+        wf.close()
+
+
+class SensCalibrator:
+    """
+        Computes the sensitivity for a recording, one chunk at a time.
+
+        Pick a point that is about halfway between the noise floor and the
+        max value. Each chunk is added to a histogram of sample values with
+        one bin per value, so the 32-bucket histogram that the floor is
+        found in can be built at the end, when the max value is known.
+    """
+
+    def __init__(self, framerate):
+        # The first half-second may have transients, so ignore it.
+        self.skip = int(framerate / 2)
+        self.max_val = None
+        if numpy is not None:
+            self.counts = numpy.zeros(MAX_SHORT + 1, dtype=numpy.int64)
+        else:
+            self.counts = (MAX_SHORT + 1) * [0]
+
+
+    def add(self, samps):
+        if self.skip >= len(samps):
+            self.skip -= len(samps)
+            return
+        samps = samps[self.skip:]
+        self.skip = 0
+        if numpy is not None:
+            arr = numpy.asarray(samps)
+            top = int(arr.max())
+            self.counts += numpy.bincount(numpy.maximum(arr, 0), minlength=MAX_SHORT + 1)
+        else:
+            top = max(samps)
+            counts = self.counts
+            for w in samps:
+                if w < 0:
+                    w = 0
+                counts[w] += 1
+        if self.max_val is None or top > self.max_val:
+            self.max_val = top
+
+
+    def _buckets(self, bucket_size):
+        if numpy is not None:
+            ind = numpy.minimum(numpy.arange(MAX_SHORT + 1) / bucket_size, NUM_BUCKETS - 1)
+            return numpy.bincount(ind, weights=self.counts, minlength=NUM_BUCKETS).astype(numpy.int64).tolist()
+        buckets = NUM_BUCKETS * [0]
+        for w in range(self.max_val + 1):
+            buckets[min(w / bucket_size, NUM_BUCKETS - 1)] += self.counts[w]
+        return buckets
+
+
+    def result(self):
+        """
+            Returns (sensitivity, confidence). confidence is the fraction of
+            the buckets between the noise floor and the max value that are
+            empty: 1.0 when the pulses stand well clear of the noise, 0.0
+            when they cannot be told apart from it.
+        """
+        if self.max_val is None:
+            raise Exception('Recording is too short to calibrate')
+        bucket_size = self.max_val / NUM_BUCKETS
+        if bucket_size < 1:
+            return 0.0, 0.0 # Silence
+        buckets = self._buckets(bucket_size)
+
+        floor_ind = 0
+        for i in range(0, NUM_BUCKETS-1):
+            p = (buckets[i+1] + 1) / float(buckets[i] + 1) # Add 1 to avoid zeros.
+            if p < 0.0001: # 0.0001 is arbitrary
+                floor_ind = i
+
+        bot_ind = floor_ind + 1
+        top_ind = NUM_BUCKETS - 1
+        aa = (bucket_size * (top_ind - bot_ind)) / 2
+        sens = float(aa) / MAX_SHORT
+
+        above = buckets[bot_ind:]
+        confidence = 0.0
+        if sum(above) >= MIN_PULSE_SAMPLES:
+            confidence = above.count(0) / float(len(above))
+        return sens, confidence
+
+
+
+def compute_sens(bufr, framerate):
+    cal = SensCalibrator(framerate)
+    cal.add(bufr)
+    return cal.result()[0]
+
+
+def calibrate_file(filename, channel='auto'):
+    """Compute (sensitivity, confidence) for a recording"""
+    cal = SensCalibrator(wav_info(filename).framerate)
+    for offset, chunk in read_chunks(filename, channel=channel):
+        cal.add(chunk)
+    return cal.result()
+
+
+def write_triggers(filename, out_filename, sensitivity, engine=None, channel='auto'):
+    """
+        Write a WAV file that has a pulse wherever the receiver sees an edge
+        in filename, and is silent elsewhere.
+    """
+    info = wav_info(filename)
+    d = demod.new_demod(float(info.framerate) / BITS_PER_SEC, engine)
+    wf = wave.open(out_filename, 'wb')
+    try:
+        wf.setparams((1, SAMPLE_WIDTH, info.framerate, 0, 'NONE', 'not compressed'))
+        for offset, samps in read_chunks(filename, engine, channel=channel):
+            out = len(samps) * [0]
+            for i in d.triggers(samps, sensitivity):
+                out[i] = TRIGGER_VAL
+            wf.writeframes(struct.pack('<'+str(len(out))+'h', *out))
+    finally:
+        wf.close()
+
+
+
+class WavDecoder:
+    """
+        Decodes recorded audio with the same demodulator that Rx uses.
+
+        decode() takes the (offset, samples) chunks from read_chunks() and
+        yields (offset, byte) for each byte, where offset is the sample at
+        which the byte's start-bit was seen. Frames may span chunks.
+    """
+
+    def __init__(self, framerate, sensitivity, engine=None):
+        self.framerate = framerate
+        self.sensitivity = sensitivity
+        self.demod = demod.new_demod(float(framerate) / BITS_PER_SEC, engine)
+
+
+    def decode(self, chunks):
+        d = self.demod
+        for offset, samps in chunks:
+            for start, ch in d.feed_frames(samps, self.sensitivity):
+                yield offset + start, ch
+
+
+    def decode_file(self, filename, chunk_frames=CHUNK_FRAMES, channel='auto'):
+        return self.decode(read_chunks(filename, self.demod.name, chunk_frames, channel))
+
+
+    def stats(self):
+        d = self.demod
+        return util.AttrBag(
+            frames      = d.frames,
+            stop_errors = d.stop_errors,
+            rejected    = d.rejected,
+            spurious    = d.spurious,
+        )
+
+
+
+def summarize(filename, sensitivity=None, channel='auto'):
+    """
+        Decode a recording and return a summary of it. If sensitivity is
+        None, it is computed from the recording, and so is a confidence.
+        channel is as for read_chunks().
+    """
+    info = wav_info(filename)
+    sens = sensitivity
+    confidence = None
+    if sens is None:
+        sens, confidence = calibrate_file(filename, channel)
+    decoder = WavDecoder(info.framerate, sens)
+    nbytes = 0
+    for _ in decoder.decode_file(filename, channel=channel):
+        nbytes += 1
+    return util.AttrBag(
+        filename    = filename,
+        bytes       = nbytes,
+        sensitivity = sens,
+        confidence  = confidence,
+        errors      = decoder.stats().rejected,
+        secs        = info.secs,
+        error       = None,
+    )
+
+
+def _summarize(args):
+    filename, sensitivity, channel = args
+    try:
+        return summarize(filename, sensitivity, channel)
+    except Exception as ex:
+        return util.AttrBag(filename=filename, error=str(ex) or repr(ex))
+
+
+def summarize_files(filenames, sensitivity=None, processes=None, channel='auto'):
+    """
+        summarize() many recordings in a pool of processes (one per CPU by
+        default). Yields the summaries in the order of filenames. If a file
+        cannot be decoded, its summary has only filename and error.
+    """
+    args = [(filename, sensitivity, channel) for filename in filenames]
+    if processes == 1 or len(args) < 2:
+        for arg in args:
+            yield _summarize(arg)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for summary in pool.imap(_summarize, args):
+            yield summary
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def try_sensitivity(data, framerate, sensitivity, engine=None):
+    """
+        Decode raw 16-bit mono audio at one sensitivity. Returns the number
+        of bytes decoded and of frames rejected.
+    """
+    decoder = WavDecoder(framerate, sensitivity, engine)
+    samps = decoder.demod.to_samples(data, len(data) / SAMPLE_WIDTH)
+    nbytes = 0
+    for _ in decoder.decode([(0, samps)]):
+        nbytes += 1
+    return util.AttrBag(
+        sensitivity = sensitivity,
+        bytes       = nbytes,
+        rejected    = decoder.stats().rejected,
+    )
+
+
+def choose_sensitivity(results):
+    """
+        Pick a sensitivity from the try_sensitivity() results. Each result
+        scores the bytes decoded less twice the frames rejected. Of the run
+        of sensitivities that score close to the best, the middle one is
+        returned, as it is furthest from both the noise and the pulse peaks.
+        Returns None if nothing was decoded.
+    """
+    results = sorted(results, key=lambda r: r.sensitivity)
+    scores = [r.bytes - 2 * r.rejected for r in results]
+    if not scores or max(scores) <= 0:
+        return None
+    top = max(scores)
+    best = scores.index(top)
+    lo = best
+    while lo > 0 and scores[lo - 1] >= SWEEP_KEEP * top:
+        lo -= 1
+    hi = best
+    while hi < len(scores) - 1 and scores[hi + 1] >= SWEEP_KEEP * top:
+        hi += 1
+    return results[(lo + hi) / 2].sensitivity
+
+
+_sweep_args = None # (data, framerate) in each pool process
+
+
+def _init_sweep(data, framerate):
+    global _sweep_args
+    _sweep_args = (data, framerate)
+
+
+def _sweep_one(sensitivity):
+    data, framerate = _sweep_args
+    return try_sensitivity(data, framerate, sensitivity)
+
+
+def sweep_sensitivity(data, framerate, candidates=SWEEP_SENS, processes=None):
+    """
+        try_sensitivity() for each of candidates, in a pool of processes
+        (one per CPU by default). Returns (sensitivity, results), where
+        sensitivity is from choose_sensitivity().
+    """
+    if processes == 1:
+        results = [try_sensitivity(data, framerate, sens) for sens in candidates]
+    else:
+        pool = multiprocessing.Pool(processes, _init_sweep, (data, framerate))
+        try:
+            results = pool.map(_sweep_one, candidates)
+        finally:
+            pool.terminate()
+            pool.join()
+    return choose_sensitivity(results), results
@@ -209,6 +209,19 @@ class Xmodem:
         return ans
 
 
+    def _alternate_block(self, seq):
+        """A valid block from the bytes that Rx decoded at other sensitivities, or None"""
+        hdr = chr(XM.HEADER)
+        for bytes in self.transport.rx_alternates():
+            i = bytes.find(hdr)
+            while i >= 0:
+                blk = bytes[i:i + XM.BLOCK_LEN]
+                if self._is_valid_block(blk, seq):
+                    return blk
+                i = bytes.find(hdr, i + 1)
+        return None
+
+
     def _rcv_resp(self):
         """Convenience method for when only resp code is needed; buffer is ignored"""
         if self.config['ignorerx'].value:
@@ -227,24 +240,35 @@ class Xmodem:
         while i < npoll:
             bytes = self.transport.peek()
             bytes_len = len(bytes)
-            if bytes[-LENCCC:] == CCC: # Check last three
+            wanted = bytes_len + 1 # Wake when anything new arrives
+            if list(bytes[-LENCCC:]) == CCC: # Check last three
                 time.sleep(cpause)
-                if self.transport.peek()[-LENCCC:] == CCC: # Double-check last three
+                if list(self.transport.peek()[-LENCCC:]) == CCC: # Double-check last three
                     return (R.CANCEL, None)
             elif bytes_len == 1:
-                byte = self.transport.read_byte()[0]
-                if byte == XM.END_TRANS:
-                    return (R.END_TRANS, None)
-                if byte == XM.ACK:
-                    return (R.ACK, None)
-                if byte == XM.NACK:
-                    return (R.NACK, None)
+                byte = bytes[0]
+                if byte == XM.HEADER:
+                    wanted = XM.BLOCK_LEN # Start of a block; wait for the rest
+                elif byte == XM.CANCEL:
+                    wanted = LENCCC # Leave it for the check of the last three
+                else:
+                    self.transport.read_byte()
+                    wanted = 1 # The buffer is empty again
+                    if byte == XM.END_TRANS:
+                        return (R.END_TRANS, None)
+                    if byte == XM.ACK:
+                        return (R.ACK, None)
+                    if byte == XM.NACK:
+                        return (R.NACK, None)
             elif bytes_len > 0 and bytes_len < XM.BLOCK_LEN:
                 while len(bytes) > 0 and bytes[0] != XM.HEADER:
                     bytes = self.transport.read_byte()
+                wanted = XM.BLOCK_LEN
+                if self.transport.num_bytes() == 0:
+                    wanted = 1 # Everything was discarded
             elif bytes_len >= XM.BLOCK_LEN:
                 return (R.BLOCK, self.transport.read_bytes(XM.BLOCK_LEN))
-            time.sleep(pause)
+            self.transport.wait_for_bytes(wanted, pause)
             i += 1
         return (R.FAIL, None)
 
@@ -281,9 +305,16 @@ class Xmodem:
         filedat = []
         while True:
             (res, buf) = self._rcv_buf()
+            if res == R.FAIL or (res == R.BLOCK and not self._is_valid_block(buf, seq)):
+                alt = self._alternate_block(seq)
+                if alt:
+                    log.d('Block read from alternate decoder')
+                    self.transport.clear_buffer()
+                    (res, buf) = (R.BLOCK, alt)
             if res == R.BLOCK and self._is_valid_block(buf, seq):
                 log.i('Received block ' + str(seq))
                 filedat.extend(self._extract_packet(buf))
+                self.transport.clear_rx_alternates()
                 self.transport.write_byte(XM.ACK)
                 seq = self._next_seq(seq)
                 retries = 0
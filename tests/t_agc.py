@@ -0,0 +1,143 @@
+import unittest
+
+import src.agc
+
+from tests.sert import sert
+
+
+def block(level, n=1000):
+    """n samples whose largest falling edge is level * MAX_SHORT"""
+    samps = n * [0]
+    samps[n / 2] = int(level * src.agc.MAX_SHORT)
+    return samps
+
+
+
+class TestBlockLevel(unittest.TestCase):
+
+    def test_should_find_largest_falling_edge(self):
+        sert(src.agc.block_level([0, 3000, 0, 0])).to_equal(3000 / float(src.agc.MAX_SHORT))
+
+
+    def test_should_ignore_rising_edges(self):
+        sert(src.agc.block_level([0, 100, 200])).to_equal(0.0)
+
+
+    def test_should_handle_short_block(self):
+        sert(src.agc.block_level([5])).to_equal(0.0)
+
+
+    def test_should_handle_numpy_block(self):
+        if src.agc.numpy is None:
+            return
+        samps = src.agc.numpy.array([0, 3000, 0, 0], dtype=src.agc.numpy.int32)
+
+        sert(src.agc.block_level(samps)).to_equal(3000 / float(src.agc.MAX_SHORT))
+
+
+
+class TestUpdate(unittest.TestCase):
+
+    def test_should_keep_initial_threshold_without_signal(self):
+        g = src.agc.Agc(0.11, 14400)
+
+        for _ in range(10):
+            sert(g.update(block(0.01))).to_equal(0.11)
+
+
+    def test_should_split_floor_and_peak(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.04))
+
+        thold = g.update(block(0.3))
+
+        sert(round(thold, 3)).to_equal(0.17)
+
+
+    def test_should_stay_above_noise(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.1))
+
+        thold = g.update(block(0.25))
+
+        sert(round(thold, 3)).to_equal(0.2)
+
+
+    def test_should_follow_weaker_signal(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.02))
+        g.update(block(0.8))
+
+        for _ in range(100):
+            thold = g.update(block(0.3))
+
+        sert(round(thold, 2)).to_equal(0.16)
+
+
+    def test_should_hold_peak_while_idle(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.02))
+        thold = g.update(block(0.4))
+
+        for _ in range(100):
+            sert(g.update(block(0.02))).to_equal(thold)
+
+
+    def test_should_reset(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.02))
+        g.update(block(0.4))
+
+        g.reset(0.3)
+
+        sert(g.threshold).to_equal(0.3)
+        sert(g.update(block(0.02))).to_equal(0.3)
+
+
+
+class TestSnr(unittest.TestCase):
+
+    def test_should_be_unknown_without_signal(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.01))
+
+        sert(g.snr()).to_equal(None)
+
+
+    def test_should_compare_peak_to_floor(self):
+        g = src.agc.Agc(0.11, 14400)
+        g.update(block(0.01))
+        g.update(block(0.1))
+
+        sert(round(g.snr(), 1)).to_equal(20.0)
+
+
+
+class TestChannelSelector(unittest.TestCase):
+
+    def test_should_switch_to_stronger_channel(self):
+        sel = src.agc.ChannelSelector(44100)
+
+        switched = sel.update([0, 0, 0, 30000, 0, 0, 0, 30000])
+
+        sert(switched).is_true()
+        sert(sel.channel_in_use()).to_equal('right')
+        sert(sel.mono([1, 2, 3, 4])).to_equal([2, 4])
+
+
+    def test_should_not_switch_when_not_allowed(self):
+        sel = src.agc.ChannelSelector(44100)
+
+        sert(sel.update([0, 0, 0, 30000], False)).is_false()
+        sert(sel.channel_in_use()).to_equal('left')
+
+
+    def test_should_mix_channels(self):
+        sel = src.agc.ChannelSelector(44100, 'mix')
+
+        sert(sel.mono([1, 2, 3, 4])).to_equal([3, 7])
+
+
+    def test_should_reject_unknown_mode(self):
+        with self.assertRaises(Exception):
+            src.agc.ChannelSelector(44100, 'center')
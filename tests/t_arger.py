@@ -22,7 +22,7 @@ class TestCheckArgs(unittest.TestCase):
 
         args = src.arger.check_args(cmd_args)
 
-        sert(len(vars(args).keys())).to_equal(17)
+        sert(len(vars(args).keys())).to_equal(22)
         sert(args.text).is_false()
         sert(args.chars).to_equal(None)
         sert(args.framerate).to_equal(None)
@@ -32,12 +32,17 @@ class TestCheckArgs(unittest.TestCase):
         sert(args.name).to_equal(None)
         sert(args.get).to_equal(None)
         sert(args.receive).to_equal(None)
+        sert(args.rxring).to_equal(None)
         sert(args.send).to_equal(None)
         sert(args.sensitivity).to_equal(None)
         sert(args.serial).is_false()
         sert(args.showinit).is_false()
+        sert(args.stereo).is_false()
+        sert(args.buffer).to_equal(None)
+        sert(args.latency).to_equal(None)
         sert(args.timeout).to_equal(None)
         sert(args.watchars).to_equal(None)
+        sert(args.wavmax).to_equal(None)
         sert(args.wavprefix).to_equal(None)
         sert(args.xmodem).is_false()
 
@@ -106,6 +111,38 @@ class TestCheckArgs(unittest.TestCase):
         sert(args.receive).to_equal('bar')
 
 
+    def test_should_set_buffer(self):
+        cmd_args = ['--buffer', '256']
+
+        args = src.arger.check_args(cmd_args)
+
+        sert(args.buffer).to_equal(256)
+
+
+    def test_should_set_latency(self):
+        cmd_args = ['--latency', '0.05']
+
+        args = src.arger.check_args(cmd_args)
+
+        sert(args.latency).to_equal(0.05)
+
+
+    def test_should_set_stereo(self):
+        cmd_args = ['--stereo']
+
+        args = src.arger.check_args(cmd_args)
+
+        sert(args.stereo).is_true()
+
+
+    def test_should_set_rxring(self):
+        cmd_args = ['--rxring', '3.5']
+
+        args = src.arger.check_args(cmd_args)
+
+        sert(args.rxring).to_equal(3.5)
+
+
     def test_should_set_send(self):
         cmd_args = ['--send', 'baz']
 
@@ -154,6 +191,14 @@ class TestCheckArgs(unittest.TestCase):
         sert(args.watchars).to_equal('XYZ')
 
 
+    def test_should_set_wavmax(self):
+        cmd_args = ['--wavmax', '20']
+
+        args = src.arger.check_args(cmd_args)
+
+        sert(args.wavmax).to_equal(20.0)
+
+
     def test_should_set_wavprefix(self):
         cmd_args = ['--wavprefix', 'boz']
 
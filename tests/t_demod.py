@@ -0,0 +1,437 @@
+import unittest
+import random
+
+import src.demod
+
+from tests.sert import sert
+
+
+# One zero-bit (a pulse) and one one-bit (no pulse) at 6 samples per bit.
+Z = [32767,0,0,0,0,0]
+O = [0,0,0,0,0,0]
+
+
+def frame(byte):
+    samps = O + Z # Lead, start-bit
+    for _ in range(8):
+        if byte & 0x01:
+            samps += O
+        else:
+            samps += Z
+        byte >>= 1
+    return samps + O + O # Stop bits
+
+
+def frame_at(byte, spb):
+    """Like frame(), but with bits of spb samples, which need not be a whole number"""
+    starts = [int(round(k * spb)) for k in range(13)]
+    samps = starts[-1] * [0]
+    samps[starts[1]] = 32767
+    for k in range(2, 10):
+        if not byte & 0x01:
+            samps[starts[k]] = 32767
+        byte >>= 1
+    return samps
+
+
+def noisy_signal(seed, nbytes):
+    rnd = random.Random(seed)
+    samps = []
+    for _ in range(nbytes):
+        samps += frame(rnd.randint(0, 255))
+        samps += [rnd.randint(-2000, 2000) for _ in range(rnd.randint(0, 20))]
+    # Occasional noise spikes
+    for _ in range(nbytes / 4):
+        samps[rnd.randint(0, len(samps) - 1)] = rnd.randint(-32768, 32767)
+    return samps
+
+
+def demods():
+    dd = [src.demod.ListDemod(6)]
+    if src.demod.numpy is not None:
+        dd.append(src.demod.NumpyDemod(6))
+    return dd
+
+
+
+class TestNewDemod(unittest.TestCase):
+
+    def test_should_use_list_engine_when_requested(self):
+        d = src.demod.new_demod(6, 'list')
+
+        sert(d.name).to_equal('list')
+
+
+    @unittest.skipIf(src.demod.numpy is None, 'NumPy is not installed')
+    def test_should_default_to_numpy_engine(self):
+        d = src.demod.new_demod(6)
+
+        sert(d.name).to_equal('numpy')
+
+
+    def test_should_fall_back_to_list_engine(self):
+        orig = src.demod.numpy
+        src.demod.numpy = None
+        try:
+            d = src.demod.new_demod(6, 'numpy')
+        finally:
+            src.demod.numpy = orig
+
+        sert(d.name).to_equal('list')
+
+
+
+class TestMaskTable(unittest.TestCase):
+
+    def test_should_match_frame_to_byte(self):
+        for spb in [6, 18, 20]:
+            table = src.demod.mask_table(spb)
+
+            sert(len(table)).to_equal(10 * spb)
+            for e in range(10 * spb):
+                sert(0xff ^ (table[e] & 0xff)).to_equal(src.demod.frame_to_byte([0, e], spb))
+
+
+    def test_should_decode_edges(self):
+        d = src.demod.ListDemod(6)
+        edges = [0, 8, 20, 33, 52]
+
+        sert(d.frame_byte(edges)).to_equal(src.demod.frame_to_byte(edges, 6))
+
+
+    def test_should_rebuild_table_when_timing_changes(self):
+        d = src.demod.ListDemod(6)
+
+        d.set_samples_per_bit(18)
+
+        sert(d.masks).to_equal(src.demod.mask_table(18))
+        sert(d.samples_per_frame).to_equal(180)
+        sert(d.frame_byte([0, 18])).to_equal(0xfe)
+
+
+
+class TestFramingErrors(unittest.TestCase):
+
+    def test_should_flag_edges_between_bits(self):
+        table = src.demod.mask_table(8)
+
+        sert([e for e in range(80) if table[e] & src.demod.FRAMING_ERROR]).to_equal(
+                [4, 12, 20, 28, 36, 44, 52, 60] + range(68, 80))
+
+
+    def test_should_reject_edge_in_stop_bit(self):
+        d = src.demod.ListDemod(6)
+
+        chars = d.feed(frame(0x00)[:-12] + [0, 32767] + 10 * [0], 0.11)
+
+        sert(chars).to_equal([])
+        sert(d.rejected).to_equal(1)
+
+
+    def test_should_reject_edge_between_bits(self):
+        d = src.demod.ListDemod(6)
+        samps = frame(0xff)
+        samps[6 + 6 * 3 + 3] = 32767 # Halfway between bits 2 and 3
+
+        sert(d.feed(samps, 0.11)).to_equal([])
+        sert(d.rejected).to_equal(1)
+
+
+    def test_should_accept_edge_near_bit(self):
+        d = src.demod.ListDemod(6)
+        samps = frame(0xff)
+        samps[6 + 6 * 3 + 2] = 32767 # 1/3 bit after the start of bit 2
+
+        sert(d.feed(samps, 0.11)).to_equal([0xfb])
+        sert(d.rejected).to_equal(0)
+
+
+    def test_should_keep_bad_frame_when_not_rejecting(self):
+        d = src.demod.ListDemod(6)
+        d.reject_errors = False
+        samps = frame(0xff)
+        samps[6 + 6 * 3 + 3] = 32767
+
+        sert(d.feed(samps, 0.11)).to_equal([0xf7])
+        sert(d.rejected).to_equal(0)
+
+
+    def test_should_not_track_rejected_frame(self):
+        d = src.demod.ListDemod(44100 / 2400.0)
+        d._track = None
+
+        d.feed(frame_at(0x00, 44100 / 2400.0)[:-37] + [0, 32767] + 35 * [0], 0.5)
+
+        sert(d.rejected).to_equal(1)
+
+
+
+class TestFractionalTiming(unittest.TestCase):
+
+    def test_should_decode_at_any_framerate(self):
+        for framerate in [22050, 44100, 48000, 96000, 11025]:
+            spb = float(framerate) / 2400
+            samps = []
+            for b in range(256):
+                samps += frame_at(b, spb)
+            for d in [src.demod.ListDemod(spb)] + demods()[1:2]:
+                d.set_samples_per_bit(spb)
+
+                sert(list(d.feed(samps, 0.5))).to_equal(range(256))
+
+
+    def test_should_size_table_for_fractional_frame(self):
+        d = src.demod.ListDemod(44100 / 2400.0)
+
+        sert(len(d.masks)).to_equal(184)
+        sert(len(d.masks)).to_equal(184)
+
+
+
+class TestDriftTracking(unittest.TestCase):
+
+    def feed_bytes(self, d, data, spb):
+        samps = []
+        for b in data:
+            samps += frame_at(b, spb)
+        return list(d.feed(samps, 0.5))
+
+
+    def test_should_track_sender_bit_rate(self):
+        rnd = random.Random(1)
+        data = [rnd.randint(0, 255) for _ in range(100)]
+        for bps in [2340, 2460]:
+            d = src.demod.ListDemod(44100 / 2400.0)
+
+            sert(self.feed_bytes(d, data, 44100.0 / bps)).to_equal(data)
+            sert(abs(44100 / d.period - bps) < 10).is_true()
+
+
+    def test_should_limit_period_to_spec(self):
+        d = src.demod.ListDemod(44100 / 2400.0)
+
+        self.feed_bytes(d, 100 * [0x00], 44100 / 2500.0)
+
+        sert(d.period).to_equal((44100 / 2400.0) / 1.025)
+
+
+    def test_should_not_track_frame_without_late_edges(self):
+        d = src.demod.ListDemod(44100 / 2400.0)
+
+        self.feed_bytes(d, 20 * [0xff, 0xfe], 44100 / 2460.0)
+
+        sert(d.period).to_equal(44100 / 2400.0)
+
+
+    def test_should_restore_nominal_period_on_reset(self):
+        d = src.demod.ListDemod(44100 / 2400.0)
+        self.feed_bytes(d, 50 * [0x00], 44100 / 2460.0)
+
+        d.reset()
+
+        sert(d.period).to_equal(44100 / 2400.0)
+        sert(len(d.masks)).to_equal(184)
+
+
+
+class TestFeedFrames(unittest.TestCase):
+
+    def test_should_return_frame_starts(self):
+        samps = frame(0) + frame(0x41) + O
+        for d in demods():
+            sert(d.feed_frames(samps, 0.11)).to_equal([(7, 0), (79, 0x41)])
+
+
+    def test_should_return_negative_start_of_continued_frame(self):
+        samps = O + frame(0x41)
+        for d in demods():
+            first = d.feed_frames(samps[:20], 0.11)
+
+            sert(first).to_equal([])
+            sert(d.feed_frames(samps[20:], 0.11)).to_equal([(-7, 0x41)])
+
+
+    def test_should_not_return_rejected_frames(self):
+        samps = frame(0x00)[:-12] + [0, 32767] + 10 * [0] + frame(0x41)
+        for d in demods():
+            sert(d.feed_frames(samps, 0.11)).to_equal([(79, 0x41)])
+
+
+
+class TestEdgeTemplate(unittest.TestCase):
+
+    def test_should_make_template_of_tx_pulse(self):
+        sert(src.demod.edge_template(src.demod.TX_PULSE)).to_equal([-1.0, 1.0])
+
+
+    def test_should_scale_template(self):
+        sert(src.demod.edge_template([2, 4])).to_equal([-0.5, -0.5, 1.0])
+
+
+
+class TestMatchedTriggers(unittest.TestCase):
+
+    def matched(self, confidence=src.demod.MATCH_CONFIDENCE):
+        dd = demods()
+        for d in dd:
+            d.detector = 'matched'
+            d.match_confidence = confidence
+        return dd
+
+
+    def test_should_trigger_after_pulse(self):
+        samps = 5 * [0] + [20000] + 5 * [0]
+        for d in self.matched():
+            sert(d.triggers(samps, 0.11)).to_equal([7])
+
+
+    def test_should_ignore_step(self):
+        samps = 5 * [0] + 6 * [-20000]
+        for d in self.matched():
+            sert(d.triggers(samps, 0.11)).to_equal([])
+
+
+    def test_should_take_step_with_low_confidence(self):
+        samps = 5 * [0] + 6 * [-20000]
+        for d in self.matched(0.5):
+            sert(d.triggers(samps, 0.11)).to_equal([6])
+
+
+    def test_should_ignore_weak_pulse(self):
+        samps = 5 * [0] + [3000] + 5 * [0]
+        for d in self.matched():
+            sert(d.triggers(samps, 0.11)).to_equal([])
+
+
+    def test_should_not_depend_on_chunk_size(self):
+        samps = noisy_signal(5, 30)
+        for d in self.matched():
+            whole = d.triggers(samps, 0.11)
+            d.reset()
+            trig = []
+            for i in range(0, len(samps), 7):
+                trig.extend(i + t for t in d.triggers(samps[i:i+7], 0.11))
+
+            sert(trig).to_equal(whole)
+
+
+    def test_should_decode_bytes(self):
+        samps = frame(0) + frame(1) + frame(0x41) + frame(0xff)
+        for d in self.matched():
+            sert(d.feed(samps, 0.11)).to_equal([0, 1, 0x41, 0xff])
+
+
+
+class TestFeed(unittest.TestCase):
+
+    def feed_chunks(self, d, samps, sizes, thold=0.11):
+        chars = []
+        i = 0
+        while i < len(samps):
+            n = sizes[i % len(sizes)]
+            chars.extend(d.feed(samps[i:i+n], thold))
+            i += n
+        return chars
+
+
+    def test_should_decode_bytes(self):
+        samps = frame(0) + frame(1) + frame(0x41) + frame(0xff)
+        for d in demods():
+            chars = d.feed(samps, 0.11)
+
+            sert(chars).to_equal([0, 1, 0x41, 0xff])
+
+
+    def test_should_carry_frame_across_calls(self):
+        samps = frame(0x41)
+        for d in demods():
+            sert(d.feed(samps[0:20], 0.11)).to_equal([])
+            sert(d.pos).to_equal(13)
+
+            sert(d.feed(samps[20:], 0.11)).to_equal([0x41])
+            sert(d.pos).to_equal(-1)
+
+
+    def test_should_detect_edge_between_calls(self):
+        samps = frame(0)
+        for d in demods():
+            sert(d.feed(samps[0:12], 0.11)).to_equal([])
+
+            sert(d.feed(samps[12:], 0.11)).to_equal([0])
+
+
+    def test_should_not_depend_on_chunk_size(self):
+        samps = noisy_signal(3, 50)
+        for d in demods():
+            d.reset()
+            expected = d.feed(samps, 0.11)
+            for sizes in [[1], [7], [61, 13, 1], [512]]:
+                d.reset()
+
+                sert(self.feed_chunks(d, samps, sizes)).to_equal(expected)
+
+
+    @unittest.skipIf(src.demod.numpy is None, 'NumPy is not installed')
+    def test_engines_should_agree(self):
+        lst = src.demod.ListDemod(6)
+        npy = src.demod.NumpyDemod(6)
+        for seed in range(10):
+            samps = noisy_signal(seed, 40)
+            lst.reset()
+            npy.reset()
+
+            sert(self.feed_chunks(npy, samps, [97, 5])).to_equal(self.feed_chunks(lst, samps, [97, 5]))
+
+
+
+class TestStats(unittest.TestCase):
+
+    def test_should_count_frames(self):
+        for d in demods():
+            d.feed(frame(0x01) + frame(0x02), 0.11)
+
+            sert(d.frames).to_equal(2)
+            sert(d.stop_errors).to_equal(0)
+            sert(d.spurious).to_equal(0)
+
+
+    def test_should_count_stop_errors(self):
+        samps = frame(0xff)
+        samps[6 * 10] = 32767
+        for d in demods():
+            sert(d.feed(samps, 0.11)).to_equal([])
+
+            sert(d.stop_errors).to_equal(1)
+            sert(d.rejected).to_equal(1)
+
+
+    def test_should_count_spurious_edges(self):
+        samps = frame(0xfe)
+        samps[14] = 32767 # Two samples after data-bit 0
+        for d in demods():
+            sert(d.feed(samps, 0.11)).to_equal([0xfe])
+
+            sert(d.spurious).to_equal(1)
+
+
+    def test_should_count_spurious_edges_across_calls(self):
+        samps = frame(0xfe)
+        samps[14] = 32767
+        for d in demods():
+            for n in [1, 14, 15]:
+                d.reset()
+                d.clear_stats()
+
+                chars = d.feed(samps[:n], 0.11) + d.feed(samps[n:], 0.11)
+
+                sert(chars).to_equal([0xfe])
+                sert(d.spurious).to_equal(1)
+
+
+    def test_should_clear_stats(self):
+        for d in demods():
+            d.feed(frame(0x01), 0.11)
+
+            d.clear_stats()
+
+            sert(d.frames).to_equal(0)
@@ -15,6 +15,11 @@ def targs(**kwargs):
         'wavprefix': None,
         'framerate': 14400,
         'sensitivity': 0.11,
+        'rxring': None,
+        'wavmax': None,
+        'stereo': None,
+        'buffer': None,
+        'latency': None,
         'kermit': None,
         'serial': None,
         'xmodem': None,
@@ -599,11 +604,12 @@ class TestDispatcherPeek(unittest.TestCase):
     def test_should_peek(self, mock_i):
         d = src.dispatcher.Dispatcher()
         d.transport = Mock()
+        d.transport.peek.return_value = bytearray('ab')
 
         d.peek()
 
         sert(d.transport.peek).called_once()
-        sert(mock_i).called_once()
+        sert(mock_i).called_once_with(['a', 'b'])
 
 
 class TestDispatcherWait(unittest.TestCase):
@@ -667,6 +673,161 @@ class TestDispatcherSetConfig(unittest.TestCase):
         sert(mock_level).called_once_with(val)
 
 
+    def test_should_set_rx_agc(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-agc true')
+
+        sert(d.transport.set_rx_agc).called_once_with(True)
+
+
+    def test_should_set_rx_alternates(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-alternates true')
+
+        sert(d.transport.set_rx_alternates).called_once_with(True)
+
+
+    def test_should_set_audio_buffer(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('audio-buffer 256')
+
+        sert(d.transport.set_buffering).called_once_with(256, None)
+
+
+    def test_should_set_audio_latency(self):
+        d = src.dispatcher.Dispatcher(targs(buffer=128))
+        d.transport = Mock()
+
+        d.set_config('audio-latency 0.05')
+
+        sert(d.transport.set_buffering).called_once_with(128, 0.05)
+
+
+    @patch('src.log.e')
+    def test_should_not_set_negative_audio_buffer(self, mock_e):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('audio-buffer 256')
+        d.set_config('audio-buffer -1')
+
+        sert(mock_e).called_once_with('Value must be >= 0')
+        sert(d.transport.set_buffering).called_once_with(256, None)
+        sert(d.config['audio-buffer'].value).to_equal(256)
+
+
+    def test_should_set_tx_continuous(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('tx-continuous true')
+
+        sert(d.transport.set_tx_continuous).called_once_with(True)
+
+
+    def test_should_set_tx_timeout(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('tx-timeout 3')
+
+        sert(d.transport.set_tx_timeout).called_once_with(3.0)
+
+
+    def test_should_clear_tx_timeout(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('tx-timeout 0')
+
+        sert(d.transport.set_tx_timeout).called_once_with(None)
+
+
+    @patch('src.log.e')
+    def test_should_not_set_negative_tx_timeout(self, mock_e):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('tx-timeout 3')
+        d.set_config('tx-timeout -1')
+
+        sert(mock_e).called_once_with('Value must be >= 0')
+        sert(d.transport.set_tx_timeout).called_once_with(3.0)
+        sert(d.config['tx-timeout'].value).to_equal(3.0)
+
+
+    def test_should_set_rx_channel(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-channel right')
+
+        sert(d.transport.set_rx_channel).called_once_with('right')
+
+
+    def test_should_set_rx_detector(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-detector matched')
+
+        sert(d.transport.set_rx_detector).called_once_with('matched')
+
+
+    def test_should_set_rx_match(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-match 0.6')
+
+        sert(d.transport.set_rx_detector).called_once_with('threshold', 0.6)
+
+
+    @patch('src.log.e')
+    def test_should_not_set_rx_match_out_of_range(self, mock_e):
+        d = src.dispatcher.Dispatcher()
+
+        d.set_config('rx-match 1.5')
+
+        sert(mock_e).called_once_with('Match must be >= 0 and <= 1')
+        sert(d.config['rx-match'].value).to_equal(0.8)
+
+
+    def test_should_set_rx_reject(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-reject false')
+
+        sert(d.transport.set_rx_reject).called_once_with(False)
+
+
+    def test_should_set_rx_sensitivity(self):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.set_config('rx-sensitivity 0.25')
+
+        sert(d.transport.set_rx_sensitivity).called_once_with(0.25)
+
+
+    @patch('src.log.e')
+    def test_should_reject_bad_rx_sensitivity(self, mock_e):
+        d = src.dispatcher.Dispatcher()
+
+        d.set_config('rx-sensitivity 1.5')
+
+        sert(mock_e).called_once_with('Sensitivity must be >= 0 and <= 1')
+        sert(d.config['rx-sensitivity'].value).to_equal(0.11)
+        sert(d.transport.rx_sensitivity()).to_equal(0.11)
+
+
 
 class TestDispatcherShowConfig(unittest.TestCase):
 
@@ -676,12 +837,33 @@ class TestDispatcherShowConfig(unittest.TestCase):
 
         d.show_config('')
 
-        sert(mock_i).called_n_times(5)
-        sert(mock_i).nth_call_called_with(1, '  exit-on-error : false')
-        sert(mock_i).nth_call_called_with(2, '  local-echo    : true')
-        sert(mock_i).nth_call_called_with(3, '  log-level     : 5')
-        sert(mock_i).nth_call_called_with(4, '  trace-on-error: true')
-        sert(mock_i).nth_call_called_with(5, '  wav-prefix    : ')
+        sert(mock_i).called_n_times(16)
+        sert(mock_i).nth_call_called_with(1, '  audio-buffer  : 0')
+        sert(mock_i).nth_call_called_with(2, '  audio-latency : 0.0')
+        sert(mock_i).nth_call_called_with(3, '  exit-on-error : false')
+        sert(mock_i).nth_call_called_with(4, '  local-echo    : true')
+        sert(mock_i).nth_call_called_with(5, '  log-level     : 5')
+        sert(mock_i).nth_call_called_with(6, '  rx-agc        : false')
+        sert(mock_i).nth_call_called_with(7, '  rx-alternates : false')
+        sert(mock_i).nth_call_called_with(8, '  rx-channel    : auto')
+        sert(mock_i).nth_call_called_with(9, '  rx-detector   : threshold')
+        sert(mock_i).nth_call_called_with(10, '  rx-match      : 0.8')
+        sert(mock_i).nth_call_called_with(11, '  rx-reject     : true')
+        sert(mock_i).nth_call_called_with(12, '  rx-sensitivity: 0.11')
+        sert(mock_i).nth_call_called_with(13, '  trace-on-error: true')
+        sert(mock_i).nth_call_called_with(14, '  tx-continuous : false')
+        sert(mock_i).nth_call_called_with(15, '  tx-timeout    : 0.0')
+        sert(mock_i).nth_call_called_with(16, '  wav-prefix    : ')
+
+
+    @patch('src.log.i')
+    def test_should_show_current_rx_sensitivity(self, mock_i):
+        d = src.dispatcher.Dispatcher()
+        d.transport.rx.sensitivity = 0.1234567
+
+        d.show_config('rx-s')
+
+        sert(mock_i).called_once_with('  rx-sensitivity: 0.123')
 
 
     @patch('src.log.i')
@@ -694,6 +876,90 @@ class TestDispatcherShowConfig(unittest.TestCase):
 
 
 
+class TestDispatcherStats(unittest.TestCase):
+
+    @patch('src.log.i')
+    def test_should_show_stats(self, mock_i):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+        d.transport.rx_stats.return_value = TAttrBag(frames=120, stop_errors=2, rejected=3, spurious=5,
+                dropped=0, snr=24.06, bytes_per_sec=198.34, bit_rate=2401.2, sensitivity=0.11, channel='left',
+                audio=TAttrBag(high_water=22050, capacity=176400, overruns=0))
+        d.transport.tx_stats.return_value = TAttrBag(writes=4, drain=0.0214, max_drain=0.05, timeouts=1)
+
+        d.stats()
+
+        sert(mock_i).called_n_times(15)
+        sert(mock_i).nth_call_called_with(1, '  frames          : 120')
+        sert(mock_i).nth_call_called_with(3, '  rejected        : 3')
+        sert(mock_i).nth_call_called_with(6, '  snr             : 24.1 dB')
+        sert(mock_i).nth_call_called_with(7, '  bytes-per-sec   : 198.3')
+        sert(mock_i).nth_call_called_with(8, '  bit-rate        : 2401')
+        sert(mock_i).nth_call_called_with(10, '  channel         : left')
+        sert(mock_i).nth_call_called_with(11, '  audio-high-water: 12%')
+        sert(mock_i).nth_call_called_with(13, '  tx-drain        : 21 ms')
+        sert(mock_i).nth_call_called_with(14, '  tx-drain-max    : 50 ms')
+        sert(mock_i).nth_call_called_with(15, '  tx-timeouts     : 1')
+
+
+    @patch('src.log.i')
+    def test_should_show_unknown_snr(self, mock_i):
+        d = src.dispatcher.Dispatcher()
+
+        d.stats()
+
+        sert(mock_i).nth_call_called_with(6, '  snr             : -')
+
+
+    @patch('src.log.i')
+    def test_should_reset_stats(self, mock_i):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+
+        d.stats('reset')
+
+        sert(d.transport.reset_rx_stats).called_once()
+        sert(d.transport.reset_tx_stats).called_once()
+        sert(mock_i).called_once_with('Stats reset')
+
+
+
+class TestDispatcherCalibrate(unittest.TestCase):
+
+    @patch('src.log.i')
+    @patch('src.dispatcher.wavdecode')
+    def test_should_set_sensitivity(self, mock_wavdecode, mock_i):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+        d.transport.rx_capture.return_value = 'abc'
+        d.transport.framerate = 14400
+        mock_wavdecode.sweep_sensitivity.return_value = (0.26, [])
+
+        d.calibrate('3')
+
+        sert(d.transport.rx_capture).called_once_with(3.0)
+        sert(mock_wavdecode.sweep_sensitivity).called_once_with('abc', 14400)
+        sert(d.transport.set_rx_sensitivity).called_once_with(0.26)
+        sert(d.transport.clear_buffer).called_once()
+        sert(d.config['rx-sensitivity'].value).to_equal(0.26)
+        sert(mock_i).nth_call_called_with(2, 'Sensitivity set to 0.26')
+
+
+    @patch('src.log.w')
+    @patch('src.dispatcher.wavdecode')
+    def test_should_keep_sensitivity_without_data(self, mock_wavdecode, mock_w):
+        d = src.dispatcher.Dispatcher()
+        d.transport = Mock()
+        mock_wavdecode.sweep_sensitivity.return_value = (None, [])
+
+        d.calibrate()
+
+        sert(d.transport.rx_capture).called_once_with(5.0)
+        sert(d.transport.set_rx_sensitivity).not_called()
+        sert(mock_w).called_once_with('No data received. Sensitivity not changed')
+
+
+
 class TestDispatcherEcho(unittest.TestCase):
 
     @patch('src.log.i')
@@ -715,10 +981,11 @@ class TestDispatcherHelp(unittest.TestCase):
 
         d.help()
 
-        sert(mock_i).called_n_times(19)
+        sert(mock_i).called_n_times(32)
         # Spot check
-        sert(mock_i).nth_call_called_with(3, '  local-echo    : Echo command line locally {false, true}')
-        sert(mock_i).nth_call_called_with(11, '  listen [COUNT [SECS]]: Listen for incoming data (30 1)')
+        sert(mock_i).nth_call_called_with(5, '  local-echo    : Echo command line locally {false, true}')
+        sert(mock_i).nth_call_called_with(7, '  rx-agc        : Adapt Rx sensitivity to the signal {false, true}')
+        sert(mock_i).nth_call_called_with(23, '  listen [COUNT [SECS]]: Listen for incoming data (30 1)')
 
 
 
@@ -1039,6 +1306,24 @@ class TestDispatcherExecLine(unittest.TestCase):
         sert(d.show_config).called_once_with('ab cd')
 
 
+    def test_should_call_calibrate(self):
+        d = src.dispatcher.Dispatcher()
+        d.calibrate = Mock()
+
+        d.exec_line('calibrate 2')
+
+        sert(d.calibrate).called_once_with('2')
+
+
+    def test_should_call_stats(self):
+        d = src.dispatcher.Dispatcher()
+        d.stats = Mock()
+
+        d.exec_line('stats reset')
+
+        sert(d.stats).called_once_with('reset')
+
+
     def test_should_call_set_config(self):
         d = src.dispatcher.Dispatcher()
         d.set_config = Mock()
@@ -45,6 +45,14 @@ class FakeTransport(src.transport.Transport):
         pass
 
 
+    def rx_alternates(self):
+        return []
+
+
+    def clear_rx_alternates(self):
+        pass
+
+
 def cmd_str(s):
     return '{} {} {} EVAL'.format(LEFT_CHEVRON, s, RIGHT_CHEVRON)
 
@@ -353,19 +353,18 @@ class TestKermitProtocolReadyBytes(unittest.TestCase):
 
 class TestKermitProtocolPollForPacketfulOfBytes(unittest.TestCase):
 
-    @patch('time.sleep')
-    def test_should_return_none(self, mock_sleep):
+    def test_should_return_none(self):
         k = src.kprotocol.KermitProtocol(Mock())
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=6)
 
         ans = k._poll_for_packetful_of_bytes()
 
         sert(ans).to_equal(None)
 
 
-    @patch('time.sleep')
-    def test_should_return_bytes(self, mock_sleep):
+    def test_should_return_bytes(self):
         bytes = [65, 66]
         mock_transport = Mock()
         mock_transport.read_bytes = Mock(return_value=bytes)
@@ -378,11 +377,11 @@ class TestKermitProtocolPollForPacketfulOfBytes(unittest.TestCase):
         sert(ans).to_equal(bytes)
 
 
-    @patch('time.sleep')
-    def test_should_dislodge_data(self, mock_sleep):
+    def test_should_dislodge_data(self):
         k = src.kprotocol.KermitProtocol(Mock())
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=6)
         k._dislodge_stale_data = Mock()
 
         ans = k._poll_for_packetful_of_bytes()
@@ -391,8 +390,7 @@ class TestKermitProtocolPollForPacketfulOfBytes(unittest.TestCase):
 
 
     @patch('src.kprotocol.log')
-    @patch('time.sleep')
-    def test_should_log(self, mock_sleep, mock_log):
+    def test_should_log(self, mock_log):
         bytes = [65]
         mock_transport = Mock()
         mock_transport.read_bytes = Mock(return_value=bytes)
@@ -406,36 +404,37 @@ class TestKermitProtocolPollForPacketfulOfBytes(unittest.TestCase):
         sert(mock_log.i).called_once_with("Received ['A']")
 
 
-    @patch('time.sleep')
-    def test_should_poll(self, mock_sleep):
+    def test_should_poll(self):
         k = src.kprotocol.KermitProtocol(Mock())
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=6)
 
         ans = k._poll_for_packetful_of_bytes()
 
         sert(k._ready_bytes).called_n_times(60)
 
 
-    @patch('time.sleep')
-    def test_should_sleep(self, mock_sleep):
-        k = src.kprotocol.KermitProtocol(Mock())
+    def test_should_wait(self):
+        mock_transport = Mock()
+        k = src.kprotocol.KermitProtocol(mock_transport)
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=6)
         num = 20
 
         ans = k._poll_for_packetful_of_bytes(num)
 
-        sert(mock_sleep).called_n_times(num)
+        sert(mock_transport.wait_for_bytes).called_n_times(num)
         for i in range(1, num+1):
-            sert(mock_sleep).nth_call_called_with(i, 0.1)
+            sert(mock_transport.wait_for_bytes).nth_call_called_with(i, 6, 0.1)
 
 
-    @patch('time.sleep')
-    def test_should_poll_num_times(self, mock_sleep):
+    def test_should_poll_num_times(self):
         k = src.kprotocol.KermitProtocol(Mock())
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=6)
         num = 20
 
         ans = k._poll_for_packetful_of_bytes(num)
@@ -443,19 +442,39 @@ class TestKermitProtocolPollForPacketfulOfBytes(unittest.TestCase):
         sert(k._ready_bytes).called_n_times(num)
 
 
-    @patch('time.sleep')
-    def test_should_sleep_with_given_delay(self, mock_sleep):
-        k = src.kprotocol.KermitProtocol(Mock())
+    def test_should_wait_with_given_delay(self):
+        mock_transport = Mock()
+        k = src.kprotocol.KermitProtocol(mock_transport)
         k._prep_buffer = Mock()
         k._ready_bytes = Mock(return_value=0)
+        k._needed_bytes = Mock(return_value=40)
         num = 20
         delay = 0.3
 
         ans = k._poll_for_packetful_of_bytes(num, delay)
 
-        sert(mock_sleep).called_n_times(num)
+        sert(mock_transport.wait_for_bytes).called_n_times(num)
         for i in range(1, num+1):
-            sert(mock_sleep).nth_call_called_with(i, delay)
+            sert(mock_transport.wait_for_bytes).nth_call_called_with(i, 40, delay)
+
+
+
+class TestKermitProtocolNeededBytes(unittest.TestCase):
+
+    def test_should_return_min_length_without_length_field(self):
+        mock_transport = Mock()
+        mock_transport.peek_bytes = Mock(return_value=[1])
+        k = src.kprotocol.KermitProtocol(mock_transport)
+
+        sert(k._needed_bytes()).to_equal(6)
+
+
+    def test_should_return_packet_length(self):
+        mock_transport = Mock()
+        mock_transport.peek_bytes = Mock(return_value=[1, ord('+')])
+        k = src.kprotocol.KermitProtocol(mock_transport)
+
+        sert(k._needed_bytes()).to_equal(14)
 
 
 
@@ -547,19 +566,47 @@ class TestKermitProtocolReadAnyPacket(unittest.TestCase):
 
     @patch('time.sleep', new=Mock())
     def test_should_return_none(self):
-        k = src.kprotocol.KermitProtocol(Mock())
+        k = src.kprotocol.KermitProtocol(Mock(**{'rx_alternates.return_value': []}))
         k._poll_for_packetful_of_bytes = Mock(return_value=None)
 
         sert(k.read_any_packet()).to_equal(None)
 
 
     def test_should_return_none_for_invalid_bytes(self):
-        k = src.kprotocol.KermitProtocol(Mock())
+        k = src.kprotocol.KermitProtocol(Mock(**{'rx_alternates.return_value': []}))
         k._poll_for_packetful_of_bytes = Mock(return_value=[1, 65, 66])
 
         sert(k.read_any_packet()).to_equal(None)
 
 
+    def test_should_read_packet_from_alternate(self):
+        good = bytearray(''.join(src.kprotocol.P(1).finish().to_list()))
+        bad = good[:]
+        bad[4] ^= 0x01
+        tport = Mock()
+        tport.rx_alternates.return_value = [bytearray('\x01x') + bad, bytearray('ab') + good]
+        k = src.kprotocol.KermitProtocol(tport)
+        k._poll_for_packetful_of_bytes = Mock(return_value=list(bad))
+
+        pkt = k.read_any_packet()
+
+        sert(pkt.to_list()).to_equal(['\x01', '$', ' ', 'G', 'F', '4', '\r'])
+        sert(tport.clear_buffer).called_once()
+        sert(tport.clear_rx_alternates).called_once()
+
+
+    def test_should_prefer_packet_from_buffer(self):
+        bytes = [ord(b) for b in src.kprotocol.P(1).finish().to_list()]
+        tport = Mock()
+        k = src.kprotocol.KermitProtocol(tport)
+        k._poll_for_packetful_of_bytes = Mock(return_value=bytes)
+
+        k.read_any_packet()
+
+        sert(tport.rx_alternates).not_called()
+        sert(tport.clear_rx_alternates).called_once()
+
+
     def test_should_return_blockcheck1(self):
         blockcheck = 1
         bytes = [ord(b) for b in src.kprotocol.P(blockcheck).finish().to_list()]
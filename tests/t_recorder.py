@@ -0,0 +1,132 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import wave
+from mock import patch
+
+import src.recorder
+
+from tests.sert import sert
+
+
+tmp_dir = None
+
+
+def wav_info(filename):
+    wf = wave.open(filename, 'rb')
+    info = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate(), wf.readframes(wf.getnframes()))
+    wf.close()
+    return info
+
+
+
+class Base(unittest.TestCase):
+
+    def setUp(self):
+        global tmp_dir
+        tmp_dir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(tmp_dir)
+
+
+    def path(self, name):
+        return os.path.join(tmp_dir, name)
+
+
+
+class TestRotatedName(unittest.TestCase):
+
+    def test_should_keep_first_name(self):
+        sert(src.recorder.rotated_name('pfx_rx.wav', 0)).to_equal('pfx_rx.wav')
+
+
+    def test_should_number_later_names(self):
+        sert(src.recorder.rotated_name('pfx_rx.wav', 2)).to_equal('pfx_rx_2.wav')
+
+
+
+class TestWrite(Base):
+
+    def test_should_write_wav_file(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+
+        rec.write('\x01\x00\x02\x00')
+        rec.write('\x03\x00')
+        rec.close()
+
+        sert(wav_info(self.path('a.wav'))).to_equal((1, 2, 14400, '\x01\x00\x02\x00\x03\x00'))
+
+
+    def test_should_write_silence(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+
+        rec.write('\x01\x00')
+        rec.write_silence(5000)
+        rec.write('\x02\x00')
+        rec.close()
+
+        sert(wav_info(self.path('a.wav'))[3]).to_equal('\x01\x00' + ('\x00' * 10000) + '\x02\x00')
+
+
+    def test_should_write_empty_file(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+
+        rec.close()
+
+        sert(wav_info(self.path('a.wav'))[3]).to_equal('')
+
+
+    def test_should_ignore_writes_after_close(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+        rec.close()
+
+        rec.write('\x01\x00')
+        rec.write_silence(10)
+
+        sert(rec.queue.qsize()).to_equal(0)
+
+
+    def test_should_drop_audio_when_queue_is_full(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+        rec.close()
+        rec.is_closed = False # Nothing is draining the queue now
+
+        for _ in range(src.recorder.QUEUE_LEN + 3):
+            rec.write('\x01\x00')
+
+        sert(rec.dropped).to_equal(3)
+
+
+
+class TestFlush(Base):
+
+    @patch('src.recorder.FLUSH_SECS', 0.01)
+    def test_should_leave_valid_file_while_recording(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400)
+
+        rec.write('\x01\x00\x02\x00')
+        time.sleep(0.2)
+
+        sert(wav_info(self.path('a.wav'))[3]).to_equal('\x01\x00\x02\x00')
+        rec.close()
+
+
+
+class TestRotate(Base):
+
+    def test_should_start_new_file_at_max_bytes(self):
+        rec = src.recorder.WavRecorder(self.path('a.wav'), 1, 2, 14400, max_bytes=4)
+
+        rec.write('\x01\x00\x02\x00')
+        rec.write('\x03\x00')
+        rec.write('\x04\x00')
+        rec.write('\x05\x00\x06\x00')
+        rec.close()
+
+        sert(wav_info(self.path('a.wav'))[3]).to_equal('\x01\x00\x02\x00')
+        sert(wav_info(self.path('a_1.wav'))[3]).to_equal('\x03\x00\x04\x00')
+        sert(wav_info(self.path('a_2.wav'))[3]).to_equal('\x05\x00\x06\x00')
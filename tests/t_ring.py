@@ -0,0 +1,210 @@
+import unittest
+import threading
+
+import src.ring
+
+from tests.sert import sert
+
+
+
+class TestWrite(unittest.TestCase):
+
+    def test_should_write_and_read(self):
+        r = src.ring.ByteRing(8)
+
+        n = r.write('abc')
+
+        sert(n).to_equal(3)
+        sert(len(r)).to_equal(3)
+        sert(r.read(8)).to_equal(bytearray('abc'))
+        sert(len(r)).to_equal(0)
+
+
+    def test_should_wrap_around(self):
+        r = src.ring.ByteRing(8)
+        r.write('abcdef')
+        r.read(5)
+
+        r.write('ghijklm')
+
+        sert(r.read(3)).to_equal(bytearray('fgh'))
+        sert(r.read(8)).to_equal(bytearray('ijklm'))
+
+
+    def test_should_keep_data_contiguous(self):
+        r = src.ring.ByteRing(4)
+        for i in range(50):
+            r.write(chr(65 + (i % 26)) * 3)
+
+            sert(r.read(3)).to_equal(bytearray(chr(65 + (i % 26)) * 3))
+
+
+    def test_should_drop_write_that_does_not_fit(self):
+        r = src.ring.ByteRing(4)
+        r.write('abc')
+
+        n = r.write('de')
+
+        sert(n).to_equal(0)
+        sert(r.read(8)).to_equal(bytearray('abc'))
+
+
+    def test_should_count_overruns(self):
+        r = src.ring.ByteRing(4)
+        r.write('abc')
+        r.write('de')
+        r.write('fghij')
+
+        stats = r.stats()
+
+        sert(stats.overruns).to_equal(2)
+        sert(stats.dropped).to_equal(7)
+        sert(stats.occupancy).to_equal(3)
+        sert(stats.capacity).to_equal(4)
+
+
+    def test_should_track_high_water(self):
+        r = src.ring.ByteRing(8)
+        r.write('abcde')
+        r.read(5)
+        r.write('ab')
+
+        sert(r.stats().high_water).to_equal(5)
+
+
+
+class TestResetStats(unittest.TestCase):
+
+    def test_should_reset_counters(self):
+        r = src.ring.ByteRing(4)
+        r.write('abc')
+        r.write('de')
+        r.read(2)
+
+        r.reset_stats()
+        stats = r.stats()
+
+        sert(stats.overruns).to_equal(0)
+        sert(stats.dropped).to_equal(0)
+        sert(stats.high_water).to_equal(1)
+        sert(stats.occupancy).to_equal(1)
+
+
+
+class TestClear(unittest.TestCase):
+
+    def test_should_discard_data(self):
+        r = src.ring.ByteRing(8)
+        r.write('abc')
+
+        r.clear()
+
+        sert(len(r)).to_equal(0)
+        sert(r.read(8)).to_equal(bytearray())
+
+
+
+class TestWait(unittest.TestCase):
+
+    def test_should_return_when_data_is_available(self):
+        r = src.ring.ByteRing(8)
+        r.write('ab')
+
+        sert(r.wait(2, 0)).is_true()
+
+
+    def test_should_time_out(self):
+        r = src.ring.ByteRing(8)
+        r.write('a')
+
+        sert(r.wait(2, 0.01)).is_false()
+
+
+    def test_should_wake_on_write(self):
+        r = src.ring.ByteRing(8)
+        t = threading.Timer(0.01, r.write, ['abc'])
+        t.start()
+
+        sert(r.wait(3, 5)).is_true()
+        t.join()
+
+
+
+class TestFind(unittest.TestCase):
+
+    def test_should_find_sub(self):
+        r = src.ring.ByteRing(8)
+        r.write('abcabc')
+        r.read(1)
+
+        sert(r.find('ca')).to_equal(1)
+        sert(r.find('x')).to_equal(-1)
+
+
+    def test_should_find_wrapped_sub(self):
+        r = src.ring.ByteRing(8)
+        r.write('abcdef')
+        r.read(5)
+        r.write('ghijklm')
+
+        sert(r.find('hij')).to_equal(2)
+
+
+
+class TestWaitFor(unittest.TestCase):
+
+    def test_should_return_length_through_sub(self):
+        r = src.ring.ByteRing(8)
+        r.write('abZZc')
+
+        sert(r.wait_for('ZZ', 0)).to_equal(4)
+
+
+    def test_should_time_out(self):
+        r = src.ring.ByteRing(8)
+        r.write('abZ')
+
+        sert(r.wait_for('ZZ', 0.01)).to_equal(-1)
+
+
+    def test_should_find_sub_split_across_writes(self):
+        r = src.ring.ByteRing(8)
+        r.write('abZ')
+        t = threading.Timer(0.01, r.write, ['Zc'])
+        t.start()
+
+        sert(r.wait_for('ZZ', 5)).to_equal(4)
+        t.join()
+
+
+
+class TestPeek(unittest.TestCase):
+
+    def test_should_not_remove_data(self):
+        r = src.ring.ByteRing(8)
+        r.write('abc')
+
+        v = r.peek(2)
+
+        sert(v.tobytes()).to_equal('ab')
+        sert(len(r)).to_equal(3)
+
+
+    def test_should_view_wrapped_data(self):
+        r = src.ring.ByteRing(8)
+        r.write('abcdef')
+        r.read(5)
+        r.write('ghijklm')
+
+        sert(r.peek(8).tobytes()).to_equal('fghijklm')
+
+
+    def test_should_share_storage(self):
+        r = src.ring.ByteRing(8)
+        r.write('abc')
+
+        v = r.peek(3)
+
+        sert(v.readonly).is_false()
+        r.buf[0] = 'x'
+        sert(v.tobytes()).to_equal('xbc')
@@ -3,19 +3,35 @@ from mock import patch, call, Mock, MagicMock, DEFAULT
 import struct
 
 import src.Rx
+import src.ring
 
 from tests.sert import sert
 
 sleep_counter = 0
 mock_rxpa = None
+mock_recorder = None
 rx = None
 wav_data = []
 
 pa_callback = None
 
+CHAR_BUF_FILL = (src.Rx.CHAR_BUF_SIZE + 1) * [65]
+
+
+def frame(byte):
+    """A frame at 14400 samples/sec, i.e. 6 samples per bit"""
+    samps = 6 * [0] + [32767] + 5 * [0]
+    for _ in range(8):
+        if byte & 0x01:
+            samps += 6 * [0]
+        else:
+            samps += [32767] + 5 * [0]
+        byte >>= 1
+    return samps + 12 * [0]
+
 
 def default_cfg(config):
-    names = ['samp_width', 'chan', 'framerate', 'quiet_init', 'wav_file', 'sensitivity']
+    names = ['samp_width', 'chan', 'framerate', 'quiet_init', 'wav_file', 'sensitivity', 'ring_secs']
     dct = {}
     for name in names:
         dct[name] = None
@@ -50,29 +66,33 @@ def get_mock_stream():
 
 
 
-class F:
-
-    def sleep(self, secs):
-        global sleep_counter
-        rx.is_started = True
-        if sleep_counter < len(wav_data):
-            dat = wav_data[sleep_counter]
-            in_data = struct.pack('<'+str(len(dat))+'h', *dat)
-            frame_count = len(dat)
-            time_info = 0
-            status = 0
-            pa_callback(in_data, frame_count, time_info, status)
-        else:
-            rx.all_done()
-        sleep_counter += 1
-        if sleep_counter > 1000:
-            raise Exception('fake_sleep was called too many times')
+def fake_wait(n, timeout):
+    """Simulate PortAudio by calling callback while the Rx thread waits"""
+    global sleep_counter
+    rx.is_started = True
+    if sleep_counter < len(wav_data):
+        dat = wav_data[sleep_counter]
+        in_data = struct.pack('<'+str(len(dat))+'h', *dat)
+        frame_count = len(dat)
+        time_info = 0
+        status = 0
+        pa_callback(in_data, frame_count, time_info, status)
+    else:
+        rx.all_done()
+    sleep_counter += 1
+    if sleep_counter > 1000:
+        raise Exception('fake_wait was called too many times')
+    return len(rx.raw_ring) >= n
 
 
 
 class Base(unittest.TestCase):
 
     def setUp(self):
+        global mock_recorder
+        patcher = patch('src.Rx.recorder')
+        mock_recorder = patcher.start()
+        self.addCleanup(patcher.stop)
         del wav_data[:] # clear list
         self.init_rx({})
 
@@ -95,7 +115,9 @@ class Base(unittest.TestCase):
         quiet_init = cfg['quiet_init'] or True
         wav_file = cfg['wav_file']
         sensitivity = cfg['sensitivity'] or 0.11
-        rx = src.Rx.Rx(samp_width, chan, framerate, quiet_init, wav_file, sensitivity)
+        ring_secs = cfg['ring_secs'] or 2.0
+        rx = src.Rx.Rx(samp_width, chan, framerate, quiet_init, wav_file, sensitivity, ring_secs)
+        rx.raw_ring.wait = fake_wait
 
 
 
@@ -119,32 +141,67 @@ class TestStartRx(Base):
 
 
 
+class TestBuffering(Base):
+
+    @patch('src.Rx.threading')
+    def test_should_open_stream_with_buffer_size(self, mock_threading):
+        mock_threading.Thread.return_value.start = fake_start(mock_threading)
+        rx.set_buffering(256, None)
+
+        rx.run()
+
+        sert(mock_rxpa.get_instance.return_value.open.call_args[1]['frames_per_buffer']).to_equal(256)
+
+
+    def test_should_use_default_buffer_size(self):
+        sert(rx.buffer_frames).to_equal(1024)
+
+
+    def test_should_derive_buffer_size_from_latency(self):
+        rx.set_buffering(None, 0.01)
+
+        sert(rx.buffer_frames).to_equal(144)
+
+
+    @patch('src.Rx.threading')
+    def test_should_reopen_stream(self, mock_threading):
+        mock_threading.Thread.return_value.start = fake_start(mock_threading)
+        def reopen(*args):
+            rx.set_buffering(512, None)
+        wav_data.append([0, 0])
+        rx._put_bytes = reopen
+
+        rx.run()
+
+        sert(get_mock_stream().close).called_twice()
+        sert(mock_rxpa.get_instance.return_value.open.call_args[1]['frames_per_buffer']).to_equal(512)
+
+
+
 class TestAllDone(Base):
 
-    def test_should_write_file_only_once(self):
+    def test_should_close_recorder_only_once(self):
         self.init_rx({'wav_file' : 'file.wav'})
         rx.is_started = True
-        rx.write_wav = Mock()
         rx.thread = Mock()
+        rec = rx.recorder
         rx.all_done()
-        sert(rx.write_wav).called_once()
+        sert(rec.close).called_once()
 
         rx.all_done()
 
-        sert(rx.write_wav).called_once()
+        sert(rec.close).called_once()
 
 
-    def test_should_save_session_when_wav_file_is_given(self):
+    def test_should_stop_recording(self):
         self.init_rx({'wav_file' : 'file.wav'})
         rx.is_started = True
-        rx.session_buffer = [33, 44]
-        rx.write_wav = Mock()
         rx.thread = Mock()
-        sert(rx.write_wav).not_called()
 
         rx.all_done()
 
-        sert(rx.write_wav).called_once_with('file.wav', bytearray([33, 44]))
+        sert(rx.recorder).to_equal(None)
+        sert(rx.wav_file).to_equal(None)
 
 
     def test_should_join_thread(self):
@@ -161,15 +218,6 @@ class TestAllDone(Base):
 
 class TestSetWavFilename(Base):
 
-    def test_should_clear_session_buffer(self):
-        filename = None
-        rx.session_buffer = [33, 44]
-
-        rx.set_wav_filename(filename)
-
-        sert(rx.session_buffer).to_equal([])
-
-
     def test_should_set_wav_file(self):
         filename = 'abc.wav'
         sert(rx.wav_file).to_equal(None)
@@ -179,61 +227,94 @@ class TestSetWavFilename(Base):
         sert(rx.wav_file).to_equal(filename)
 
 
-    def test_should_set_record_session(self):
+    def test_should_start_recorder(self):
         filename = 'abc.wav'
-        sert(rx.record_session).is_false()
+        sert(rx.recorder).to_equal(None)
 
         rx.set_wav_filename(filename)
 
-        sert(rx.record_session).is_true()
+        sert(mock_recorder.WavRecorder).called_once_with('abc.wav', 1, 2, 14400, None)
+        assert rx.recorder is mock_recorder.WavRecorder.return_value
 
 
-    def test_should_clear_record_session(self):
-        filename = None
-        rx.record_session = True
+    def test_should_pass_max_size_to_recorder(self):
+        rx.wav_max = 1000
 
-        rx.set_wav_filename(filename)
+        rx.set_wav_filename('abc.wav')
 
-        sert(rx.record_session).is_false()
+        sert(mock_recorder.WavRecorder).called_once_with('abc.wav', 1, 2, 14400, 1000)
 
 
-    @patch('wave.open')
-    def test_should_save_session_buffer(self, mock_open):
-        wavdat = [33, 44]
-        filename = None
-        rx.session_buffer = wavdat
-        rx.wav_file = 'abc.txt'
+    def test_should_close_previous_recorder(self):
+        old = Mock()
+        rx.recorder = old
 
-        rx.set_wav_filename(filename)
+        rx.set_wav_filename(None)
 
-        sert(mock_open).called_once()
-        sert(mock_open).called_with('abc.txt', 'wb')
-        sert(mock_open.return_value.writeframes).called_with(bytearray(wavdat))
-        sert(mock_open.return_value.close).called_once()
+        sert(old.close).called_once()
+        sert(rx.recorder).to_equal(None)
 
 
 
 class TestPeekBytes(Base):
 
     def test_should_peek_bytes(self):
-        rx.char_buf = ['a', 'b', 'c']
+        rx.char_buf.write('abc')
 
         b = rx.peek_bytes(2)
 
-        sert(b).to_equal(['a', 'b'])
-        sert(rx.char_buf).to_equal(['a', 'b', 'c'])
+        sert(b).to_equal(bytearray('ab'))
+        sert(rx.num_bytes()).to_equal(3)
 
 
 
 class TestReadBytes(Base):
 
     def test_should_read_bytes(self):
-        rx.char_buf = ['a', 'b', 'c']
+        rx.char_buf.write('abc')
 
         b = rx.read_bytes(2)
 
-        sert(b).to_equal(['a', 'b'])
-        sert(rx.char_buf).to_equal(['c'])
+        sert(b).to_equal(bytearray('ab'))
+        sert(rx.peek_bytes(5)).to_equal(bytearray('c'))
+
+
+
+class TestWaitForBytes(Base):
+
+    def test_should_return_when_bytes_are_available(self):
+        rx.char_buf.write('abc')
+
+        sert(rx.wait_for_bytes(3, 0)).is_true()
+
+
+    def test_should_time_out(self):
+        rx.char_buf.write('abc')
+
+        sert(rx.wait_for_bytes(4, 0.01)).is_false()
+
+
+
+class TestReadUntil(Base):
+
+    def test_should_read_through_byte(self):
+        rx.char_buf.write('ab\rcd')
+
+        sert(rx.read_until(13, 0)).to_equal(bytearray('ab\r'))
+        sert(rx.peek_bytes(5)).to_equal(bytearray('cd'))
+
+
+    def test_should_read_through_string(self):
+        rx.char_buf.write('abZZc')
+
+        sert(rx.read_until('ZZ', 0)).to_equal(bytearray('abZZ'))
+
+
+    def test_should_return_none_on_timeout(self):
+        rx.char_buf.write('abZ')
+
+        sert(rx.read_until('ZZ', 0.01)).to_equal(None)
+        sert(rx.num_bytes()).to_equal(3)
 
 
 
@@ -259,7 +340,6 @@ class TestRun(Base):
         sert(mock_threading.Thread, 'start').called_once()
 
 
-    @patch('src.Rx.time', new=F())
     @patch('src.Rx.threading')
     def test_should_start_stop_close_stream(self, mock_threading):
         mock_threading.Thread.return_value.start = fake_start(mock_threading)
@@ -275,7 +355,6 @@ class TestRun(Base):
         sert(stream.close).called_once()
 
 
-    @patch('src.Rx.time', new=F())
     @patch('src.Rx.threading')
     def test_should_decode_zero(self, mock_threading):
         samps = [0,0,0,0,0,0,
@@ -298,10 +377,9 @@ class TestRun(Base):
 
         bytes = rx.peek_bytes(1000)
         sert(len(bytes)).to_equal(1)
-        sert(bytes).to_equal([0])
+        sert(bytes).to_equal(bytearray([0]))
 
 
-    @patch('src.Rx.time', new=F())
     @patch('src.Rx.threading')
     def test_should_decode_one(self, mock_threading):
         samps = [0,0,0,0,0,0,
@@ -324,10 +402,9 @@ class TestRun(Base):
 
         bytes = rx.peek_bytes(1000)
         sert(len(bytes)).to_equal(1)
-        sert(bytes).to_equal([1])
+        sert(bytes).to_equal(bytearray([1]))
 
 
-    @patch('src.Rx.time', new=F())
     @patch('src.Rx.threading')
     def test_should_ignore_edge_outside_frame(self, mock_threading):
         samps = [0,0,0,0,0,0,
@@ -345,25 +422,416 @@ class TestRun(Base):
                 ]
         wav_data.append(samps)
         mock_threading.Thread.return_value.start = fake_start(mock_threading)
+        rx.set_reject_errors(False)
 
         rx.run()
 
         bytes = rx.peek_bytes(1000)
         sert(len(bytes)).to_equal(1)
-        sert(bytes).to_equal([1])
+        sert(bytes).to_equal(bytearray([1]))
+
+
+    @patch('src.Rx.threading')
+    def test_should_reject_frame_with_edge_in_stop_bit(self, mock_threading):
+        samps = frame(0x01)
+        samps[6 * 10 - 1] = 9000
+        wav_data.append(samps)
+        mock_threading.Thread.return_value.start = fake_start(mock_threading)
+
+        rx.run()
+
+        sert(len(rx.peek_bytes(1000))).to_equal(0)
+        sert(rx.stats().rejected).to_equal(1)
 
 
-    @patch('src.Rx.time', new=F())
     @patch('src.Rx.threading')
     def test_should_record_session(self, mock_threading):
         wav_data.append([0x65])
         wav_data.append([0x67])
         mock_threading.Thread.return_value.start = fake_start(mock_threading)
-        rx.record_session = True
+        rec = Mock()
+        rx.recorder = rec
 
         rx.run()
 
-        sert(rx.session_buffer).to_equal(['\x65', '\x00', '\x67', '\x00'])
+        sert(rec.write).called_n_times(2)
+        sert(rec.write).nth_call_called_with(1, '\x65\x00')
+        sert(rec.write).nth_call_called_with(2, '\x67\x00')
+
+
+
+class TestCallback(Base):
+
+    def test_should_queue_audio_without_decoding(self):
+        samps = [0, 32767, 0, 0]
+        in_data = struct.pack('<4h', *samps)
+
+        rx._callback(in_data, len(samps), 0, 0)
+
+        sert(len(rx.raw_ring)).to_equal(8)
+        sert(rx.num_bytes()).to_equal(0)
+
+
+    def test_should_continue_stream(self):
+        (data, result) = rx._callback(struct.pack('<1h', 0), 1, 0, 0)
+
+        sert(result).to_equal(src.Rx.pa.paContinue)
+
+
+    def test_should_count_overruns(self):
+        self.init_rx({'ring_secs': 0.001}) # 14 samples
+        in_data = struct.pack('<10h', *(10 * [0]))
+
+        rx._callback(in_data, 10, 0, 0)
+        rx._callback(in_data, 10, 0, 0)
+
+        stats = rx.ring_stats()
+        sert(stats.overruns).to_equal(1)
+        sert(stats.dropped).to_equal(20)
+        sert(stats.occupancy).to_equal(20)
+
+
+
+class TestBitRate(Base):
+
+    def test_should_start_at_nominal_rate(self):
+        sert(rx.bit_rate()).to_equal(2400.0)
+
+
+    def test_should_follow_demod_period(self):
+        rx.demod.period = 6.0
+
+        sert(rx.bit_rate()).to_equal(2400.0)
+
+        rx.demod.period = 6.1
+
+        sert(round(rx.bit_rate(), 1)).to_equal(2360.7)
+
+
+
+class TestDecodePending(Base):
+
+    def test_should_decode_queued_audio(self):
+        samps = [0,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                0,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                32767,0,0,0,0,0,
+                0,0,0,0,0,0,
+                0,0,0,0,0,0,
+                ]
+        rx._callback(struct.pack('<'+str(len(samps))+'h', *samps), len(samps), 0, 0)
+
+        rx._decode_pending()
+
+        sert(rx.peek_bytes(10)).to_equal(bytearray([1]))
+        sert(len(rx.raw_ring)).to_equal(0)
+
+
+    def test_should_leave_partial_sample_queued(self):
+        rx.raw_ring.write('\x00\x00\x00')
+
+        rx._decode_pending()
+
+        sert(len(rx.raw_ring)).to_equal(1)
+
+
+    @patch('src.log.w')
+    def test_should_warn_of_overrun_once(self, mock_w):
+        self.init_rx({'ring_secs': 0.001})
+        in_data = struct.pack('<10h', *(10 * [0]))
+        rx._callback(in_data, 10, 0, 0)
+        rx._callback(in_data, 10, 0, 0)
+
+        rx._decode_pending()
+        rx._decode_pending()
+
+        sert(mock_w).called_once_with('Rx ring overrun: 20 bytes of audio dropped')
+
+
+    @patch('src.log.w')
+    def test_should_warn_of_data_overrun(self, mock_w):
+        rx.char_buf = src.ring.ByteRing(2)
+
+        rx._put_bytes([65, 66, 67])
+        rx._decode_pending()
+
+        sert(mock_w).called_once_with('Rx ring overrun: 3 bytes of data dropped')
+
+
+
+class TestAlternates(Base):
+
+    def feed(self, samps):
+        rx.raw_ring.write(struct.pack('<'+str(len(samps))+'h', *samps))
+        rx._decode_pending()
+
+
+    def test_should_have_no_alternates_by_default(self):
+        self.feed(frame(0x41))
+
+        sert(rx.alternates()).to_equal([])
+
+
+    def test_should_decode_at_other_thresholds(self):
+        rx.set_alternates(True)
+        weak = [s / 12 for s in frame(0x41)] # Only above the lowest threshold
+        strong = [s / 2 for s in frame(0x42)] # Above every threshold
+
+        self.feed(weak + strong)
+
+        sert(rx.peek_bytes(10)).to_equal(bytearray([0x42]))
+        sert(rx.alternates()).to_equal([bytearray([0x41, 0x42]), bytearray([0x42])])
+
+
+    def test_should_clear_alternates(self):
+        rx.set_alternates(True)
+        self.feed(frame(0x41))
+
+        rx.clear_alternates()
+
+        sert(rx.alternates()).to_equal([bytearray(), bytearray()])
+
+
+    def test_should_set_reject_errors_of_alternates(self):
+        rx.set_alternates(True)
+
+        rx.set_reject_errors(False)
+
+        sert([d.reject_errors for scale, d, buf in rx.alts]).to_equal([False, False])
+
+
+
+class TestDetector(Base):
+
+    def stepped_frames(self):
+        samps = frame(0x41) + frame(0x42)
+        for i in range(66, len(samps)): # A step between the frames, not a pulse
+            samps[i] -= 20000
+        return struct.pack('<'+str(len(samps))+'h', *samps)
+
+
+    def test_should_take_step_as_pulse_with_threshold_detector(self):
+        rx.raw_ring.write(self.stepped_frames())
+        rx._decode_pending()
+
+        sert(rx.peek_bytes(10)).not_equal(bytearray([0x41, 0x42]))
+
+
+    def test_should_ignore_step_with_matched_detector(self):
+        rx.set_detector('matched', 0.9)
+
+        rx.raw_ring.write(self.stepped_frames())
+        rx._decode_pending()
+
+        sert(rx.peek_bytes(10)).to_equal(bytearray([0x41, 0x42]))
+
+
+    def test_should_set_detector_of_alternates(self):
+        rx.set_alternates(True)
+
+        rx.set_detector('matched', 0.5)
+
+        sert([d.detector for d in rx._demods()]).to_equal(3 * ['matched'])
+        sert([d.match_confidence for d in rx._demods()]).to_equal(3 * [0.5])
+
+
+
+def stereo(left, right):
+    samps = []
+    for l, r in zip(left, right):
+        samps += [l, r]
+    return struct.pack('<'+str(len(samps))+'h', *samps)
+
+
+
+class TestStereo(Base):
+
+    def setUp(self):
+        Base.setUp(self)
+        self.init_rx({'chan': 2})
+
+
+    def decode(self, data):
+        rx.raw_ring.write(data)
+        rx._decode_pending()
+
+
+    def test_should_decode_stronger_channel(self):
+        weak = [s / 8 for s in frame(0x41)]
+        self.decode(stereo(64 * [0], 64 * [0])) # Noise floor
+        self.decode(stereo(weak + weak, frame(0x42) + frame(0x43)))
+
+        sert(rx.channel_in_use()).to_equal('right')
+        sert(rx.peek_bytes(10)).to_equal(bytearray([0x42, 0x43]))
+
+
+    def test_should_decode_left_channel(self):
+        rx.set_channel_mode('left')
+
+        self.decode(stereo(frame(0x41), frame(0x42)))
+
+        sert(rx.peek_bytes(10)).to_equal(bytearray([0x41]))
+
+
+    def test_should_decode_sum_of_channels(self):
+        rx.set_channel_mode('mix')
+        half = [s / 12 for s in frame(0x41)] # Too weak alone
+
+        self.decode(stereo(half, half))
+
+        sert(rx.peek_bytes(10)).to_equal(bytearray([0x41]))
+
+
+    def test_should_reject_unknown_mode(self):
+        with self.assertRaises(Exception):
+            rx.set_channel_mode('center')
+
+
+    def test_should_report_mono(self):
+        self.init_rx({})
+
+        sert(rx.channel_in_use()).to_equal('mono')
+
+
+    def test_should_capture_decoded_channel(self):
+        rx.set_channel_mode('right')
+        data = stereo([1, 2, 3, 4], [5, 6, 7, 8])
+        rx.capture_req = None
+        def decode():
+            self.decode(data)
+        rx.framerate = 4 # 4 frames in 1 sec
+        src.Rx.threading.Timer(0.05, decode).start()
+
+        sert(rx.capture(1.0)).to_equal(struct.pack('<4h', 5, 6, 7, 8))
+
+
+
+class TestCapture(Base):
+
+    def test_should_capture_raw_audio(self):
+        in_data = struct.pack('<10h', *range(10))
+        def decode():
+            rx.raw_ring.write(in_data[:6])
+            rx._decode_pending()
+            rx.raw_ring.write(in_data[6:])
+            rx._decode_pending()
+        rx.framerate = 8 # 16 bytes in 1 sec
+        src.Rx.threading.Timer(0.05, decode).start()
+
+        sert(rx.capture(1.0)).to_equal(in_data[:16])
+        sert(rx.capture_req).to_equal(None)
+
+
+    @patch('src.Rx.CAPTURE_SLACK_SECS', 0.01)
+    def test_should_return_partial_capture(self):
+        sert(rx.capture(0.01)).to_equal('')
+
+
+
+class TestAgc(Base):
+
+    def test_should_be_off_by_default(self):
+        sert(rx.agc_on).is_false()
+
+
+    def test_should_not_adapt_sensitivity_when_off(self):
+        for samps in ([0, 0, 0, 0], [0, 9830, 0, 0]):
+            rx._callback(struct.pack('<4h', *samps), 4, 0, 0)
+            rx._decode_pending()
+
+        sert(rx.sensitivity).to_equal(0.11)
+
+
+    def test_should_adapt_sensitivity(self):
+        rx.set_agc(True)
+        for samps in ([0, 0, 0, 0], [0, 9830, 0, 0]):
+            rx._callback(struct.pack('<4h', *samps), 4, 0, 0)
+            rx._decode_pending()
+
+        sert(round(rx.sensitivity, 3)).to_equal(0.15)
+
+
+    def test_should_reset_agc_with_sensitivity(self):
+        rx.set_agc(True)
+        rx.agc = Mock()
+
+        rx.set_sensitivity(0.2)
+
+        sert(rx.sensitivity).to_equal(0.2)
+        sert(rx.agc.reset).called_once_with(0.2)
+
+
+
+class TestStats(Base):
+
+    def feed(self, samps):
+        rx._callback(struct.pack('<'+str(len(samps))+'h', *samps), len(samps), 0, 0)
+        rx._decode_pending()
+
+
+    def test_should_count_frames(self):
+        self.feed(frame(0x01) + frame(0x02) + (1440 - 144) * [0])
+
+        stats = rx.stats()
+
+        sert(stats.frames).to_equal(2)
+        sert(stats.stop_errors).to_equal(0)
+        sert(stats.spurious).to_equal(0)
+        sert(stats.bytes_per_sec).to_equal(20.0)
+        sert(stats.bit_rate).to_equal(2400.0)
+        sert(stats.sensitivity).to_equal(0.11)
+
+
+    def test_should_count_framing_errors(self):
+        bad = frame(0xfe)
+        bad[6 * 10] = 32767 # Edge in the stop-bit
+        bad[6 * 2 + 2] = 32767 # Edge just after data-bit 0
+        self.feed(bad)
+
+        stats = rx.stats()
+
+        sert(stats.stop_errors).to_equal(1)
+        sert(stats.spurious).to_equal(1)
+        sert(stats.rejected).to_equal(1)
+
+
+    def test_should_not_count_rejected_frames_as_bytes(self):
+        bad = frame(0xfe)
+        bad[6 * 10] = 32767 # Edge in the stop-bit
+        self.feed(frame(0x01) + bad + (1440 - 144) * [0])
+
+        stats = rx.stats()
+
+        sert(stats.frames).to_equal(2)
+        sert(stats.rejected).to_equal(1)
+        sert(stats.bytes_per_sec).to_equal(10.0)
+
+
+    def test_should_count_dropped_bytes(self):
+        rx.char_buf = src.ring.ByteRing(2)
+
+        rx._put_bytes([65, 66, 67])
+
+        sert(rx.stats().dropped).to_equal(3)
+
+
+    def test_should_reset(self):
+        self.feed(frame(0x01))
+        rx._put_bytes(CHAR_BUF_FILL)
+
+        rx.reset_stats()
+        stats = rx.stats()
+
+        sert(stats.frames).to_equal(0)
+        sert(stats.dropped).to_equal(0)
+        sert(stats.bytes_per_sec).to_equal(0.0)
+        sert(stats.audio.high_water).to_equal(0)
 
 
 
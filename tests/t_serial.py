@@ -94,68 +94,46 @@ class TestReceiveFile(Base):
 
 class TestReceiveFileWatchar(Base):
 
-    @patch('time.sleep', side_effect=fake_sleep)
-    def test_should_wait_for_chars_to_exist_in_buffer(self, mock_sleep):
-        assert len(transport_ary) == 0
-        transport_ary.append(65)
-        transport_ary.append(66)
-        transport_ary.append(ord('Z'))
+    def test_should_wait_for_chars_to_exist_in_buffer(self):
+        tport.read_until = Mock(side_effect=[None, None, bytearray([65, 66, 90, 90])])
         ser._write_file = Mock()
-        assert sleep_counter == 0
 
         ser.receive_file_watchars('abc.txt', 'ZZ')
 
-        assert sleep_counter == 100
-        assert transport_ary == [65, 66, ord('Z'), ord('Z')]
-        sert(ser._write_file).called_with('abc.txt', [65, 66])
+        sert(tport.read_until).called_n_times(3)
+        sert(tport.read_until).called_with('ZZ', 0.5)
+        sert(ser._write_file).called_with('abc.txt', bytearray([65, 66]))
 
 
-    @patch('time.sleep', side_effect=fake_sleep)
-    def test_should_write_file_when_chars_exist_in_buffer(self, mock_sleep):
-        assert len(transport_ary) == 0
-        transport_ary.append(65)
-        transport_ary.append(ord('Z'))
-        transport_ary.append(ord('Z'))
+    def test_should_write_file_when_chars_exist_in_buffer(self):
+        tport.read_until = Mock(return_value=bytearray([65, 90, 90]))
         ser._write_file = Mock()
-        assert sleep_counter == 0
 
         ser.receive_file_watchars('abc.txt', 'ZZ')
 
-        assert sleep_counter == 0
-        sert(ser._write_file).called_with('abc.txt', [65])
+        sert(tport.read_until).called_once_with('ZZ', 0.5)
+        sert(ser._write_file).called_with('abc.txt', bytearray([65]))
 
 
-    @patch('time.sleep', side_effect=fake_sleep)
-    def test_should_use_default_watchar_value(self, mock_sleep):
-        assert len(transport_ary) == 0
-        transport_ary.append(65)
-        transport_ary.append(ord('Z'))
-        transport_ary.append(ord('Z'))
+    def test_should_use_default_watchar_value(self):
+        tport.read_until = Mock(return_value=bytearray([65, 90, 90]))
         ser._write_file = Mock()
-        assert sleep_counter == 0
 
         ser.receive_file_watchars('abc.txt')
 
-        assert sleep_counter == 0
-        sert(ser._write_file).called_with('abc.txt', [65])
+        sert(tport.read_until).called_once_with('ZZ', 0.5)
+        sert(ser._write_file).called_with('abc.txt', bytearray([65]))
 
 
-    @patch('time.sleep', side_effect=fake_sleep)
-    def test_should_use_config_watchar_value(self, mock_sleep):
+    def test_should_use_config_watchar_value(self):
         ser.config['watchars'].value = 'XYZ'
-        assert len(transport_ary) == 0
-        transport_ary.append(65)
-        transport_ary.append(66)
-        transport_ary.append(ord('X'))
-        transport_ary.append(ord('Y'))
+        tport.read_until = Mock(return_value=bytearray([65, 66, 88, 89, 90]))
         ser._write_file = Mock()
-        assert sleep_counter == 0
 
         ser.receive_file_watchars('abc.txt')
 
-        assert sleep_counter == 100
-        assert transport_ary == [65, 66, ord('X'), ord('Y'), ord('Z')]
-        sert(ser._write_file).called_with('abc.txt', [65, 66])
+        sert(tport.read_until).called_once_with('XYZ', 0.5)
+        sert(ser._write_file).called_with('abc.txt', bytearray([65, 66]))
 
 
 
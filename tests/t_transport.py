@@ -24,8 +24,8 @@ class TestInit(unittest.TestCase):
 
         t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens)
 
-        sert(mock_rx).called_once_with(2, 1, 44100, True, None, 0.11)
-        sert(mock_tx).called_once_with(2, 1, 44100, True, None)
+        sert(mock_rx).called_once_with(2, 1, 44100, True, None, 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, True, None, wav_max=None, frames_per_buffer=None, latency=None)
 
 
     @patch('src.Rx.Rx')
@@ -38,8 +38,8 @@ class TestInit(unittest.TestCase):
 
         t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens)
 
-        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.11)
-        sert(mock_tx).called_once_with(2, 1, 44100, False, None)
+        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, None, wav_max=None, frames_per_buffer=None, latency=None)
 
 
     @patch('src.Rx.Rx')
@@ -52,8 +52,8 @@ class TestInit(unittest.TestCase):
 
         t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens)
 
-        sert(mock_rx).called_once_with(2, 1, 44100, False, 'pfx_rx.wav', 0.11)
-        sert(mock_tx).called_once_with(2, 1, 44100, False, 'pfx_tx.wav')
+        sert(mock_rx).called_once_with(2, 1, 44100, False, 'pfx_rx.wav', 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, 'pfx_tx.wav', wav_max=None, frames_per_buffer=None, latency=None)
 
 
     @patch('src.Rx.Rx')
@@ -66,8 +66,8 @@ class TestInit(unittest.TestCase):
 
         t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens)
 
-        sert(mock_rx).called_once_with(2, 1, 22050, False, None, 0.11)
-        sert(mock_tx).called_once_with(2, 1, 22050, False, None)
+        sert(mock_rx).called_once_with(2, 1, 22050, False, None, 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 22050, False, None, wav_max=None, frames_per_buffer=None, latency=None)
 
 
     @patch('src.Rx.Rx')
@@ -80,8 +80,57 @@ class TestInit(unittest.TestCase):
 
         t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens)
 
-        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.04)
-        sert(mock_tx).called_once_with(2, 1, 44100, False, None)
+        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.04, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, None, wav_max=None, frames_per_buffer=None, latency=None)
+
+
+    @patch('src.Rx.Rx')
+    @patch('src.Tx.Tx')
+    def test_should_init_rxring(self, mock_tx, mock_rx):
+        quiet_init = None
+        wav_prefix = None
+        framerate = None
+        rxsens = None
+        rxring = 5.5
+
+        t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens, rxring)
+
+        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.11, ring_secs=5.5, wav_max=None, frames_per_buffer=None, latency=None)
+
+
+    @patch('src.Rx.Rx')
+    @patch('src.Tx.Tx')
+    def test_should_init_wavmax(self, mock_tx, mock_rx):
+        quiet_init = None
+        wav_prefix = 'pfx'
+        framerate = None
+        rxsens = None
+        rxring = None
+        wavmax = 1.5
+
+        t = transport.Transport(quiet_init, wav_prefix, framerate, rxsens, rxring, wavmax)
+
+        sert(mock_rx).called_once_with(2, 1, 44100, False, 'pfx_rx.wav', 0.11, ring_secs=2.0, wav_max=1572864, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, 'pfx_tx.wav', wav_max=1572864, frames_per_buffer=None, latency=None)
+
+
+
+    @patch('src.Rx.Rx')
+    @patch('src.Tx.Tx')
+    def test_should_init_stereo_rx(self, mock_tx, mock_rx):
+        t = transport.Transport(None, None, None, None, rx_stereo=True)
+
+        sert(mock_rx).called_once_with(2, 2, 44100, False, None, 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=None, latency=None)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, None, wav_max=None, frames_per_buffer=None, latency=None)
+
+
+    @patch('src.Rx.Rx')
+    @patch('src.Tx.Tx')
+    def test_should_init_buffering(self, mock_tx, mock_rx):
+        t = transport.Transport(None, None, None, None, frames_per_buffer=256, latency=0.02)
+
+        sert(mock_rx).called_once_with(2, 1, 44100, False, None, 0.11, ring_secs=2.0, wav_max=None, frames_per_buffer=256, latency=0.02)
+        sert(mock_tx).called_once_with(2, 1, 44100, False, None, wav_max=None, frames_per_buffer=256, latency=0.02)
 
 
 
@@ -193,6 +242,181 @@ class TestPeekBytes(Base):
 
 
 
+class TestNumBytes(Base):
+
+    def test_should_return_num_bytes(self):
+        mock_rx.return_value.num_bytes.return_value = 7
+
+        sert(tport.num_bytes()).to_equal(7)
+
+
+
+class TestWaitForBytes(Base):
+
+    def test_should_wait_for_bytes(self):
+        mock_rx.return_value.wait_for_bytes.return_value = True
+
+        sert(tport.wait_for_bytes(6, 0.1)).is_true()
+        sert(mock_rx, 'wait_for_bytes').called_once_with(6, 0.1)
+
+
+
+class TestReadUntil(Base):
+
+    def test_should_read_until(self):
+        mock_rx.return_value.read_until.return_value = bytearray('AB\r')
+
+        sert(tport.read_until(13, 0.5)).to_equal(bytearray('AB\r'))
+        sert(mock_rx, 'read_until').called_once_with(13, 0.5)
+
+
+
+class TestRxSensitivity(Base):
+
+    def test_should_return_rx_sensitivity(self):
+        mock_rx.return_value.sensitivity = 0.2
+
+        sert(tport.rx_sensitivity()).to_equal(0.2)
+
+
+    def test_should_set_rx_sensitivity(self):
+        tport.set_rx_sensitivity(0.3)
+
+        sert(mock_rx, 'set_sensitivity').called_once_with(0.3)
+
+
+    def test_should_set_rx_agc(self):
+        tport.set_rx_agc(True)
+
+        sert(mock_rx, 'set_agc').called_once_with(True)
+
+
+
+class TestSetRxReject(Base):
+
+    def test_should_set_rx_reject(self):
+        tport.set_rx_reject(False)
+
+        sert(mock_rx, 'set_reject_errors').called_once_with(False)
+
+
+
+class TestSetBuffering(Base):
+
+    def test_should_set_buffering(self):
+        tport.set_buffering(256, None)
+
+        sert(mock_rx.return_value.set_buffering).called_once_with(256, None)
+        sert(mock_tx.return_value.set_buffering).called_once_with(256, None)
+
+
+
+class TestSetRxChannel(Base):
+
+    def test_should_set_rx_channel(self):
+        tport.set_rx_channel('left')
+
+        sert(mock_rx.return_value.set_channel_mode).called_once_with('left')
+
+
+
+class TestSetRxDetector(Base):
+
+    def test_should_set_rx_detector(self):
+        tport.set_rx_detector('matched', 0.7)
+
+        sert(mock_rx.return_value.set_detector).called_once_with('matched', 0.7)
+
+
+    def test_should_return_match_confidence(self):
+        mock_rx.return_value.demod.match_confidence = 0.7
+
+        sert(tport.rx_match_confidence()).to_equal(0.7)
+
+
+
+class TestRxAlternates(Base):
+
+    def test_should_set_rx_alternates(self):
+        tport.set_rx_alternates(True)
+
+        sert(mock_rx.return_value.set_alternates).called_once_with(True)
+
+
+    def test_should_return_rx_alternates(self):
+        mock_rx.return_value.alternates.return_value = ['ab']
+
+        sert(tport.rx_alternates()).to_equal(['ab'])
+
+
+    def test_should_clear_alternates_with_buffer(self):
+        tport.clear_buffer()
+
+        sert(mock_rx.return_value.clear_alternates).called_once()
+
+
+
+class TestRxCapture(Base):
+
+    def test_should_capture_rx_audio(self):
+        mock_rx.return_value.capture.return_value = 'abc'
+
+        sert(tport.rx_capture(2.0)).to_equal('abc')
+        sert(mock_rx.return_value.capture).called_once_with(2.0)
+
+
+
+class TestRxBitRate(Base):
+
+    def test_should_return_rx_bit_rate(self):
+        mock_rx.return_value.bit_rate.return_value = 2410.0
+
+        sert(tport.rx_bit_rate()).to_equal(2410.0)
+
+
+
+class TestRxStats(Base):
+
+    def test_should_return_rx_stats(self):
+        mock_rx.return_value.stats.return_value = 'abc'
+
+        sert(tport.rx_stats()).to_equal('abc')
+
+
+    def test_should_reset_rx_stats(self):
+        tport.reset_rx_stats()
+
+        sert(mock_rx, 'reset_stats').called_once()
+
+
+
+class TestTxStats(Base):
+
+    def test_should_return_tx_stats(self):
+        mock_tx.return_value.stats.return_value = 'abc'
+
+        sert(tport.tx_stats()).to_equal('abc')
+
+
+    def test_should_reset_tx_stats(self):
+        tport.reset_tx_stats()
+
+        sert(mock_tx.return_value.reset_stats).called_once()
+
+
+    def test_should_set_tx_timeout(self):
+        tport.set_tx_timeout(2.5)
+
+        sert(mock_tx.return_value.set_write_timeout).called_once_with(2.5)
+
+
+    def test_should_set_tx_continuous(self):
+        tport.set_tx_continuous(True)
+
+        sert(mock_tx.return_value.set_continuous).called_once_with(True)
+
+
+
 class TestReadBytes(Base):
 
     def test_should_read(self):
@@ -244,3 +468,10 @@ class TestWriteBytes(Base):
         tport.write_bytes([65, 66])
 
         sert(mock_tx, 'write_bytes').called_once_with([65, 66])
+
+
+    def test_should_write_async(self):
+        mock_tx.return_value.write_async.return_value = 'abc'
+
+        sert(tport.write_async([65, 66])).to_equal('abc')
+        sert(mock_tx.return_value.write_async).called_once_with([65, 66])
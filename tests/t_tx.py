@@ -1,6 +1,8 @@
 import unittest
 from mock import patch, call, Mock, MagicMock, DEFAULT
 import struct
+import threading
+import time
 
 import src.Tx
 
@@ -8,6 +10,7 @@ from tests.sert import sert
 
 
 mock_txpa = None
+mock_recorder = None
 tx = None
 
 pa_callback = None
@@ -29,16 +32,21 @@ class F:
         return 123
 
 
-def fake_is_active():
-    """Simulate playing wav data by calling callback"""
+def fake_start_stream():
+    """Simulate playing wav data by calling callback until it is done"""
     in_data = []
     frame_count = 20000
     time_info = 0
     status = 0
 
-    (data, result) = pa_callback(in_data, frame_count, time_info, status)
-    wav_output.append(data)
-    return (result + 1) % 2
+    if tx.pending is None:
+        return
+    for _ in range(1000):
+        (data, result) = pa_callback(in_data, frame_count, time_info, status)
+        wav_output.append(data)
+        if len(data) == 0:
+            return
+    raise Exception('fake_start_stream did not finish')
 
 
 def fake_open(**kwargs):
@@ -67,6 +75,10 @@ def get_mock_stream():
 class Base(unittest.TestCase):
 
     def setUp(self):
+        global mock_recorder
+        patcher = patch('src.Tx.recorder')
+        mock_recorder = patcher.start()
+        self.addCleanup(patcher.stop)
         del wav_output[:] # clear list
         self.init_tx({})
 
@@ -78,7 +90,7 @@ class Base(unittest.TestCase):
 
         mock_txpa = mock_srctxpa
         mock_txpa.get_instance.return_value.open = MagicMock(side_effect=fake_open)
-        mock_txpa.get_instance.return_value.open.return_value.is_active = fake_is_active
+        mock_txpa.get_instance.return_value.open.return_value.start_stream = MagicMock(side_effect=fake_start_stream)
 
         cfg = default_cfg(config)
         samp_width = cfg['samp_width'] or 2
@@ -127,16 +139,18 @@ class TestWriteBytes(Base):
     @patch('src.Tx.time', new=F())
     def test_should_record_session(self):
         tx.run()
-        tx.record_session = True
-        sert(len(tx.session_buffer)).to_equal(0)
+        rec = Mock()
+        tx.recorder = rec
 
         tx.write_bytes([65])
 
-        sert(len(tx.session_buffer)).to_equal(5120)
+        sert(len(rec.write.call_args_list[0][0][0])).to_equal(5120)
+        sert(rec.write_silence).not_called()
 
         tx.write_bytes([66])
 
-        sert(len(tx.session_buffer)).to_equal(10240)
+        sert(rec.write_silence).called_once_with(0)
+        sert(len(''.join(c[0][0] for c in rec.write.call_args_list))).to_equal(10240)
 
 
     @patch('src.Tx.time', new=F())
@@ -155,7 +169,8 @@ class TestWriteBytes(Base):
     def test_should_encode_one(self):
         tx.run()
         tx.write_bytes([1])
-        dat = struct.unpack('<'+str(len(tx.wavdat)/2)+'h', tx.wavdat)
+        out = ''.join(wav_output)
+        dat = struct.unpack('<'+str(len(out)/2)+'h', out)
 
         bits = []
         i = 0
@@ -183,7 +198,8 @@ class TestWriteBytes(Base):
     def test_should_encode_zero(self):
         tx.run()
         tx.write_bytes([0])
-        dat = struct.unpack('<'+str(len(tx.wavdat)/2)+'h', tx.wavdat)
+        out = ''.join(wav_output)
+        dat = struct.unpack('<'+str(len(out)/2)+'h', out)
 
         bits = []
         i = 0
@@ -208,6 +224,374 @@ class TestWriteBytes(Base):
 
 
 
+class TestStreaming(Base):
+
+    def test_should_make_audio_as_callback_asks_for_it(self):
+        tx.set_buffering(100, None)
+        tx.pending = tx._frames([0, 1, 2])
+
+        first = tx._read(20)
+        rest = tx._read(10000)
+
+        sert(first).to_equal(tx.byte_table[0][:20])
+        sert(first + rest).to_equal(''.join(tx.byte_table[:3]) + '\x00\x00' * (84 + 2100))
+        sert(tx._read(20)).to_equal('')
+
+
+    def test_should_hold_less_than_a_table_entry_between_callbacks(self):
+        tx.pending = tx._frames(1000 * [65])
+
+        tx._read(1024)
+
+        assert len(tx.spare) < len(tx.byte_table[65])
+
+
+
+class TestCompletion(Base):
+
+    @patch('src.Tx.time', new=F())
+    def test_should_signal_when_write_is_played(self):
+        tx.run()
+
+        tx.write_bytes([65])
+
+        sert(tx.drained.is_set()).is_true()
+        sert(get_mock_stream().stop_stream).called_twice()
+
+
+    @patch('src.Tx.WAIT_SECS', 0.01)
+    def test_should_give_up_after_timeout(self):
+        tx.run()
+        stream = get_mock_stream()
+        stream.start_stream.side_effect = None # Sound card takes nothing
+        tx.set_write_timeout(0.03)
+
+        tx.write_bytes([65])
+
+        sert(tx.stats().timeouts).to_equal(1)
+        sert(tx.stats().writes).to_equal(0)
+        sert(stream.stop_stream).called_twice()
+
+
+    @patch('src.Tx.now', side_effect=[10.0, 10.25, 20.0, 20.05])
+    def test_should_measure_drain_latency(self, mock_now):
+        tx.run()
+
+        tx.write_bytes([65])
+        tx.write_bytes([66])
+
+        st = tx.stats()
+        sert(st.writes).to_equal(2)
+        sert(round(st.drain, 3)).to_equal(0.15)
+        sert(st.max_drain).to_equal(0.25)
+
+
+    @patch('src.Tx.now', side_effect=[10.0, 10.25])
+    def test_should_reset_stats(self, mock_now):
+        tx.run()
+        tx.write_bytes([65])
+
+        tx.reset_stats()
+
+        sert(tx.stats().writes).to_equal(0)
+        sert(tx.stats().max_drain).to_equal(0.0)
+
+
+
+    def test_should_not_complete_write_that_timed_out(self):
+        tx.busy = False
+        tx.pending = None
+
+        (data, result) = tx._callback([], 100, 0, 0)
+
+        sert(data).to_equal('')
+        sert(tx.drained.is_set()).is_false()
+        sert(tx.completed_at).to_equal(0)
+
+
+    def test_should_read_write_under_lock(self):
+        tx.pending = tx._frames([65])
+        tx.busy = True
+        out = []
+        th = threading.Thread(target=lambda: out.append(tx._callback([], 100, 0, 0)))
+
+        with tx.lock:
+            th.start()
+            th.join(0.05)
+            sert(th.is_alive()).is_true()
+        th.join(5)
+
+        sert(out[0][0][:144]).to_equal(tx.byte_table[65])
+
+
+
+    def test_should_play_blocking_write_on_callers_thread(self):
+        tx.run()
+        threads = []
+        get_mock_stream().start_stream.side_effect = lambda: threads.append(threading.current_thread()) or fake_start_stream()
+
+        sert(tx.write_bytes([65])).is_true()
+
+        sert(threads).to_equal([threading.current_thread()])
+        sert(tx.sender).to_equal(None)
+
+
+
+class TestWriteAsync(Base):
+
+    def test_should_return_before_write_is_played(self):
+        tx.run()
+        stream = get_mock_stream()
+        release = threading.Event()
+        stream.start_stream.side_effect = lambda: release.wait(5) and fake_start_stream()
+
+        w = tx.write_async([65])
+
+        sert(w.done.is_set()).is_false()
+        release.set()
+        sert(w.wait(5)).is_true()
+        sert(len(wav_output[0])).to_equal(5120)
+
+
+    def test_should_play_blocking_write_after_queued_writes(self):
+        tx.run()
+        stream = get_mock_stream()
+        release = threading.Event()
+        stream.start_stream.side_effect = lambda: release.wait(5) and fake_start_stream()
+        w = tx.write_async([65])
+        threading.Timer(0.05, release.set).start()
+
+        tx.write_bytes([66])
+
+        sert(w.done.is_set()).is_true()
+        sert(wav_output[0][:144]).to_equal(tx.byte_table[65])
+        sert(wav_output[2][:144]).to_equal(tx.byte_table[66])
+        sert(tx.unplayed).to_equal(0)
+
+
+    def test_should_play_writes_in_order(self):
+        tx.run()
+
+        w1 = tx.write_async([65])
+        w2 = tx.write_async([66])
+        w2.wait(5)
+
+        sert(w1.done.is_set()).is_true()
+        sert(wav_output[0][:144]).to_equal(tx.byte_table[65])
+        sert(wav_output[2][:144]).to_equal(tx.byte_table[66])
+
+
+    @patch('src.Tx.WAIT_SECS', 0.01)
+    def test_should_fail_write_that_times_out(self):
+        tx.run()
+        get_mock_stream().start_stream.side_effect = None
+        tx.set_write_timeout(0.03)
+
+        w = tx.write_async([65])
+
+        sert(w.wait(5)).is_false()
+        sert(w.done.is_set()).is_true()
+
+
+    def test_should_raise_error_from_write(self):
+        tx.run()
+        stream = get_mock_stream()
+        stream.start_stream.side_effect = Exception('boom')
+
+        with self.assertRaises(Exception) as cm:
+            tx.write_bytes([65])
+
+        sert(str(cm.exception)).to_equal('boom')
+        stream.start_stream.side_effect = fake_start_stream
+        sert(tx.write_bytes([66])).is_true()
+
+
+    def test_should_stop_write_in_progress_at_all_done(self):
+        tx.run()
+        stream = get_mock_stream()
+        stream.start_stream.side_effect = None # Sound card takes nothing
+        w = tx.write_async([65])
+        for _ in range(500):
+            if stream.start_stream.call_count == 2:
+                break
+            time.sleep(0.01)
+
+        tx.all_done()
+
+        sert(w.wait(5)).is_false()
+        sert(tx.sender.is_alive()).is_false()
+        sert(stream.close).called_once()
+
+
+    def test_should_fail_writes_after_all_done(self):
+        tx.run()
+        tx.all_done()
+
+        w = tx.write_async([65])
+
+        sert(w.done.is_set()).is_true()
+        sert(w.ok).is_false()
+
+
+
+class TestWaitEvent(unittest.TestCase):
+
+    def test_should_return_true_when_set(self):
+        ev = threading.Event()
+        ev.set()
+
+        sert(src.Tx.wait_event(ev, 1)).is_true()
+
+
+    @patch('src.Tx.WAIT_SECS', 0.01)
+    def test_should_return_false_on_timeout(self):
+        sert(src.Tx.wait_event(threading.Event(), 0.025)).is_false()
+
+
+
+class TestContinuous(Base):
+
+    def test_should_leave_stream_running(self):
+        tx.set_continuous(True)
+        tx.run()
+
+        sert(get_mock_stream().start_stream).called_once()
+        sert(get_mock_stream().stop_stream).not_called()
+
+
+    def test_should_reopen_stream(self):
+        tx.run()
+        stream = get_mock_stream()
+
+        tx.set_continuous(True)
+
+        sert(stream.close).called_once()
+        sert(mock_txpa.get_instance.return_value.open).called_twice()
+
+
+    def test_should_play_silence_when_idle(self):
+        tx.set_continuous(True)
+        tx.run()
+
+        (data, result) = pa_callback([], 100, 0, 0)
+
+        sert(data).to_equal(200 * '\x00')
+        sert(result).to_equal(src.Tx.pa.paContinue)
+
+
+    def test_should_play_write_without_starting_stream(self):
+        tx.set_continuous(True)
+        tx.run()
+        stream = get_mock_stream()
+        out = []
+        done = threading.Event()
+
+        def play():
+            while not done.is_set():
+                out.append(pa_callback([], 50, 0, 0)[0])
+                time.sleep(0.001)
+
+        th = threading.Thread(target=play)
+        th.start()
+        try:
+            tx.write_bytes([65])
+        finally:
+            done.set()
+            th.join()
+
+        sert(stream.start_stream).called_once()
+        sert(stream.stop_stream).not_called()
+        sert(tx.stats().writes).to_equal(1)
+        assert tx.byte_table[65] in ''.join(out)
+        # No padding or tail is added
+        sert(len(''.join(out).strip('\x00'))).to_equal(len(tx.byte_table[65].strip('\x00')))
+
+
+    def test_should_finish_write_in_callback_that_plays_its_end(self):
+        tx.set_continuous(True)
+        tx.pending = tx._frames([65], False)
+        tx.busy = True
+
+        (data, result) = tx._callback([], 100, 0, 0)
+
+        sert(data).to_equal(tx.byte_table[65] + 56 * '\x00')
+        sert(tx.drained.is_set()).is_true()
+        sert(tx.busy).is_false()
+
+
+
+class TestBuffering(Base):
+
+    def test_should_use_default_buffering(self):
+        tx.run()
+
+        sert(mock_txpa.get_instance.return_value.open.call_args[1]['frames_per_buffer']).to_equal(512)
+        sert(tx.tail_frames).to_equal(2048)
+
+
+    @patch('src.Tx.time', new=F())
+    def test_should_pad_to_buffer_size(self):
+        tx.set_buffering(100, None)
+        tx.run()
+
+        tx.write_bytes([65])
+
+        # 72 samples padded to 100, then 2048 rounded up to 2100
+        sert(len(''.join(wav_output))).to_equal(2 * 2200)
+
+
+    def test_should_derive_buffer_and_tail_from_latency(self):
+        tx.set_buffering(None, 0.01)
+
+        sert(tx.buffer_frames).to_equal(144)
+        sert(tx.tail_frames).to_equal(144)
+
+
+    def test_should_reopen_stream(self):
+        tx.run()
+        stream = get_mock_stream()
+
+        tx.set_buffering(256, None)
+
+        sert(stream.close).called_once()
+        sert(mock_txpa.get_instance.return_value.open).called_twice()
+        sert(mock_txpa.get_instance.return_value.open.call_args[1]['frames_per_buffer']).to_equal(256)
+
+
+
+class TestBitTiming(Base):
+
+    def test_should_round_each_bit_start(self):
+        self.init_tx({'framerate': 44100})
+
+        sert(tx.bit_starts).to_equal([0, 18, 37, 55, 74, 92, 110, 129, 147, 165, 184, 202, 221])
+
+
+    def test_should_encode_byte_with_fractional_bits(self):
+        self.init_tx({'framerate': 44100})
+
+        buf = tx._encode_byte(0xfe)
+
+        sert(len(buf)).to_equal(221)
+        sert([i for i, v in enumerate(buf) if v]).to_equal([18, 37])
+
+
+    def test_should_pack_each_byte_in_table(self):
+        sert(len(tx.byte_table)).to_equal(256)
+        for byte in (0, 0x41, 0xff):
+            buf = tx._encode_byte(byte)
+            sert(tx.byte_table[byte]).to_equal(struct.pack('<'+str(len(buf))+'h', *buf))
+
+
+    def test_should_rebuild_table_when_framing_changes(self):
+        tx.framerate = 44100
+        tx._set_framing()
+
+        sert(len(tx.byte_table[0])).to_equal(2 * 221)
+        sert(list(tx._frames([1, 2]))[:2]).to_equal([tx.byte_table[1], tx.byte_table[2]])
+
+
+
 class TestAllDone(Base):
 
     def test_should_close_stream(self):
@@ -230,30 +614,21 @@ class TestAllDone(Base):
         sert(get_mock_stream().close).called_once()
 
 
-    def test_should_save_session_when_wav_file_is_given(self):
+    def test_should_close_recorder_when_wav_file_is_given(self):
         self.init_tx({'wav_file' : 'file.wav'})
-        tx.session_buffer = [33, 44]
-        tx.write_wav = Mock()
+        rec = tx.recorder
         tx.run()
-        sert(tx.write_wav).not_called()
+        sert(rec.close).not_called()
 
         tx.all_done()
 
-        sert(tx.write_wav).called_once_with('file.wav', bytearray([33, 44]))
+        sert(rec.close).called_once()
+        sert(tx.recorder).to_equal(None)
 
 
 
 class TestSetWavFilename(Base):
 
-    def test_should_clear_session_buffer(self):
-        filename = None
-        tx.session_buffer = [33, 44]
-
-        tx.set_wav_filename(filename)
-
-        sert(tx.session_buffer).to_equal([])
-
-
     def test_should_set_wav_file(self):
         filename = 'abc.wav'
         sert(tx.wav_file).to_equal(None)
@@ -263,37 +638,24 @@ class TestSetWavFilename(Base):
         sert(tx.wav_file).to_equal(filename)
 
 
-    def test_should_set_record_session(self):
+    def test_should_start_recorder(self):
         filename = 'abc.wav'
-        sert(tx.record_session).is_false()
+        sert(tx.recorder).to_equal(None)
 
         tx.set_wav_filename(filename)
 
-        sert(tx.record_session).is_true()
+        sert(mock_recorder.WavRecorder).called_once_with('abc.wav', 1, 2, 14400, None)
+        assert tx.recorder is mock_recorder.WavRecorder.return_value
 
 
-    def test_should_clear_record_session(self):
-        filename = None
-        tx.record_session = True
+    def test_should_close_previous_recorder(self):
+        old = Mock()
+        tx.recorder = old
 
-        tx.set_wav_filename(filename)
-
-        sert(tx.record_session).is_false()
-
-
-    @patch('wave.open')
-    def test_should_save_session_buffer(self, mock_open):
-        wavdat = [33, 44]
-        filename = None
-        tx.session_buffer = wavdat
-        tx.wav_file = 'abc.txt'
-
-        tx.set_wav_filename(filename)
+        tx.set_wav_filename(None)
 
-        sert(mock_open).called_once()
-        sert(mock_open).called_with('abc.txt', 'wb')
-        sert(mock_open.return_value.writeframes).called_with(bytearray(wavdat))
-        sert(mock_open.return_value.close).called_once()
+        sert(old.close).called_once()
+        sert(tx.recorder).to_equal(None)
 
 
 
@@ -366,17 +728,15 @@ class TestNow(Base):
 
 
 
-class TestPadSilence(Base):
+class TestSilenceFrames(Base):
 
     @patch('src.Tx.time')
-    def test_pad(self, mock_time):
+    def test_should_count_frames(self, mock_time):
         now_ms = 11
         mock_time.time.return_value = now_ms
         start_time = now_ms - 5
         frame_rate = 14400
-        sample_width = 2
-        channels = 1
 
-        pad = src.Tx.pad_silence(start_time, channels, frame_rate, sample_width)
+        n = src.Tx.silence_frames(start_time, frame_rate)
 
-        assert pad ==  (5 * 14400 * 2) * [0]
+        sert(n).to_equal(5 * 14400)
@@ -209,6 +209,21 @@ class TestParseFloat(unittest.TestCase):
 
 
 
+class TestBufferFrames(unittest.TestCase):
+
+    def test_should_prefer_frames(self):
+        sert(util.buffer_frames(44100, 256, 0.1, 512)).to_equal(256)
+
+
+    def test_should_use_latency(self):
+        sert(util.buffer_frames(44100, None, 0.01, 512)).to_equal(441)
+
+
+    def test_should_use_default(self):
+        sert(util.buffer_frames(44100, None, None, 512)).to_equal(512)
+
+
+
 class TestParseBoolstr(unittest.TestCase):
 
     def test_should_parse_t(self):
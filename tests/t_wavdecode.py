@@ -0,0 +1,445 @@
+import unittest
+import os
+import random
+import shutil
+import struct
+import tempfile
+import wave
+from mock import patch
+
+import src.recorder
+import src.wavdecode
+
+from tests.sert import sert
+
+
+tmp_dir = None
+
+
+def frame_at(byte, spb):
+    """A frame with bits of spb samples"""
+    starts = [int(round(k * spb)) for k in range(13)]
+    samps = starts[-1] * [0]
+    samps[starts[1]] = 32767
+    for k in range(2, 10):
+        if not byte & 0x01:
+            samps[starts[k]] = 32767
+        byte >>= 1
+    return samps
+
+
+def reference_sens(bufr, framerate):
+    """compute_sens() as it was before it was made incremental"""
+    working = bufr[int(framerate / 2):]
+    max_val = max(working)
+    bucket_size = max_val / 32
+    buckets = 32 * [0]
+    for w in working:
+        if w < 0:
+            w = 0
+        ind = w / bucket_size
+        if ind == 32:
+            ind -= 1
+        buckets[ind] += 1
+    floor_ind = 0
+    for i in range(0, 31):
+        p = (buckets[i+1] + 1) / float(buckets[i] + 1)
+        if p < 0.0001:
+            floor_ind = i
+    aa = (bucket_size * (31 - (floor_ind + 1))) / 2
+    return float(aa) / 32767
+
+
+def test_signal(seed, noise, amp):
+    rnd = random.Random(seed)
+    samps = [rnd.randint(-noise, noise) for _ in range(44100)]
+    for i in range(22050, 44100, 20):
+        samps[i] = amp + rnd.randint(-noise, noise)
+    return samps
+
+
+def write_wav(filename, samps, framerate=44100, channels=1):
+    wf = wave.open(filename, 'wb')
+    wf.setparams((channels, 2, framerate, 0, 'NONE', 'not compressed'))
+    wf.writeframes(struct.pack('<'+str(len(samps))+'h', *samps))
+    wf.close()
+
+
+def read_wav(filename):
+    wf = wave.open(filename, 'rb')
+    n = wf.getnframes()
+    samps = struct.unpack('<'+str(n)+'h', wf.readframes(n))
+    wf.close()
+    return list(samps)
+
+
+
+class Base(unittest.TestCase):
+
+    def setUp(self):
+        global tmp_dir
+        tmp_dir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(tmp_dir)
+
+
+    def path(self, name):
+        return os.path.join(tmp_dir, name)
+
+
+    def signal_file(self, data, lead=100):
+        samps = lead * [0]
+        for b in data:
+            samps += frame_at(b, 44100 / 2400.0)
+        filename = self.path('a.wav')
+        write_wav(filename, samps)
+        return filename
+
+
+
+class TestWavInfo(Base):
+
+    def test_should_describe_file(self):
+        filename = self.path('a.wav')
+        write_wav(filename, 22050 * [0], 44100)
+
+        info = src.wavdecode.wav_info(filename)
+
+        sert(info.channels).to_equal(1)
+        sert(info.sample_width).to_equal(2)
+        sert(info.framerate).to_equal(44100)
+        sert(info.frames).to_equal(22050)
+        sert(info.secs).to_equal(0.5)
+
+
+
+class TestReadChunks(Base):
+
+    def test_should_read_file_in_chunks(self):
+        filename = self.path('a.wav')
+        write_wav(filename, range(10))
+
+        chunks = list(src.wavdecode.read_chunks(filename, 'list', 4))
+
+        sert([offset for offset, _ in chunks]).to_equal([0, 4, 8])
+        sert([list(samps) for _, samps in chunks]).to_equal([[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+
+    def test_should_reject_file_with_more_than_two_channels(self):
+        filename = self.path('a.wav')
+        write_wav(filename, range(12), channels=3)
+
+        try:
+            list(src.wavdecode.read_chunks(filename))
+            self.fail('Expected an exception')
+        except Exception as ex:
+            sert(str(ex)).to_equal('Number of channels is not 1 or 2: 3')
+
+
+    def test_should_read_chosen_channel_of_stereo_file(self):
+        filename = self.path('a.wav')
+        write_wav(filename, [1, 10, 2, 20, 3, 30], channels=2)
+
+        for channel, expected in (('left', [1, 2, 3]), ('right', [10, 20, 30]), ('mix', [11, 22, 33])):
+            chunks = list(src.wavdecode.read_chunks(filename, 'list', 2, channel))
+            sert([offset for offset, _ in chunks]).to_equal([0, 2])
+            sert(sum([list(samps) for _, samps in chunks], [])).to_equal(expected)
+
+
+
+class TestStereoRoundTrip(Base):
+
+    def record_stereo(self, left, right):
+        """Record as Rx does with --stereo"""
+        filename = self.path('s.wav')
+        rec = src.recorder.WavRecorder(filename, 2, 2, 44100)
+        samps = sum(zip(left, right), ())
+        rec.write(struct.pack('<'+str(len(samps))+'h', *samps))
+        rec.close()
+        return filename
+
+
+    def test_should_decode_stronger_channel_of_stereo_recording(self):
+        data = [0x41, 0x42, 0x43]
+        samps = 100 * [0]
+        for b in data:
+            samps += frame_at(b, 44100 / 2400.0)
+        filename = self.record_stereo([s / 8 for s in samps], samps)
+        decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+        sert([ch for _, ch in decoder.decode_file(filename)]).to_equal(data)
+
+
+    def test_should_calibrate_stronger_channel_of_stereo_recording(self):
+        samps = test_signal(1, 100, 20000)
+        mono = self.path('m.wav')
+        write_wav(mono, samps)
+        filename = self.record_stereo(test_signal(2, 100, 0), samps)
+
+        sert(src.wavdecode.calibrate_file(filename)).to_equal(src.wavdecode.calibrate_file(mono))
+
+
+    def test_should_decode_chosen_channel_of_stereo_recording(self):
+        samps = 100 * [0] + frame_at(0x41, 44100 / 2400.0)
+        other = 100 * [0] + frame_at(0x42, 44100 / 2400.0)
+        filename = self.record_stereo(samps, other)
+        decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+        sert([ch for _, ch in decoder.decode_file(filename, channel='left')]).to_equal([0x41])
+
+
+
+class TestWavDecoder(Base):
+
+    def test_should_decode_file(self):
+        data = range(256)
+        filename = self.signal_file(data)
+        decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+        sert([ch for _, ch in decoder.decode_file(filename)]).to_equal(data)
+
+
+    def test_should_return_sample_offsets(self):
+        filename = self.signal_file([0x41, 0x42])
+        decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+        # The trigger is the sample after the pulse
+        sert(list(decoder.decode_file(filename))).to_equal([(100 + 19, 0x41), (100 + 221 + 19, 0x42)])
+
+
+    def test_should_decode_frames_across_chunks(self):
+        rnd = random.Random(2)
+        data = [rnd.randint(0, 255) for _ in range(100)]
+        filename = self.signal_file(data)
+        expected = list(src.wavdecode.WavDecoder(44100, 0.5).decode_file(filename))
+        for chunk_frames in [1, 100, 1000]:
+            decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+            sert(list(decoder.decode_file(filename, chunk_frames))).to_equal(expected)
+
+
+    def test_should_count_frames(self):
+        filename = self.signal_file([1, 2, 3])
+        decoder = src.wavdecode.WavDecoder(44100, 0.5)
+
+        list(decoder.decode_file(filename))
+
+        sert(decoder.stats().frames).to_equal(3)
+        sert(decoder.stats().rejected).to_equal(0)
+
+
+
+class TestWriteTriggers(Base):
+
+    def test_should_mark_edges(self):
+        filename = self.path('a.wav')
+        write_wav(filename, [0, 0, 32767, 0, 0, 20000, 0])
+
+        src.wavdecode.write_triggers(filename, self.path('b.wav'), 0.5)
+
+        tv = src.wavdecode.TRIGGER_VAL
+        sert(read_wav(self.path('b.wav'))).to_equal([0, 0, 0, tv, 0, 0, tv])
+
+
+
+class TestComputeSens(unittest.TestCase):
+
+    def test_should_pick_threshold_below_pulses(self):
+        sens = src.wavdecode.compute_sens(test_signal(1, 500, 16000), 44100)
+
+        sert(0.1 < sens < 16000.0 / 32767).is_true()
+
+
+    def test_should_match_reference(self):
+        for seed, noise, amp in [(1, 500, 16000), (2, 3000, 9000), (3, 50, 30000), (4, 8000, 10000)]:
+            samps = test_signal(seed, noise, amp)
+            expected = reference_sens(samps, 44100)
+
+            sert(src.wavdecode.compute_sens(samps, 44100)).to_equal(expected)
+            with patch('src.wavdecode.numpy', None):
+                sert(src.wavdecode.compute_sens(samps, 44100)).to_equal(expected)
+
+
+
+class TestSensCalibrator(unittest.TestCase):
+
+    def calibrate(self, samps, size):
+        cal = src.wavdecode.SensCalibrator(44100)
+        for i in range(0, len(samps), size):
+            cal.add(samps[i:i+size])
+        return cal.result()
+
+
+    def test_should_not_depend_on_chunk_size(self):
+        samps = test_signal(5, 500, 16000)
+        expected = self.calibrate(samps, len(samps))
+        for size in [1000, 22050, 30001]:
+            sert(self.calibrate(samps, size)).to_equal(expected)
+
+
+    def test_should_be_confident_of_clean_signal(self):
+        sens, confidence = self.calibrate(test_signal(1, 500, 16000), 4096)
+
+        sert(confidence > 0.9).is_true()
+
+
+    def test_should_not_be_confident_without_pulses(self):
+        sens, confidence = self.calibrate(test_signal(1, 500, 0), 4096)
+
+        sert(confidence).to_equal(0.0)
+
+
+    def test_should_be_less_confident_of_noisy_signal(self):
+        clean = self.calibrate(test_signal(1, 500, 16000), 4096)[1]
+        noisy = self.calibrate(test_signal(1, 6000, 16000), 4096)[1]
+
+        sert(noisy < clean).is_true()
+
+
+    def test_should_reject_short_recording(self):
+        cal = src.wavdecode.SensCalibrator(44100)
+        cal.add(100 * [0])
+
+        self.assertRaises(Exception, cal.result)
+
+
+
+class TestSummarize(Base):
+
+    def test_should_summarize_file(self):
+        filename = self.signal_file([1, 2, 3])
+
+        sm = src.wavdecode.summarize(filename, 0.5)
+
+        sert(sm.bytes).to_equal(3)
+        sert(sm.sensitivity).to_equal(0.5)
+        sert(sm.confidence).to_equal(None)
+        sert(sm.errors).to_equal(0)
+        sert(sm.secs).to_equal((100 + 3 * 221) / 44100.0)
+        sert(sm.error).to_equal(None)
+
+
+    def test_should_calibrate_without_sensitivity(self):
+        filename = self.path('a.wav')
+        samps = 22050 * [0]
+        for _ in range(20):
+            samps += frame_at(0x55, 44100 / 2400.0)
+        write_wav(filename, samps)
+
+        sm = src.wavdecode.summarize(filename)
+
+        sert(sm.bytes).to_equal(20)
+        sert(sm.sensitivity > 0).is_true()
+        sert(sm.confidence > 0.9).is_true()
+
+
+
+class TestSummarizeFiles(Base):
+
+    def test_should_summarize_files_in_order(self):
+        names = []
+        for n in range(4):
+            names.append(self.path('{}.wav'.format(n)))
+            samps = []
+            for _ in range(n):
+                samps += frame_at(0x41, 44100 / 2400.0)
+            write_wav(names[-1], 100 * [0] + samps)
+
+        for processes in [1, 2]:
+            sms = list(src.wavdecode.summarize_files(names, 0.5, processes))
+
+            sert([sm.filename for sm in sms]).to_equal(names)
+            sert([sm.bytes for sm in sms]).to_equal([0, 1, 2, 3])
+
+
+    def test_should_decode_chosen_channel_of_stereo_files(self):
+        left = 100 * [0]
+        for _ in range(2):
+            left += [v / 2 for v in frame_at(0x41, 44100 / 2400.0)]
+        right = 100 * [0] + frame_at(0x42, 44100 / 2400.0) + len(left) * [0]
+        right = right[:len(left)]
+        filename = self.path('s.wav')
+        write_wav(filename, sum(zip(left, right), ()), channels=2)
+
+        for processes in [1, 2]:
+            sms = list(src.wavdecode.summarize_files([filename, filename], 0.4, processes, 'left'))
+            sert([sm.bytes for sm in sms]).to_equal([2, 2])
+        sert(src.wavdecode.summarize(filename, 0.4).bytes).to_equal(1) # auto picks the stronger right
+
+
+    def test_should_report_bad_file(self):
+        good = self.signal_file([1])
+        bad = self.path('missing.wav')
+
+        sms = list(src.wavdecode.summarize_files([good, bad], 0.5, 2))
+
+        sert(sms[0].bytes).to_equal(1)
+        sert(sms[1].filename).to_equal(bad)
+        sert('No such file' in sms[1].error).is_true()
+
+
+    def test_should_report_file_that_is_not_wav(self):
+        bad = self.path('bad.wav')
+        f = open(bad, 'wb')
+        f.write('junk')
+        f.close()
+
+        sm = list(src.wavdecode.summarize_files([bad], 0.5))[0]
+
+        sert(sm.error).to_equal('EOFError()')
+
+
+
+class TestChooseSensitivity(unittest.TestCase):
+
+    def result(self, sens, nbytes, rejected=0):
+        return src.wavdecode.util.AttrBag(sensitivity=sens, bytes=nbytes, rejected=rejected)
+
+
+    def test_should_choose_middle_of_best_scores(self):
+        results = [self.result(0.1, 50, 20), self.result(0.2, 40), self.result(0.3, 40),
+                self.result(0.4, 39), self.result(0.5, 40), self.result(0.6, 10)]
+
+        sert(src.wavdecode.choose_sensitivity(results)).to_equal(0.3)
+
+
+    def test_should_return_none_if_nothing_decoded(self):
+        results = [self.result(0.1, 3, 5), self.result(0.2, 0)]
+
+        sert(src.wavdecode.choose_sensitivity(results)).to_equal(None)
+
+
+
+class TestSweepSensitivity(unittest.TestCase):
+
+    def signal(self, amp):
+        rnd = random.Random(1)
+        samps = 100 * [0]
+        for b in range(40):
+            samps += frame_at(b, 44100 / 2400.0)
+        samps = [min(s * amp / 32767 + rnd.randint(-800, 800), 32767) for s in samps]
+        return struct.pack('<'+str(len(samps))+'h', *samps)
+
+
+    def test_should_try_sensitivity(self):
+        res = src.wavdecode.try_sensitivity(self.signal(20000), 44100, 0.3)
+
+        sert(res.sensitivity).to_equal(0.3)
+        sert(res.bytes).to_equal(40)
+        sert(res.rejected).to_equal(0)
+
+
+    def test_should_sweep_sensitivity(self):
+        for processes in [1, 2]:
+            sens, results = src.wavdecode.sweep_sensitivity(self.signal(20000), 44100, processes=processes)
+
+            sert(len(results)).to_equal(len(src.wavdecode.SWEEP_SENS))
+            sert(0.1 < sens < 0.5).is_true()
+
+
+    def test_should_not_choose_sensitivity_for_silence(self):
+        sens, results = src.wavdecode.sweep_sensitivity(self.signal(0), 44100, [0.2, 0.4], 1)
+
+        sert(sens).to_equal(None)
@@ -83,6 +83,7 @@ class Base(unittest.TestCase):
         tport.peek = Mock(return_value = transport_ary)
         tport.read = Mock(return_value = transport_ary)
         tport.read_bytes = Mock(return_value = transport_ary)
+        tport.rx_alternates = Mock(return_value = [])
         xmod = src.xmodem.Xmodem(tport)
 
 
@@ -527,6 +528,56 @@ class TestRcvBuf(Base):
         sert(tport.peek).called_n_times(cnt)
 
 
+    @patch('time.sleep', new=fake_sleep)
+    def test_should_wait_for_block_when_header_arrives_alone(self):
+        val = [HEADER_BYTE] + 131 * [65]
+        tport.peek.side_effect = [[HEADER_BYTE], val]
+        tport.read_bytes.return_value = val
+        pause = xmod.config['pause'].value
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_BLOCK)
+        sert(blk).to_equal(val)
+        sert(tport.read_byte).not_called()
+        sert(tport.wait_for_bytes).called_once_with(132, pause)
+
+
+    @patch('time.sleep', new=fake_sleep)
+    def test_should_leave_single_cancel_in_buffer(self):
+        tport.peek.side_effect = [[CANCEL], [CANCEL, CANCEL, CANCEL], [CANCEL, CANCEL, CANCEL]]
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_CANCEL)
+        sert(tport.read_byte).not_called()
+
+
+    @patch('time.sleep', new=fake_sleep)
+    def test_should_wake_for_ack_after_stray_byte(self):
+        tport.peek.side_effect = [[65], [ACK]]
+        tport.read_byte.side_effect = [[65], [ACK]]
+        pause = xmod.config['pause'].value
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_ACK)
+        sert(tport.wait_for_bytes).called_once_with(1, pause)
+
+
+    @patch('time.sleep', new=fake_sleep)
+    def test_should_wake_for_ack_after_discarding_bytes(self):
+        tport.peek.side_effect = [[65, 66], [ACK]]
+        tport.read_byte.side_effect = [[65], [66], [], [ACK]]
+        tport.num_bytes.return_value = 0
+        pause = xmod.config['pause'].value
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_ACK)
+        sert(tport.wait_for_bytes).called_once_with(1, pause)
+
+
     @patch('time.sleep', new=fake_sleep)
     def test_should_return_block(self):
         val = 132 * [65]
@@ -592,6 +643,26 @@ class TestRcvBuf(Base):
         tport.read_byte.side_effect = orig
 
 
+    def test_should_wait_for_more_bytes(self):
+        tport.peek.return_value = []
+        pause = xmod.config['pause'].value
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_FAIL)
+        sert(tport.wait_for_bytes).called_with(1, pause)
+
+
+    def test_should_wait_for_rest_of_block(self):
+        tport.peek.return_value = [HEADER_BYTE, 1, 254]
+        pause = xmod.config['pause'].value
+
+        (res, blk) = xmod._rcv_buf()
+
+        sert(res).to_equal(R_FAIL)
+        sert(tport.wait_for_bytes).called_with(132, pause)
+
+
 
 class TestWriteFile(Base):
 
@@ -703,6 +774,21 @@ class TestReceiveFile(Base):
         sert(tport.write_byte).nth_call_called_with(3, ACK)
 
 
+    def test_should_use_block_from_alternate(self):
+        filename = 'out.bin'
+        pkt = 128 * [65]
+        bad = make_block(1, pkt)
+        bad[5] = 66
+        tport.rx_alternates.return_value = [bytearray(bad), bytearray([1, 2] + make_block(1, pkt))]
+        xmod._rcv_buf = Mock(side_effect=[(R_BLOCK, bad), (R_END_TRANS, None)])
+        xmod._write_file = Mock()
+
+        xmod.receive_file(filename)
+
+        sert(xmod._write_file).called_once_with(filename, pkt)
+        sert(tport.write_byte).nth_call_called_with(2, ACK)
+
+
     def test_should_write_blocks(self):
         filename = 'out.bin'
         pkt1 = 128 * [65]